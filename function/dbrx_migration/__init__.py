@@ -0,0 +1,5 @@
+"""
+Modules of the Databricks to ATP migration function (see func.py). Only the
+standard library is imported at module load: requests, pyarrow and oracledb
+are imported on the code paths that need them (see scripts/check_import_time.py).
+"""
@@ -0,0 +1,485 @@
+"""
+Load control table in ATP: one record per load, read back to skip
+unchanged sources
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from .preflight import PREFLIGHT_PREFIX
+
+
+DEFAULT_CONTROL_TABLE = "DBRX_MIGRATION_CONTROL"
+DEFAULT_REJECT_TABLE = "DBRX_MIGRATION_REJECTS"
+DEFAULT_PROGRESS_TABLE = "DBRX_MIGRATION_PROGRESS"
+# Seconds between progress table writes
+DEFAULT_PROGRESS_INTERVAL = 10
+PLAN_HISTORY_RUNS = 10
+
+
+def ensure_control_table(cursor, control_table):
+    """
+    Create the load control table if it does not exist yet.
+    One row is written per load so runs stay auditable.
+    """
+    import oracledb
+
+    try:
+        cursor.execute(f"""
+            CREATE TABLE {control_table} (
+                source_name VARCHAR2(400) NOT NULL,
+                target_table VARCHAR2(128) NOT NULL,
+                source_version NUMBER NOT NULL,
+                rows_loaded NUMBER,
+                load_started TIMESTAMP WITH TIME ZONE,
+                load_completed TIMESTAMP WITH TIME ZONE,
+                status VARCHAR2(20)
+            )
+        """)
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        # ORA-00955: name is already used by an existing object
+        if error.code != 955:
+            raise
+
+
+def ensure_reject_table(cursor, reject_table):
+    """
+    Create the quarantine table for rows Oracle rejected, if it does not exist yet
+    """
+    import oracledb
+
+    try:
+        cursor.execute(f"""
+            CREATE TABLE {reject_table} (
+                source_name VARCHAR2(400) NOT NULL,
+                target_table VARCHAR2(128) NOT NULL,
+                load_started TIMESTAMP WITH TIME ZONE,
+                source_offset NUMBER,
+                error_code NUMBER,
+                error_message VARCHAR2(4000),
+                row_data CLOB
+            )
+        """)
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        # ORA-00955: name is already used by an existing object
+        if error.code != 955:
+            raise
+
+
+class RejectLimitExceeded(RuntimeError):
+    def __init__(self, message, rejects):
+        super().__init__(message)
+        self.rejects = rejects
+
+
+class RejectLog:
+    """
+    Inserts batches with batch errors enabled and quarantines the rejected
+    rows in the reject table, keyed by load and source offset
+    """
+
+    def __init__(self, cursor, reject_table, source_name, target_table, load_started,
+                 limit=0, sample_size=5):
+        self.cursor = cursor
+        self.reject_table = reject_table
+        self.source_name = source_name
+        self.target_table = target_table
+        self.load_started = load_started
+        self.limit = limit
+        self.sample_size = sample_size
+        self.count = 0
+        self.sample = []
+        self._pending = []
+        self.batch_errors = []
+        self.parent = None
+        self._lock = threading.Lock()
+
+    def fork(self, cursor):
+        """
+        A log writing through another connection's cursor, for a loader
+        thread. Its committed rejects are counted in this log.
+        """
+        log = RejectLog(cursor, self.reject_table, self.source_name, self.target_table,
+                        self.load_started, None, self.sample_size)
+        log.parent = self
+        return log
+
+    def insert_batch(self, insert_sql, batch, offset, offsets=None):
+        """
+        executemany the batch; offset is the source position of batch[0],
+        or offsets lists the source position of every row. Returns the
+        number of rows inserted. The caller commits, then calls
+        batch_committed (or batch_failed when the transaction was lost).
+        """
+        self._pending = []
+        self.cursor.executemany(insert_sql, batch, batcherrors=True)
+        errors = self.cursor.getbatcherrors()
+        # Batch positions of the rejected rows
+        self.batch_errors = [error.offset for error in errors]
+        if not errors:
+            return len(batch)
+
+        self._write([
+            (offsets[error.offset] if offsets else offset + error.offset,
+             error.code, error.message, batch[error.offset])
+            for error in errors
+        ])
+        return len(batch) - len(errors)
+
+    def quarantine(self, rejected):
+        """
+        Record rows rejected before insert, as (offset, code, message, row).
+        The caller commits and calls batch_committed.
+        """
+        self._pending = []
+        self._write(rejected)
+
+    def _write(self, rejected):
+        self.cursor.executemany(f"""
+            INSERT INTO {self.reject_table}
+                (source_name, target_table, load_started, source_offset,
+                 error_code, error_message, row_data)
+            VALUES (:1, :2, :3, :4, :5, :6, :7)
+        """, [
+            [self.source_name, self.target_table, self.load_started, row_offset,
+             code, message[:4000], json.dumps(list(row), default=str)]
+            for row_offset, code, message, row in rejected
+        ])
+        for row_offset, code, message, _ in rejected:
+            self._pending.append({"offset": row_offset, "code": code, "message": message})
+
+    def batch_committed(self):
+        log = self.parent or self
+        with log._lock:
+            log.count += len(self._pending)
+            log.sample.extend(self._pending[:log.sample_size - len(log.sample)])
+        self._pending = []
+
+    def batch_failed(self):
+        self._pending = []
+
+    def recover_batch(self, start_offset, end_offset):
+        """
+        Count the rejects of a batch that turned out to be committed although
+        its commit raised, from the source offsets it spans (pre-flight
+        rejects are committed on their own and not counted).
+        Returns the number of rejected rows.
+        """
+        self.cursor.execute(f"""
+            SELECT COUNT(*) FROM {self.reject_table}
+            WHERE source_name = :1 AND target_table = :2 AND load_started = :3
+              AND source_offset >= :4 AND source_offset < :5
+              AND error_message NOT LIKE '{PREFLIGHT_PREFIX}%'
+        """, [self.source_name, self.target_table, self.load_started, start_offset, end_offset])
+        rejected = self.cursor.fetchone()[0]
+        self.count += rejected
+        return rejected
+
+    def check_limit(self):
+        if self.limit is not None and self.count > self.limit:
+            raise RejectLimitExceeded(
+                f"{self.count} rows rejected, more than reject_limit {self.limit}; see {self.reject_table}",
+                self.summary()
+            )
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "limit": self.limit,
+            "table": self.reject_table,
+            "sample": self.sample
+        }
+
+
+def get_last_loaded_version(cursor, control_table, source_name, target_table):
+    """
+    Return the most recent successful full load for source/target, or None
+    """
+    cursor.execute(f"""
+        SELECT source_version, rows_loaded, load_completed
+        FROM {control_table}
+        WHERE source_name = :1 AND target_table = :2 AND status = 'SUCCESS'
+        ORDER BY load_completed DESC
+        FETCH FIRST 1 ROWS ONLY
+    """, [source_name, target_table])
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {
+        "source_version": int(row[0]),
+        "rows_loaded": row[1],
+        "load_completed": row[2].isoformat() if row[2] else None
+    }
+
+
+def start_load(cursor, control_table, source_name, target_table, source_version, load_started):
+    """
+    Append a RUNNING record for a load to the control table (caller commits).
+    While the load runs, rows_loaded is its checkpoint: the number of source
+    rows committed so far, inserted or rejected.
+    """
+    cursor.execute(f"""
+        INSERT INTO {control_table}
+            (source_name, target_table, source_version, rows_loaded, load_started, status)
+        VALUES (:1, :2, :3, 0, :4, 'RUNNING')
+    """, [source_name, target_table, source_version, load_started])
+
+
+def checkpoint_statement(control_table, source_name, target_table, load_started, rows_committed):
+    """
+    Return the (sql, parameters) advancing a running load's checkpoint
+    """
+    return f"""
+        UPDATE {control_table} SET rows_loaded = :1
+        WHERE source_name = :2 AND target_table = :3 AND load_started = :4
+    """, [rows_committed, source_name, target_table, load_started]
+
+
+def checkpoint_load(cursor, control_table, source_name, target_table, load_started, rows_committed):
+    """
+    Advance a running load's checkpoint, in the transaction of the batch it covers
+    """
+    cursor.execute(*checkpoint_statement(control_table, source_name, target_table, load_started, rows_committed))
+
+
+def get_load_checkpoint(cursor, control_table, source_name, target_table, load_started):
+    cursor.execute(f"""
+        SELECT rows_loaded FROM {control_table}
+        WHERE source_name = :1 AND target_table = :2 AND load_started = :3
+    """, [source_name, target_table, load_started])
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def record_load(cursor, control_table, source_name, target_table, source_version,
+                rows_loaded, load_started, status):
+    """
+    Complete the load's control table record (caller commits)
+    """
+    cursor.execute(f"""
+        UPDATE {control_table}
+        SET source_version = :1, rows_loaded = :2, load_completed = :3, status = :4
+        WHERE source_name = :5 AND target_table = :6 AND load_started = :7
+    """, [source_version, rows_loaded, datetime.now(timezone.utc), status,
+          source_name, target_table, load_started])
+
+
+def get_load_history(cursor, control_table, source_name, runs=PLAN_HISTORY_RUNS):
+    """
+    Return the load rate of the source's last completed runs in the control
+    table, or of any source's when it has none: {"rows_per_second", "runs",
+    "scope"}, None without any or without a control table. Coordinator runs
+    are left out (their rate is that of all their workers); their shards count.
+    """
+    import oracledb
+
+    for scope, source_filter, parameters in (("source", "AND c.source_name = :1", [source_name]),
+                                             ("all", "", [])):
+        try:
+            cursor.execute(f"""
+                SELECT c.rows_loaded, c.load_started, c.load_completed
+                FROM {control_table} c
+                WHERE c.status IN ('SUCCESS', 'PARTIAL', 'SHARD') AND c.rows_loaded > 0
+                  AND c.load_completed IS NOT NULL {source_filter}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM {control_table} s
+                      WHERE c.status != 'SHARD' AND s.status = 'SHARD' AND s.source_name = c.source_name
+                        AND s.load_started BETWEEN c.load_started AND c.load_completed)
+                ORDER BY c.load_completed DESC
+                FETCH FIRST {int(runs)} ROWS ONLY
+            """, parameters)
+        except oracledb.DatabaseError as e:
+            error, = e.args
+            # ORA-00942: table or view does not exist
+            if error.code == 942:
+                return None
+            raise
+        loads = cursor.fetchall()
+        seconds = sum((completed - started).total_seconds() for _, started, completed in loads)
+        if loads and seconds > 0:
+            # Weighted by run length, so short test runs and their fixed costs count little
+            return {
+                "rows_per_second": round(sum(row[0] for row in loads) / seconds, 1),
+                "runs": len(loads),
+                "scope": scope
+            }
+    return None
+
+
+def ensure_progress_table(cursor, progress_table):
+    """
+    Create the progress table if it does not exist yet: one row per run,
+    rewritten while the run is going
+    """
+    import oracledb
+
+    try:
+        cursor.execute(f"""
+            CREATE TABLE {progress_table} (
+                run_id VARCHAR2(200) PRIMARY KEY,
+                source_name VARCHAR2(400),
+                target_table VARCHAR2(128),
+                status VARCHAR2(20),
+                rows_committed NUMBER,
+                rows_total NUMBER,
+                rows_per_second NUMBER,
+                files_done NUMBER,
+                files_total NUMBER,
+                current_file VARCHAR2(1000),
+                eta_seconds NUMBER,
+                started_at TIMESTAMP WITH TIME ZONE,
+                updated_at TIMESTAMP WITH TIME ZONE
+            )
+        """)
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        # ORA-00955: name is already used by an existing object
+        if error.code != 955:
+            raise
+
+
+def write_progress(cursor, progress_table, progress):
+    """
+    Upsert a run's progress row (caller commits)
+    """
+    cursor.execute(f"""
+        MERGE INTO {progress_table} p
+        USING (SELECT :run_id AS run_id FROM dual) s ON (p.run_id = s.run_id)
+        WHEN MATCHED THEN UPDATE SET
+            status = :status, rows_committed = :rows_committed, rows_total = :rows_total,
+            rows_per_second = :rows_per_second, files_done = :files_done, files_total = :files_total,
+            current_file = :current_file, eta_seconds = :eta_seconds, updated_at = :updated_at
+        WHEN NOT MATCHED THEN INSERT
+            (run_id, source_name, target_table, status, rows_committed, rows_total, rows_per_second,
+             files_done, files_total, current_file, eta_seconds, started_at, updated_at)
+        VALUES
+            (:run_id, :source_name, :target_table, :status, :rows_committed, :rows_total, :rows_per_second,
+             :files_done, :files_total, :current_file, :eta_seconds, :started_at, :updated_at)
+    """, progress)
+
+
+def get_progress(cursor, progress_table, run_id):
+    """
+    Return the progress rows of a run and of its coordinator's workers
+    ("<run_id>:<shard>"), [] without a progress table
+    """
+    import oracledb
+
+    try:
+        cursor.execute(f"""
+            SELECT run_id, status, rows_committed, rows_total, rows_per_second,
+                   files_done, files_total, current_file, eta_seconds, started_at, updated_at
+            FROM {progress_table}
+            WHERE run_id = :1 OR run_id LIKE :2
+            ORDER BY run_id
+        """, [run_id, f"{run_id}:%"])
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        # ORA-00942: table or view does not exist
+        if error.code == 942:
+            return []
+        raise
+    columns = [d[0].lower() for d in cursor.description]
+    return [{column: value.isoformat() if isinstance(value, datetime) else value
+             for column, value in zip(columns, row)} for row in cursor.fetchall()]
+
+
+class ProgressReporter:
+    """
+    Publishes a run's progress to the progress table every `interval`
+    seconds from a background thread with its own connection. counters()
+    returns {"rows_committed", "files_done", "bytes_done", "current_file"}
+    and only reads what the load already tracks, so the load path never
+    waits on a progress write. Failed writes are logged and skipped.
+    """
+
+    def __init__(self, connect, progress_table, run_id, source_name, target_table, counters,
+                 interval=DEFAULT_PROGRESS_INTERVAL, rows_total=None, files_total=None, bytes_total=None):
+        self.connect = connect
+        self.progress_table = progress_table
+        self.counters = counters
+        self.interval = interval
+        self.rows_total = rows_total
+        self.files_total = files_total
+        self.bytes_total = bytes_total
+        self.row = {"run_id": run_id, "source_name": source_name, "target_table": target_table,
+                    "started_at": datetime.now(timezone.utc)}
+        self.writes = 0
+        self._started = time.perf_counter()
+        self._connection = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def snapshot(self, status):
+        counters = self.counters()
+        elapsed = time.perf_counter() - self._started
+        rows = counters["rows_committed"]
+        rate = rows / elapsed if elapsed > 0 else 0.0
+
+        # From the remaining rows when the file statistics have row counts,
+        # otherwise from the share of bytes scanned
+        eta = None
+        if status == "RUNNING":
+            if self.rows_total is not None and rate > 0:
+                eta = max(0.0, (self.rows_total - rows) / rate)
+            elif self.bytes_total and counters["bytes_done"]:
+                eta = elapsed * (self.bytes_total - counters["bytes_done"]) / counters["bytes_done"]
+        elif status == "SUCCESS":
+            eta = 0.0
+
+        return dict(
+            self.row,
+            status=status,
+            rows_committed=rows,
+            rows_total=self.rows_total,
+            rows_per_second=round(rate, 1),
+            files_done=counters["files_done"],
+            files_total=self.files_total,
+            current_file=counters["current_file"],
+            eta_seconds=round(eta, 1) if eta is not None else None,
+            updated_at=datetime.now(timezone.utc)
+        )
+
+    def _write(self, status):
+        try:
+            if self._connection is None:
+                self._connection = self.connect()
+                ensure_progress_table(self._connection.cursor(), self.progress_table)
+            with self._connection.cursor() as cursor:
+                write_progress(cursor, self.progress_table, self.snapshot(status))
+            self._connection.commit()
+            self.writes += 1
+        except Exception as e:
+            logging.getLogger().warning(f"Could not write progress for run {self.row['run_id']}: {e}")
+            self._close()
+
+    def _close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def _run(self):
+        self._write("RUNNING")
+        while not self._stopped.wait(self.interval):
+            self._write("RUNNING")
+
+    def finish(self, status):
+        """
+        Stop the heartbeat and write the run's final state
+        """
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._write(status)
+        self._close()
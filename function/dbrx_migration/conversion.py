@@ -0,0 +1,264 @@
+"""
+Arrow helpers: Delta to Arrow types, compaction of loaded tables and
+conversion of Arrow tables to bind tuples
+"""
+import os
+import threading
+import time
+from collections import deque
+
+
+# Conversion process pools by worker count, kept across invocations of a
+# warm container and shared by concurrent loads (local shard workers)
+_conversion_pools = {}
+_conversion_pools_lock = threading.Lock()
+
+
+def delta_to_arrow_type(delta_type):
+    """
+    Map a primitive Delta schema type to an Arrow type (None for complex types)
+    """
+    import pyarrow as pa
+
+    if not isinstance(delta_type, str):
+        return None
+    if delta_type.startswith("decimal"):
+        precision, scale = delta_type[delta_type.index("(") + 1:-1].split(",")
+        return pa.decimal128(int(precision), int(scale))
+    return {
+        "string": pa.string(),
+        "long": pa.int64(),
+        "integer": pa.int32(),
+        "short": pa.int16(),
+        "byte": pa.int8(),
+        "float": pa.float32(),
+        "double": pa.float64(),
+        "boolean": pa.bool_(),
+        "binary": pa.binary(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "timestamp_ntz": pa.timestamp("us")
+    }.get(delta_type)
+
+
+# Dictionary columns with more distinct values than this share of their
+# rows are not worth keeping encoded
+MAX_DICTIONARY_RATIO = 0.5
+
+
+def _plain_string_bytes(column):
+    """
+    Arrow size of a dictionary string column once decoded (offsets, data
+    and validity), computed from the dictionary without decoding it
+    """
+    import pyarrow.compute as pc
+
+    total = 0
+    for chunk in column.chunks:
+        lengths = pc.binary_length(chunk.dictionary).take(chunk.indices)
+        total += (pc.sum(lengths).as_py() or 0) + 4 * (len(chunk) + 1) + (len(chunk) + 7) // 8
+    return total
+
+
+def compact_table(arrow_table):
+    """
+    Keep low-cardinality strings dictionary-encoded (decoding the ones
+    that are not) and downcast integer columns to the narrowest type that
+    holds their values, losslessly. Values are expanded to Python objects
+    only when a batch is bound. Returns (table, bytes saved).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    saved = 0
+    for index, field in enumerate(arrow_table.schema):
+        column = arrow_table.column(index)
+        if pa.types.is_dictionary(field.type):
+            distinct = max((len(chunk.dictionary) for chunk in column.chunks), default=0)
+            if distinct > MAX_DICTIONARY_RATIO * max(1, len(column)):
+                column = column.cast(field.type.value_type)
+            else:
+                # Narrowest index type for the dictionary size
+                index_type = pa.int8() if distinct <= 127 else pa.int16() if distinct <= 32767 else field.type.index_type
+                if index_type.bit_width < field.type.index_type.bit_width:
+                    column = column.cast(pa.dictionary(index_type, field.type.value_type))
+                saved += _plain_string_bytes(column) - column.nbytes
+        elif pa.types.is_integer(field.type) and field.type.bit_width > 8 and column.null_count < len(column):
+            bounds = pc.min_max(column).as_py()
+            for narrow in (pa.int8(), pa.int16(), pa.int32()):
+                if narrow.bit_width >= field.type.bit_width:
+                    break
+                info = 2 ** (narrow.bit_width - 1)
+                if -info <= bounds["min"] and bounds["max"] < info:
+                    before = column.nbytes
+                    column = column.cast(narrow)
+                    saved += before - column.nbytes
+                    break
+            else:
+                continue
+        else:
+            continue
+        arrow_table = arrow_table.set_column(index, field.name, column)
+    return arrow_table, saved
+
+
+def concat_compact_tables(tables):
+    """
+    Concatenate tables compacted separately, whose integer and dictionary
+    index widths may differ: such columns are cast to the widest integer,
+    or to int32-indexed dictionaries (plain strings if any table decoded it)
+    """
+    import pyarrow as pa
+
+    schema = tables[0].schema
+    if all(table.schema.equals(schema) for table in tables[1:]):
+        return pa.concat_tables(tables)
+
+    fields = []
+    for index, field in enumerate(schema):
+        types = [table.schema.field(index).type for table in tables]
+        arrow_type = types[0]
+        if any(t != arrow_type for t in types):
+            if all(pa.types.is_integer(t) for t in types):
+                arrow_type = max(types, key=lambda t: t.bit_width)
+            elif all(pa.types.is_dictionary(t) for t in types):
+                arrow_type = pa.dictionary(pa.int32(), arrow_type.value_type)
+            else:
+                arrow_type = next(t.value_type if pa.types.is_dictionary(t) else t for t in types
+                                  if not pa.types.is_dictionary(t))
+        fields.append(pa.field(field.name, arrow_type))
+    unified = pa.schema(fields)
+    return pa.concat_tables([table.cast(unified) for table in tables])
+
+
+def arrow_to_rows(arrow_table):
+    """
+    Convert an Arrow table into bind tuples for executemany, column by
+    column. Booleans become 1/0 for NUMBER(1) and nulls become None.
+    """
+    import pyarrow as pa
+
+    columns = []
+    for column in arrow_table.columns:
+        if pa.types.is_boolean(column.type):
+            column = column.cast(pa.int8())
+        columns.append(column.to_pylist())
+    return list(zip(*columns))
+
+
+def available_cpus():
+    """
+    CPUs this process may run on (the container's share, not the host's)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_conversion_pool(workers):
+    """
+    Return the container's conversion process pool of `workers` processes,
+    created on first use. Pools are shared and never shut down here, as
+    another load may be using them. Workers are forked when this is the
+    only thread (forking a threaded process can copy a held lock into the
+    child) and started with forkserver or spawn otherwise; they are all
+    started right away.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _conversion_pools_lock:
+        pool = _conversion_pools.get(workers)
+        if pool is None:
+            if threading.active_count() == 1:
+                method = "fork"
+            elif "forkserver" in multiprocessing.get_all_start_methods():
+                method = "forkserver"
+            else:
+                method = "spawn"
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            for future in [pool.submit(os.getpid) for _ in range(workers)]:
+                future.result()
+            _conversion_pools[workers] = pool
+        return pool
+
+
+def _table_to_ipc(arrow_table):
+    import pyarrow as pa
+
+    # IPC writes only the slice's rows; pickling a slice may copy its parent's buffers
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue()
+
+
+def _rows_from_ipc(buffer):
+    import pyarrow as pa
+
+    return arrow_to_rows(pa.ipc.open_stream(buffer).read_all())
+
+
+class ConversionPipeline:
+    """
+    Converts Arrow tables into bind rows, chunk_rows at a time, in a
+    process pool while the caller inserts the chunks converted before.
+    At most max_pending chunks are in flight, so memory stays bounded
+    however far the inserts fall behind. Without a pool, chunks are
+    converted inline. `stats` reports the chunks converted and the time
+    spent waiting for them.
+    """
+
+    def __init__(self, chunk_rows, pool=None, max_pending=None):
+        self.chunk_rows = chunk_rows
+        self.pool = pool
+        self.max_pending = max_pending or 2 * (pool._max_workers if pool is not None else 1)
+        self.stats = {"workers": pool._max_workers if pool is not None else 0, "chunks": 0, "wait_seconds": 0.0}
+
+    def _chunks(self, tables):
+        for arrow_table, offsets in tables:
+            for start in range(0, arrow_table.num_rows, self.chunk_rows):
+                chunk_offsets = offsets[start:start + self.chunk_rows] if offsets is not None else None
+                yield arrow_table.slice(start, self.chunk_rows), chunk_offsets
+
+    def iter(self, tables):
+        """
+        Yield (rows, offsets) for each chunk of the (arrow_table, offsets)
+        pairs in order; offsets may be None
+        """
+        chunks = self._chunks(tables)
+        if self.pool is None:
+            for chunk, offsets in chunks:
+                self.stats["chunks"] += 1
+                yield arrow_to_rows(chunk), offsets
+            return
+
+        from concurrent.futures.process import BrokenProcessPool
+
+        pending = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.max_pending:
+                chunk, offsets = next(chunks, (None, None))
+                if chunk is None:
+                    exhausted = True
+                else:
+                    pending.append((self.pool.submit(_rows_from_ipc, _table_to_ipc(chunk)), offsets))
+            if not pending:
+                return
+            future, offsets = pending.popleft()
+            waited = time.perf_counter()
+            try:
+                rows = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a new pool next time
+                with _conversion_pools_lock:
+                    if _conversion_pools.get(self.pool._max_workers) is self.pool:
+                        del _conversion_pools[self.pool._max_workers]
+                raise
+            self.stats["wait_seconds"] += time.perf_counter() - waited
+            self.stats["chunks"] += 1
+            yield rows, offsets
+
+    def summary(self):
+        return dict(self.stats, wait_seconds=round(self.stats["wait_seconds"], 3))
@@ -0,0 +1,272 @@
+"""
+Export of ATP tables or queries to Parquet files in Object Storage
+"""
+import os
+
+from .retry import RetryPolicy
+
+
+# Export mode: target Parquet file size and rows per Arrow fetch batch
+DEFAULT_EXPORT_FILE_BYTES = 128 * 1024 * 1024
+DEFAULT_EXPORT_BATCH_ROWS = 50000
+EXPORT_SPLITS = ("rowid", "key")
+
+
+def fetch_arrow_batches(connection, sql, parameters=None, batch_rows=DEFAULT_EXPORT_BATCH_ROWS):
+    """
+    Yield the query's rows as Arrow tables of up to batch_rows rows, fetched
+    with python-oracledb's DataFrame fetch (batch_rows is the fetch arraysize)
+    """
+    import pyarrow as pa
+
+    for odf in connection.fetch_df_batches(statement=sql, parameters=parameters, size=batch_rows):
+        if hasattr(odf, "__arrow_c_stream__"):
+            yield pa.table(odf)
+        else:
+            # python-oracledb 3.0 only exposes the columns as Arrow arrays
+            yield pa.Table.from_arrays(
+                [pa.array(column) for column in odf.column_arrays()], names=odf.column_names()
+            )
+
+
+class ParquetFileSink:
+    """
+    Writes Arrow tables to a sequence of Parquet files, starting a new file
+    once the current one reaches file_bytes. With a pre-authenticated
+    request URL (https://...) as output_uri each file is staged in /tmp,
+    uploaded with PUT and deleted; otherwise output_uri is a local directory.
+    """
+
+    def __init__(self, output_uri, prefix, file_bytes=DEFAULT_EXPORT_FILE_BYTES, retry=None):
+        self.output_uri = output_uri
+        self.remote = output_uri.startswith(("https://", "http://"))
+        self.prefix = prefix
+        self.file_bytes = file_bytes
+        self.retry = retry or RetryPolicy()
+        self.files = []
+        self._writer = None
+        self._sink = None
+        self._path = None
+        self._rows = 0
+
+    def _open(self, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        name = f"{self.prefix}-{len(self.files):05d}.parquet"
+        directory = "/tmp" if self.remote else self.output_uri
+        os.makedirs(directory, exist_ok=True)
+        self._path = os.path.join(directory, name)
+        self._sink = pa.OSFile(self._path, "wb")
+        self._writer = pq.ParquetWriter(self._sink, schema, compression="snappy")
+        self._rows = 0
+
+    def write(self, arrow_table):
+        if self._writer is None:
+            self._open(arrow_table.schema)
+        elif arrow_table.schema != self._writer.schema:
+            arrow_table = arrow_table.cast(self._writer.schema)
+        self._writer.write_table(arrow_table)
+        self._rows += arrow_table.num_rows
+        if self._sink.tell() >= self.file_bytes:
+            self._finish_file()
+
+    def _finish_file(self):
+        self._writer.close()
+        self._sink.close()
+        name = os.path.basename(self._path)
+        size = os.path.getsize(self._path)
+        if self.remote:
+            self.retry.call(lambda: self._upload(name))
+            os.remove(self._path)
+        self.files.append({"name": name, "rows": self._rows, "bytes": size})
+        self._writer = None
+
+    def _upload(self, name):
+        import requests
+
+        with open(self._path, "rb") as f:
+            resp = requests.put(self.output_uri.rstrip("/") + "/" + name, data=f, timeout=300)
+        resp.raise_for_status()
+
+    def close(self):
+        if self._writer is not None:
+            self._finish_file()
+
+
+def current_scn(cursor):
+    """
+    Return the database's current SCN, which split exports read the table as of
+    """
+    cursor.execute("SELECT CURRENT_SCN FROM V$DATABASE")
+    return cursor.fetchone()[0]
+
+
+def rowid_ranges(cursor, table_name, split_count):
+    """
+    Split a table into split_count lists of ROWID ranges, one range per
+    extent, balanced by blocks. Taken right after the SCN the splits read
+    as of, so rows committed by then lie in the extents listed.
+    """
+    cursor.execute("""
+        SELECT DBMS_ROWID.ROWID_CREATE(1, o.data_object_id, e.relative_fno, e.block_id, 0),
+               DBMS_ROWID.ROWID_CREATE(1, o.data_object_id, e.relative_fno, e.block_id + e.blocks - 1, 32767),
+               e.blocks
+        FROM user_extents e
+        JOIN user_objects o
+          ON o.object_name = e.segment_name
+         AND NVL(o.subobject_name, '-') = NVL(e.partition_name, '-')
+        WHERE e.segment_name = :1 AND o.object_type IN ('TABLE', 'TABLE PARTITION')
+        ORDER BY e.relative_fno, e.block_id
+    """, [table_name.upper()])
+    extents = cursor.fetchall()
+
+    splits = [[] for _ in range(split_count)]
+    blocks = [0] * split_count
+    for low, high, extent_blocks in sorted(extents, key=lambda extent: -extent[2]):
+        split = min(range(split_count), key=lambda i: (blocks[i], i))
+        splits[split].append((low, high))
+        blocks[split] += extent_blocks
+    return [split for split in splits if split]
+
+
+def key_range_bounds(cursor, table_name, key_column, split_count, scn=None, where=None):
+    """
+    Return the sorted lower bounds of about split_count key ranges of
+    similar row counts (non-NULL keys only), as of scn when given
+    """
+    filter_clause = f"WHERE {where}" if where else ""
+    as_of = ""
+    parameters = {"buckets": split_count}
+    if scn is not None:
+        as_of = "AS OF SCN :scn "
+        parameters["scn"] = scn
+    cursor.execute(f"""
+        SELECT MIN({key_column}) FROM (
+            SELECT {key_column}, NTILE(:buckets) OVER (ORDER BY {key_column}) AS bucket
+            FROM {table_name} {as_of}{filter_clause}
+        )
+        WHERE {key_column} IS NOT NULL
+        GROUP BY bucket
+        ORDER BY 1
+    """, parameters)
+    # Duplicate keys can straddle buckets; half-open ranges keep them in one
+    return sorted({row[0] for row in cursor.fetchall()})
+
+
+def key_ranges(cursor, table_name, key_column, split_count, scn, where=None):
+    """
+    Split a table, as of scn, into about split_count key ranges of similar
+    row counts. Returns (condition, parameters) per range; NULL keys go to
+    the first.
+    """
+    bounds = key_range_bounds(cursor, table_name, key_column, split_count, scn, where)
+    if not bounds:
+        return [("1 = 1", [])]
+
+    ranges = []
+    for i, low in enumerate(bounds):
+        if i + 1 < len(bounds):
+            condition, parameters = f"{key_column} >= :lo AND {key_column} < :hi", {"lo": low, "hi": bounds[i + 1]}
+        else:
+            condition, parameters = f"{key_column} >= :lo", {"lo": low}
+        if i == 0:
+            condition = f"({condition} OR {key_column} IS NULL)"
+        ranges.append((condition, parameters))
+    return ranges
+
+
+def export_to_parquet(connect, output_uri, table_name=None, query=None, columns=None, where=None,
+                      file_bytes=DEFAULT_EXPORT_FILE_BYTES, batch_rows=DEFAULT_EXPORT_BATCH_ROWS,
+                      parallel=1, split=None, split_column=None, retry=None):
+    """
+    Export a table (or a query) from ATP to Parquet files under output_uri.
+
+    connect() returns a new Oracle connection; with split ("rowid" or "key",
+    tables only) the table is divided into `parallel` parts exported
+    concurrently, each on its own connection and into its own files. The
+    parts are computed and read as of one SCN, so together they are a
+    consistent snapshot of the table.
+    Returns {"rows_exported", "bytes_written", "files", "splits", "scn"}.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    retry = retry or RetryPolicy()
+    scn = None
+    if query is not None:
+        base_sql, conditions = query, [[("", None)]]
+    else:
+        select_list = ", ".join(columns) if columns else "*"
+        base_sql = f"SELECT {select_list} FROM {table_name}"
+        conditions = [[(where, None)]] if where else [[("", None)]]
+
+        if split and parallel > 1:
+            connection = retry.call(connect)
+            try:
+                cursor = connection.cursor()
+                scn = current_scn(cursor)
+                if split == "rowid":
+                    conditions = [
+                        [("ROWID BETWEEN :lo AND :hi", {"lo": low, "hi": high}) for low, high in ranges]
+                        for ranges in rowid_ranges(cursor, table_name, parallel)
+                    ]
+                else:
+                    conditions = [[key_range] for key_range in key_ranges(
+                        cursor, table_name, split_column, parallel, scn, where
+                    )]
+            finally:
+                connection.close()
+            if where:
+                conditions = [
+                    [(f"({where}) AND {condition}", parameters) for condition, parameters in split_conditions]
+                    for split_conditions in conditions
+                ]
+            # Every split reads the table as of the SCN its range was computed at
+            base_sql = f"SELECT {select_list} FROM {table_name} AS OF SCN :scn"
+            conditions = [
+                [(condition, dict(parameters or {}, scn=scn)) for condition, parameters in split_conditions]
+                for split_conditions in conditions
+            ]
+
+    def export_split(index):
+        sink = ParquetFileSink(output_uri, f"part-{index:03d}", file_bytes, retry)
+        connection = retry.call(connect)
+        rows = 0
+        try:
+            for condition, parameters in conditions[index]:
+                sql = f"{base_sql} WHERE {condition}" if condition else base_sql
+                for arrow_table in fetch_arrow_batches(connection, sql, parameters, batch_rows):
+                    sink.write(arrow_table)
+                    rows += arrow_table.num_rows
+            sink.close()
+        finally:
+            connection.close()
+        return rows, sink.files
+
+    with ThreadPoolExecutor(max_workers=max(1, len(conditions))) as pool:
+        results = list(pool.map(export_split, range(len(conditions))))
+
+    files = [file_info for _, split_files in results for file_info in split_files]
+    return {
+        "rows_exported": sum(rows for rows, _ in results),
+        "bytes_written": sum(file_info["bytes"] for file_info in files),
+        "files": files,
+        "splits": len(conditions),
+        "scn": scn
+    }
+
+
+def export_request(body, connect, retry=None):
+    """
+    Run the export a function request in "mode": "export" describes
+    (see func.handler for the parameters)
+    """
+    return export_to_parquet(
+        connect, body["output_uri"],
+        table_name=body.get("export_table"), query=body.get("export_query"),
+        columns=body.get("columns"), where=body.get("export_where"),
+        file_bytes=int(float(body.get("file_size_mb", DEFAULT_EXPORT_FILE_BYTES / 1048576)) * 1048576),
+        batch_rows=int(body.get("fetch_rows", DEFAULT_EXPORT_BATCH_ROWS)),
+        parallel=int(body.get("export_parallel", 1)),
+        split=body.get("export_split"), split_column=body.get("split_column"), retry=retry
+    )
@@ -0,0 +1,413 @@
+"""
+Hash-diff sync: applies only the inserts, updates and deletes found by
+comparing row hashes with the ones stored by the previous sync
+"""
+import logging
+
+from .predicates import _PREDICATE_VALUE_TYPES
+from .conversion import arrow_to_rows, concat_compact_tables, delta_to_arrow_type
+from .loaders import generate_create_table_sql, staging_table_name, table_exists
+from .export import key_range_bounds
+
+
+# Sync strategy: target or source rows per key range compared at a time
+DEFAULT_SYNC_RANGE_ROWS = 500000
+# Bytes of string values hashed at a time; the temporaries take about 40
+# bytes per byte hashed
+DEFAULT_HASH_CHUNK_BYTES = 1 << 20
+
+
+def _mix64(values):
+    """
+    splitmix64 finalizer over a uint64 numpy array (wrapping arithmetic)
+    """
+    import numpy as np
+
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _string_hashes(array, chunk_bytes=DEFAULT_HASH_CHUNK_BYTES):
+    """
+    64-bit hash of every value of a large_string Arrow array, computed over
+    its offsets and data buffers without materializing Python strings. The
+    values are hashed in slices of at most chunk_bytes of string data (or
+    one longer value), so the temporaries stay bounded by the slice.
+    """
+    import numpy as np
+
+    offsets = np.frombuffer(array.buffers()[1], dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+    data = array.buffers()[2]
+    lengths = offsets[1:] - offsets[:-1]
+    hashes = np.zeros(len(array), dtype=np.uint64)
+    start = 0
+    while start < len(array):
+        end = int(np.searchsorted(offsets, offsets[start] + chunk_bytes, side="right")) - 1
+        end = min(max(end, start + 1), len(array))
+        first, last = int(offsets[start]), int(offsets[end])
+        if last > first:
+            chunk_lengths = lengths[start:end]
+            starts = offsets[start:end] - first
+            values = np.frombuffer(data, dtype=np.uint8)[first:last].astype(np.uint64) + np.uint64(1)
+            # Polynomial hash: byte j of a value contributes (byte + 1) * P^(j + 1)
+            powers = np.cumprod(np.full(int(chunk_lengths.max()), 0x100000001B3, dtype=np.uint64))
+            positions = np.arange(last - first, dtype=np.int64) - np.repeat(starts, chunk_lengths)
+            sums = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(values * powers[positions])])
+            hashes[start:end] = sums[starts + chunk_lengths] - sums[starts]
+        start = end
+    hashes = _mix64(hashes ^ lengths.astype(np.uint64))
+    if array.null_count:
+        hashes[np.asarray(array.is_null())] = np.uint64(0x9E3779B97F4A7C15)
+    return hashes
+
+
+def row_hashes(arrow_table, columns):
+    """
+    Return a 64-bit hash (int64 numpy array) of each row's values in
+    columns, vectorized: every column is cast to its Arrow string form and
+    hashed from the buffers, and the column hashes are combined in order.
+    The hash only depends on the values and their Arrow types.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    hashes = np.full(arrow_table.num_rows, 0xCBF29CE484222325, dtype=np.uint64)
+    for name in columns:
+        column = arrow_table.column(name).combine_chunks()
+        if pa.types.is_dictionary(column.type):
+            column = column.dictionary_decode()
+        hashes = _mix64(hashes * np.uint64(31) + _string_hashes(column.cast(pa.large_string())))
+    return hashes.view(np.int64)
+
+
+class HashDiffSync:
+    """
+    Synchronizes a table with the source by row hashes instead of
+    reloading it: a 64-bit hash of every source row's non-key columns
+    (row_hashes) is compared, per key, with the hash stored for the
+    target row in a side table (<table>_HASH) by the previous sync. New
+    keys are inserted, rows whose hash differs updated and target keys
+    missing from the source deleted, each as executemany batches that
+    commit together with their hash rows. Target rows without a stored
+    hash count as changed, so the first sync of an existing table
+    rewrites it once.
+
+    The comparison runs one range of the first key column at a time
+    (bounds from the target's keys), so only a range of the source and of
+    the target's key/hash pairs is held at once. Keys must be unique,
+    non-NULL and round-trip exactly through Oracle (integers, strings,
+    dates). Re-applying a range is idempotent, so a range that fails on a
+    transient error is simply diffed again (see sync_load).
+    """
+
+    def __init__(self, connection, table, fields, keys, batch_size, rejects, compression=None):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.table = table
+        self.fields = fields
+        self.keys = keys
+        self.batch_size = batch_size
+        self.rejects = rejects
+        self.compression = compression
+        self.hash_table = staging_table_name(table, "HASH")
+        self.columns = [field["name"] for field in fields]
+        self.values = [column for column in self.columns if column not in keys]
+        self.stats = {"ranges": 0, "rows_inserted": 0, "rows_updated": 0, "rows_deleted": 0}
+        self._source_offset = 0
+
+    def reconnect(self, connection):
+        """
+        Continue on a new connection after a transient error
+        """
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self.connection = connection
+        self.cursor = self.rejects.cursor = connection.cursor()
+
+    def prepare(self):
+        """
+        Create the target and its hash table if missing
+        """
+        import oracledb
+
+        missing_keys = [key for key in self.keys if key not in self.columns]
+        if missing_keys:
+            raise ValueError(f"merge_keys {missing_keys} are not among the loaded columns")
+        if not table_exists(self.cursor, self.table):
+            logging.getLogger().info(f"Table doesn't exist, creating {self.table}")
+            self.cursor.execute(generate_create_table_sql(self.table, self.fields, self.compression))
+        try:
+            self.cursor.execute(f"""
+                CREATE TABLE {self.hash_table} AS
+                SELECT {', '.join(self.keys)}, CAST(NULL AS NUMBER(19)) AS row_hash
+                FROM {self.table} WHERE 1 = 0
+            """)
+            self.cursor.execute(f"ALTER TABLE {self.hash_table} ADD PRIMARY KEY ({', '.join(self.keys)})")
+            logging.getLogger().info(f"Created hash table {self.hash_table}")
+        except oracledb.DatabaseError as e:
+            error, = e.args
+            # ORA-00955: name is already used by an existing object
+            if error.code != 955:
+                raise
+
+    def ranges(self, range_rows, source_rows=None):
+        """
+        Return [(low, high)] ranges of the first key column (None for open
+        ends) of about range_rows target or source rows each
+        """
+        self.cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+        rows = max(self.cursor.fetchone()[0], source_rows or 0)
+        split_count = max(1, -(-rows // range_rows))
+        bounds = key_range_bounds(self.cursor, self.table, self.keys[0], split_count)[1:] if split_count > 1 else []
+        edges = [None] + bounds + [None]
+        return list(zip(edges[:-1], edges[1:]))
+
+    def source_predicate(self, predicate, low, high):
+        """
+        AND a range of the first key column into a jsonPredicateHints predicate
+        """
+        field = next(field for field in self.fields if field["name"] == self.keys[0])
+        value_type = _PREDICATE_VALUE_TYPES.get(field["type"], "string")
+        children = [predicate] if predicate else []
+        for op, bound in (("greaterThanOrEqual", low), ("lessThan", high)):
+            if bound is not None:
+                value = bound.isoformat() if hasattr(bound, "isoformat") else str(bound)
+                children.append({"op": op, "children": [
+                    {"op": "column", "name": self.keys[0], "valueType": value_type},
+                    {"op": "literal", "value": value, "valueType": value_type}
+                ]})
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else {"op": "and", "children": children}
+
+    def _target_hashes(self, low, high, key_types):
+        """
+        Arrow table of the target's keys in the range with their stored hash
+        (null when none is stored)
+        """
+        import pyarrow as pa
+
+        conditions, parameters = [], []
+        for op, bound in ((">=", low), ("<", high)):
+            if bound is not None:
+                parameters.append(bound)
+                conditions.append(f"t.{self.keys[0]} {op} :{len(parameters)}")
+        on_clause = " AND ".join(f"h.{key} = t.{key}" for key in self.keys)
+        self.cursor.arraysize = max(self.batch_size, 1000)
+        self.cursor.execute(f"""
+            SELECT {', '.join(f't.{key}' for key in self.keys)}, h.row_hash
+            FROM {self.table} t LEFT JOIN {self.hash_table} h ON ({on_clause})
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        """, parameters)
+        chunks = []
+        while True:
+            rows = self.cursor.fetchmany()
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            arrays = [pa.array(values).cast(key_type) for values, key_type in zip(columns, key_types)]
+            arrays.append(pa.array(columns[-1], pa.int64()))
+            chunks.append(pa.Table.from_arrays(arrays, names=self.keys + ["__target_hash"]))
+        if not chunks:
+            return pa.table({**{key: pa.array([], key_type) for key, key_type in zip(self.keys, key_types)},
+                             "__target_hash": pa.array([], pa.int64())})
+        return pa.concat_tables(chunks)
+
+    def source_table(self, tables, low=None, high=None):
+        """
+        Concatenate a range's scanned tables, with the scan's schema when
+        empty, keeping only the rows whose first key is in [low, high): a
+        range's files are chosen by their statistics and may hold keys of
+        other ranges, which the predicate does not always filter out
+        """
+        import datetime
+
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if not tables:
+            return pa.schema([
+                (field["name"], delta_to_arrow_type(field["type"]) or pa.string()) for field in self.fields
+            ]).empty_table()
+        source_table = concat_compact_tables(tables)
+        if self.keys[0] not in source_table.column_names:
+            raise ValueError(f"merge_keys column {self.keys[0]} is not in the scanned data")
+        column = source_table.column(self.keys[0])
+        if pa.types.is_dictionary(column.type):
+            column = column.dictionary_decode()
+        mask = None
+        for compare, bound in ((pc.greater_equal, low), (pc.less, high)):
+            if bound is None:
+                continue
+            if pa.types.is_date(column.type) and isinstance(bound, datetime.datetime):
+                # Oracle returns DATE bounds as datetimes
+                bound = bound.date()
+            condition = compare(column, bound)
+            mask = condition if mask is None else pc.and_(mask, condition)
+        if mask is None:
+            return source_table
+        return source_table.filter(pc.fill_null(mask, False))
+
+    def diff(self, source_table, low=None, high=None):
+        """
+        Compare a range's source rows with the target.
+        Returns (insert positions, update positions, deleted keys table).
+        """
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        # Compacted integer keys are widened, so the target's keys always fit
+        key_columns = []
+        for key in self.keys:
+            column = source_table.column(key)
+            if pa.types.is_dictionary(column.type):
+                column = column.dictionary_decode()
+            if pa.types.is_integer(column.type):
+                column = column.cast(pa.int64())
+            key_columns.append(column)
+        key_types = [column.type for column in key_columns]
+        source_keys = pa.Table.from_arrays(
+            key_columns
+            + [pa.array(np.arange(source_table.num_rows)), pa.array(row_hashes(source_table, self.values))],
+            names=self.keys + ["__row", "__hash"]
+        )
+        target = self._target_hashes(low, high, key_types)
+        target = target.append_column("__present", pa.array(np.ones(target.num_rows, dtype=bool)))
+        joined = source_keys.join(target, self.keys, join_type="full outer")
+
+        present = pc.fill_null(joined.column("__present"), False)
+        in_source = pc.is_valid(joined.column("__row"))
+        changed = pc.fill_null(pc.not_equal(joined.column("__hash"), joined.column("__target_hash")), True)
+        inserts = pc.filter(joined.column("__row"), pc.and_(in_source, pc.invert(present)))
+        updates = pc.filter(joined.column("__row"), pc.and_(in_source, pc.and_(present, changed)))
+        deletes = joined.filter(pc.invert(in_source)).select(self.keys)
+        return np.sort(inserts.to_numpy()), np.sort(updates.to_numpy()), deletes
+
+    def _write(self, sql, binds, rows, hashes, offsets):
+        """
+        executemany a batch's binds with batch errors, then store the hashes
+        of the rows that were written, in the same transaction. Returns the
+        number of rows written.
+        """
+        written = self.rejects.insert_batch(sql, binds, 0, offsets)
+        failed = set(self.rejects.batch_errors)
+        key_positions = [self.columns.index(key) for key in self.keys]
+        hash_rows = [
+            [row[i] for i in key_positions] + [int(row_hash)]
+            for position, (row, row_hash) in enumerate(zip(rows, hashes)) if position not in failed
+        ]
+        if not hash_rows:
+            return written
+        self.cursor.executemany(f"""
+            MERGE INTO {self.hash_table} h
+            USING (SELECT {', '.join(f':{i + 1} AS {key}' for i, key in enumerate(self.keys))},
+                          :{len(self.keys) + 1} AS row_hash FROM dual) s
+            ON ({' AND '.join(f'h.{key} = s.{key}' for key in self.keys)})
+            WHEN MATCHED THEN UPDATE SET h.row_hash = s.row_hash
+            WHEN NOT MATCHED THEN INSERT ({', '.join(self.keys)}, row_hash)
+                VALUES ({', '.join(f's.{key}' for key in self.keys)}, s.row_hash)
+        """, hash_rows)
+        return written
+
+    def apply(self, tables, low=None, high=None):
+        """
+        Diff a range's scanned tables with the target and apply the inserts,
+        updates and deletes, committing each batch
+        """
+        source_table = self.source_table(tables, low, high)
+        inserts, updates, deletes = self.diff(source_table, low, high)
+        hashes = row_hashes(source_table, self.values)
+        placeholders = ", ".join(f":{i + 1}" for i in range(len(self.columns)))
+        insert_sql = f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES ({placeholders})"
+        update_sql = (
+            f"UPDATE {self.table} SET "
+            + ", ".join(f"{column} = :{i + 1}" for i, column in enumerate(self.values))
+            + " WHERE " + " AND ".join(f"{key} = :{len(self.values) + i + 1}" for i, key in enumerate(self.keys))
+        )
+        update_order = [self.columns.index(column) for column in self.values + self.keys]
+        for kind, positions in (("rows_inserted", inserts), ("rows_updated", updates)):
+            for start in range(0, len(positions), self.batch_size):
+                chunk = positions[start:start + self.batch_size]
+                rows = arrow_to_rows(source_table.take(chunk).select(self.columns))
+                offsets = [self._source_offset + int(position) for position in chunk]
+                if kind == "rows_inserted":
+                    count = self._write(insert_sql, rows, rows, hashes[chunk], offsets)
+                else:
+                    binds = [tuple(row[i] for i in update_order) for row in rows]
+                    count = self._write(update_sql, binds, rows, hashes[chunk], offsets)
+                self.connection.commit()
+                self.rejects.batch_committed()
+                self.stats[kind] += count
+                self.rejects.check_limit()
+
+        key_rows = list(zip(*[deletes.column(key).to_pylist() for key in self.keys]))
+        where = " AND ".join(f"{key} = :{i + 1}" for i, key in enumerate(self.keys))
+        for start in range(0, len(key_rows), self.batch_size):
+            chunk = key_rows[start:start + self.batch_size]
+            self.cursor.executemany(f"DELETE FROM {self.table} WHERE {where}", chunk)
+            self.cursor.executemany(f"DELETE FROM {self.hash_table} WHERE {where}", chunk)
+            self.connection.commit()
+            self.stats["rows_deleted"] += len(chunk)
+
+        self._source_offset += source_table.num_rows
+        self.stats["ranges"] += 1
+
+    def rows_written(self):
+        return self.stats["rows_inserted"] + self.stats["rows_updated"]
+
+    def summary(self):
+        # Rows of a range retried after a transient error are only counted once
+        rows_unchanged = self._source_offset - self.rows_written() - self.rejects.count
+        return dict(self.stats, rows_unchanged=rows_unchanged, hash_table=self.hash_table)
+
+
+def sync_load(sync, scan, range_scan, range_rows, connect, retry, start_progress=None):
+    """
+    Sync the target of a prepared HashDiffSync with the scan, one key range
+    at a time. range_scan(predicate) lists a range's files (the scan itself
+    is used when there is one range); a range that fails on a transient
+    error is diffed again on a new connection from connect().
+    start_progress(counters) may return a ProgressReporter.
+    Returns the scan stats summed over the ranges.
+    """
+    logger = logging.getLogger()
+    ranges = sync.ranges(range_rows, scan.estimated_rows())
+    logger.info(f"Syncing {sync.table} in {len(ranges)} key ranges of {sync.keys[0]}")
+    scans = []
+
+    def reconnect(error):
+        logger.warning(f"Transient error syncing a key range, reconnecting: {error}")
+        sync.rejects.batch_failed()
+        sync.reconnect(connect())
+        retry.stats["reconnects"] += 1
+
+    progress = None
+    if start_progress is not None:
+        progress = start_progress(lambda: {
+            "rows_committed": sync.rows_written(),
+            "files_done": sum(listing.stats["files_scanned"] for listing in scans),
+            "bytes_done": sum(listing.stats["bytes_scanned"] for listing in scans),
+            "current_file": scans[-1].current_file if scans else None
+        })
+    status = "FAILED"
+    try:
+        for low, high in ranges:
+            scans.append(scan if len(ranges) == 1 else range_scan(sync.source_predicate(scan.predicate, low, high)))
+            tables = list(scans[-1])
+            retry.call(lambda: sync.apply(tables, low, high), on_retry=reconnect)
+            logger.info(f"Synced range [{low}, {high}): {sync.stats}")
+            tables.clear()
+        status = "SUCCESS"
+    finally:
+        if progress is not None:
+            progress.finish(status)
+
+    scan_stats = {key: sum(listing.stats[key] for listing in scans) for key in scan.stats}
+    scan_stats["files_total"] = scan.stats["files_total"]
+    return scan_stats
@@ -0,0 +1,340 @@
+"""
+Coordinator mode: the invokers that run worker payloads, and the fan-out
+of a prepared load over shard workers. Submitted jobs: the job table, and
+the detached runs that record their outcome in it.
+"""
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from .control import get_progress
+from .sharing import DEFAULT_SHARD_BYTES, default_shard_count
+
+
+DEFAULT_JOB_TABLE = "DBRX_MIGRATION_JOBS"
+
+
+class _LocalContext:
+    """
+    Minimal stand-in for the fdk invoke context, for LocalInvoker
+    """
+
+    def SetResponseHeaders(self, headers, status_code):
+        self.headers = headers
+        self.status_code = status_code
+
+
+class LocalInvoker:
+    """
+    Runs worker payloads through handler() in this process, so coordinator
+    mode and submitted jobs can be tested without deploying
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def __call__(self, payload):
+        resp = self.handler(_LocalContext(), io.BytesIO(json.dumps(payload).encode("utf-8")))
+        return resp.status(), json.loads(resp.body())
+
+    def submit(self, payload):
+        """
+        Start a payload in a background thread and return at once. Only for
+        testing: a deployed function may be frozen once its response is sent.
+        """
+        threading.Thread(target=self, args=(payload,), daemon=True).start()
+
+
+class OciFunctionInvoker:
+    """
+    Invokes worker and job payloads on a deployed function with the OCI SDK,
+    authenticated as the calling function (resource principals)
+    """
+
+    def __init__(self, function_id):
+        import oci
+
+        signer = oci.auth.signers.get_resource_principals_signer()
+        management = oci.functions.FunctionsManagementClient(config={}, signer=signer)
+        endpoint = management.get_function(function_id).data.invoke_endpoint
+        self.client = oci.functions.FunctionsInvokeClient(
+            config={}, signer=signer, service_endpoint=endpoint, timeout=(10, 310)
+        )
+        self.function_id = function_id
+
+    def __call__(self, payload):
+        import oci
+
+        try:
+            resp = self.client.invoke_function(self.function_id, invoke_function_body=json.dumps(payload))
+        except oci.exceptions.ServiceError as e:
+            return e.status, {"status": "error", "error": e.message}
+        return resp.status, json.loads(resp.data.text)
+
+    def submit(self, payload):
+        """
+        Invoke the function detached: OCI Functions accepts the payload and
+        runs it without the caller waiting for the response
+        """
+        self.client.invoke_function(
+            self.function_id, invoke_function_body=json.dumps(payload), fn_invoke_type="detached"
+        )
+
+
+def get_shard_invoker(name, handler, function_id=None):
+    """
+    Return the invoker named by the request; "local" runs handler in-process
+    """
+    if name == "local":
+        return LocalInvoker(handler)
+    if name == "oci":
+        # Fn sets FN_FN_ID to the OCID of the running function
+        function_id = function_id or os.environ.get("FN_FN_ID")
+        if not function_id:
+            raise ValueError("invoker oci requires function_id outside of OCI Functions")
+        return OciFunctionInvoker(function_id)
+    raise ValueError(f"Invalid invoker: {name}, expected 'oci' or 'local'")
+
+
+def run_shards(invoker, payload, shard_count, max_parallel):
+    """
+    Invoke one worker per shard, up to max_parallel at a time.
+    Returns a summary per shard, in shard order.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def invoke(index):
+        started = time.perf_counter()
+        try:
+            status_code, result = invoker(dict(payload, shard_index=index))
+        except Exception as e:
+            status_code, result = None, {"status": "error", "error": str(e), "type": type(e).__name__}
+        result["shard_index"] = index
+        result["status_code"] = status_code
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, shard_count))) as pool:
+        results = list(pool.map(invoke, range(shard_count)))
+
+    shards = []
+    for result in results:
+        shard = {key: result.get(key) for key in (
+            "shard_index", "status", "status_code", "rows_migrated", "error", "seconds"
+        )}
+        shard["result"] = result
+        shards.append(shard)
+    return shards
+
+
+def aggregate_shards(shards, scan_stats, rejects, retry, sample=None):
+    """
+    Fold worker results into the coordinator's scan stats, reject log,
+    retry metrics and sample (the workers read the row groups). Returns
+    the total rows the workers inserted.
+    """
+    rows_inserted = 0
+    for shard in shards:
+        result = shard.pop("result")
+        rows_inserted += result.get("rows_migrated") or 0
+        for key in ("files_scanned", "bytes_scanned", "column_bytes_skipped", "rows_read",
+                    "arrow_bytes", "memory_saved_bytes"):
+            scan_stats[key] += (result.get("scan") or {}).get(key, 0)
+        if sample is not None:
+            for key in ("row_groups_total", "row_groups_sampled"):
+                sample.stats[key] += (result.get("sample") or {}).get(key, 0)
+        shard_rejects = result.get("rejects") or {}
+        rejects.count += shard_rejects.get("count", 0)
+        rejects.sample.extend(shard_rejects.get("sample", [])[:rejects.sample_size - len(rejects.sample)])
+        for key, value in (result.get("retries") or {}).items():
+            retry.stats[key] += value
+    return rows_inserted
+
+
+def coordinate_load(body, files, load_table, table_version, invoker, scan_stats, rejects, retry, sample=None):
+    """
+    Run a prepared load as shard workers, each invoked with the request body
+    plus its shard, the pinned table version and the prepared load table.
+    Worker results are folded into scan_stats, rejects, retry and sample.
+    Returns (rows the workers inserted, one summary per shard).
+    """
+    shard_count = body.get("shard_count") or default_shard_count(
+        files, int(body.get("shard_bytes", DEFAULT_SHARD_BYTES))
+    )
+    worker_payload = dict(
+        body, mode="load", shard_count=shard_count, table_version=table_version,
+        oracle_table_name=load_table,
+        load_mode="pipelined" if body.get("load_mode") == "pipelined" else "conventional"
+    )
+    logging.getLogger().info(f"Invoking {shard_count} workers for {len(files)} files")
+    shards = run_shards(
+        invoker, worker_payload, shard_count, int(body.get("max_parallel_workers") or shard_count)
+    )
+    rows_inserted = aggregate_shards(shards, scan_stats, rejects, retry, sample)
+    failed = [shard for shard in shards if shard["status"] != "success"]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {shard_count} shards failed: {failed}")
+    return rows_inserted, shards
+
+
+def ensure_job_table(cursor, job_table):
+    """
+    Create the job table for submitted runs if it does not exist yet
+    """
+    import oracledb
+
+    try:
+        cursor.execute(f"""
+            CREATE TABLE {job_table} (
+                job_id VARCHAR2(200) PRIMARY KEY,
+                mode VARCHAR2(20),
+                source_name VARCHAR2(400),
+                target_table VARCHAR2(128),
+                status VARCHAR2(20),
+                submitted_at TIMESTAMP WITH TIME ZONE,
+                started_at TIMESTAMP WITH TIME ZONE,
+                completed_at TIMESTAMP WITH TIME ZONE,
+                result CLOB
+            )
+        """)
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        # ORA-00955: name is already used by an existing object
+        if error.code != 955:
+            raise
+
+
+def submit_job(cursor, job_table, job_id, mode, source_name, target_table):
+    """
+    Record a QUEUED job (caller commits)
+    """
+    cursor.execute(f"""
+        INSERT INTO {job_table} (job_id, mode, source_name, target_table, status, submitted_at)
+        VALUES (:1, :2, :3, :4, 'QUEUED', :5)
+    """, [job_id, mode, source_name, target_table, datetime.now(timezone.utc)])
+
+
+def start_job(cursor, job_table, job_id):
+    cursor.execute(f"""
+        UPDATE {job_table} SET status = 'RUNNING', started_at = :1 WHERE job_id = :2
+    """, [datetime.now(timezone.utc), job_id])
+
+
+def complete_job(cursor, job_table, job_id, status, result):
+    """
+    Record a job's final status and its run's response (caller commits)
+    """
+    import oracledb
+
+    cursor.setinputsizes(result=oracledb.DB_TYPE_CLOB)
+    cursor.execute(f"""
+        UPDATE {job_table} SET status = :status, completed_at = :completed_at, result = :result
+        WHERE job_id = :job_id
+    """, {"status": status, "completed_at": datetime.now(timezone.utc),
+          "result": json.dumps(result, default=str), "job_id": job_id})
+
+
+def get_job(cursor, job_table, job_id):
+    """
+    Return a job's row with its run's response parsed, or None
+    """
+    import oracledb
+
+    try:
+        cursor.execute(f"""
+            SELECT job_id, mode, source_name, target_table, status,
+                   submitted_at, started_at, completed_at, result
+            FROM {job_table} WHERE job_id = :1
+        """, [job_id])
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        # ORA-00942: table or view does not exist
+        if error.code == 942:
+            return None
+        raise
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    job = {column: value.isoformat() if isinstance(value, datetime) else value for column, value in zip(
+        ("job_id", "mode", "source", "destination", "status", "submitted_at", "started_at", "completed_at"), row
+    )}
+    result = row[8].read() if hasattr(row[8], "read") else row[8]
+    job["result"] = json.loads(result) if result else None
+    return job
+
+
+def submit_request(body, connect, invoker, job_table, job_id, source_name, target_table):
+    """
+    Record a QUEUED job for the request and invoke it detached under the job
+    id, which is also its run_id. A failed invocation marks the job FAILED.
+    Returns the submitted job.
+    """
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            ensure_job_table(cursor, job_table)
+            submit_job(cursor, job_table, job_id, body.get("mode", "load"), source_name, target_table)
+            conn.commit()
+            try:
+                invoker.submit(dict(body, action="run", job_id=job_id, run_id=job_id))
+            except Exception as e:
+                complete_job(cursor, job_table, job_id, "FAILED",
+                             {"status": "error", "error": str(e), "type": type(e).__name__})
+                conn.commit()
+                raise
+    finally:
+        conn.close()
+    return {"status": "submitted", "job_id": job_id, "run_id": job_id, "mode": body.get("mode", "load"),
+            "source": source_name, "destination": target_table}
+
+
+def job_status(connect, job_table, progress_table, job_id):
+    """
+    Return a job with the progress rows of its run (and of the run's
+    workers), or None for an unknown job
+    """
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            job = get_job(cursor, job_table, job_id)
+            if job is not None:
+                job["progress"] = get_progress(cursor, progress_table, job_id)
+    finally:
+        conn.close()
+    return job
+
+
+def run_job(handler, body, connect, job_table):
+    """
+    Run a submitted job through handler() and record its outcome in the job
+    table; a job that cannot be started is recorded FAILED. The run's id is
+    the job id, so its progress rows are the job's. Returns (HTTP status,
+    response body) of the run.
+    """
+    job_id = body["job_id"]
+    try:
+        conn = connect()
+        try:
+            with conn.cursor() as cursor:
+                start_job(cursor, job_table, job_id)
+            conn.commit()
+        finally:
+            conn.close()
+        status_code, result = LocalInvoker(handler)(dict(body, job_id=None, run_id=job_id))
+    except Exception as e:
+        logging.getLogger().error(f"Job {job_id} could not be run: {e}")
+        status_code, result = 500, {"status": "error", "error": str(e), "type": type(e).__name__}
+
+    status = "FAILED" if result.get("status") == "error" else str(result.get("status")).upper()
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            complete_job(cursor, job_table, job_id, status, result)
+        conn.commit()
+    finally:
+        conn.close()
+    return status_code, result
@@ -0,0 +1,1331 @@
+"""
+Loading into ATP: connections, the DDL of created tables, direct-path
+inserts with deferred indexes, staging tables swapped in by rename or
+merged into the target on its keys, and the steps that prepare a load's
+table and complete the load
+"""
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from .retry import DEFAULT_RETRIES, RetryPolicy
+from .predicates import _constant_array, _int64_array
+from .conversion import ConversionPipeline, arrow_to_rows, concat_compact_tables
+from .control import (
+    DEFAULT_CONTROL_TABLE, DEFAULT_REJECT_TABLE, RejectLimitExceeded, RejectLog, checkpoint_load,
+    ensure_control_table, ensure_reject_table, get_last_loaded_version, get_load_checkpoint, record_load,
+    start_load
+)
+from .preflight import _scalar
+
+
+LOAD_MODES = ("conventional", "direct_path", "pipelined")
+# Pipelined mode: batches (insert, checkpoint and commit each) per pipeline
+DEFAULT_PIPELINE_DEPTH = 4
+
+# Table compression for the Oracle DDL. Basic compression only applies to
+# direct-path (load_mode="direct_path") inserts.
+COMPRESSION_CLAUSES = {
+    "basic": "COMPRESS",
+    "advanced": "ROW STORE COMPRESS ADVANCED"
+}
+# Partitioned targets: interval units for date partition columns, the
+# transition point of interval partitioning (earlier values share the
+# first partition) and the per-partition reload strategies
+PARTITION_INTERVALS = {
+    "day": "NUMTODSINTERVAL(1, 'DAY')",
+    "month": "NUMTOYMINTERVAL(1, 'MONTH')",
+    "year": "NUMTOYMINTERVAL(1, 'YEAR')"
+}
+PARTITION_TRANSITION = date(1970, 1, 1)
+PARTITION_RELOADS = ("truncate", "exchange")
+
+
+def insert_hint(load_mode):
+    """
+    Return the INSERT hint for a load mode. "direct_path" uses APPEND_VALUES,
+    which writes above the high-water mark without undo; each direct-path
+    insert must be committed before the table is used again in the same
+    transaction (ORA-12838), which the batch loops do.
+    """
+    if load_mode not in LOAD_MODES:
+        raise ValueError(f"Invalid load_mode: {load_mode}")
+    return "/*+ APPEND_VALUES */ " if load_mode == "direct_path" else ""
+
+
+def generate_create_table_sql(table_name, fields, compression=None, partitioning=None, nologging=False):
+    """
+    Generate CREATE TABLE SQL from Delta table schema fields
+    (the "fields" list of the table's schemaString), optionally with
+    "basic" or "advanced" table compression and the partitioning of a
+    PartitionSpec
+    """
+    column_definitions = []
+    for field in fields:
+        delta_type = field["type"] if isinstance(field["type"], str) else "complex"
+
+        # Map Delta types to Oracle types
+        if delta_type in ("long", "integer", "short", "byte", "float", "double"):
+            oracle_type = "NUMBER"
+        elif delta_type.startswith("decimal"):
+            oracle_type = "NUMBER" + delta_type[len("decimal"):].replace(" ", "")
+        elif delta_type == "boolean":
+            oracle_type = "NUMBER(1)"
+        elif delta_type in ("date", "timestamp", "timestamp_ntz"):
+            oracle_type = "DATE"
+        else:
+            # Default to VARCHAR2 for strings and unknown types
+            oracle_type = "VARCHAR2(4000)"
+
+        column_definitions.append(f"{field['name']} {oracle_type}")
+
+    create_sql = f"CREATE TABLE {table_name} (\n  " + ",\n  ".join(column_definitions) + "\n)"
+    if nologging:
+        create_sql += " NOLOGGING"
+    if compression:
+        create_sql += f" {COMPRESSION_CLAUSES[compression]}"
+    if partitioning is not None:
+        create_sql += f"\n{partitioning.ddl()}"
+    return create_sql
+
+
+class PipelinedInserter:
+    """
+    Sends batch inserts in pipelines of `depth` batches over an asyncio
+    connection (python-oracledb pipelining): each batch's executemany, its
+    checkpoint update (checkpoint(batch end) -> (sql, parameters)) and
+    commit are queued together, so on Oracle Database 23ai a whole pipeline
+    costs about one round trip instead of two per batch. Older databases
+    run the operations one by one, as fast as without pipelining.
+
+    A pipeline stops at its first error. committed() reads back how many
+    source rows are committed, which tells the batches that made it: after
+    a transient error the rest are sent again on a new connection, after
+    any other error run() returns so the failing batch can be inserted
+    conventionally with batch errors. The connection lives on a private
+    event loop, so callers stay synchronous.
+    """
+
+    def __init__(self, connect_async, insert_sql, depth=DEFAULT_PIPELINE_DEPTH, checkpoint=None, committed=None, retry=None):
+        import asyncio
+
+        self.connect_async = connect_async
+        self.insert_sql = insert_sql
+        self.depth = max(1, depth)
+        self.checkpoint = checkpoint
+        self.committed = committed
+        self.retry = retry or RetryPolicy()
+        self.stats = {"pipelines": 0, "batches": 0, "fallbacks": 0}
+        self._loop = asyncio.new_event_loop()
+        self._connection = None
+
+    def _run(self, coroutine):
+        return self._loop.run_until_complete(coroutine)
+
+    async def _send(self, batches):
+        import oracledb
+
+        if self._connection is None:
+            self._connection = await self.connect_async()
+        pipeline = oracledb.create_pipeline()
+        for rows, first_offset in batches:
+            pipeline.add_executemany(self.insert_sql, rows)
+            if self.checkpoint is not None:
+                pipeline.add_execute(*self.checkpoint(first_offset + len(rows)))
+            pipeline.add_commit()
+        await self._connection.run_pipeline(pipeline)
+
+    def _drop(self):
+        # Closing rolls back whatever the stopped pipeline left uncommitted
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                self._run(connection.close())
+            except Exception:
+                pass
+
+    def run(self, batches):
+        """
+        Insert batches [(rows, source offset of the first row)], committing
+        each. Returns how many leading batches were committed: all of them,
+        or up to the one that failed on a non-transient error.
+        """
+        done = 0
+        attempt = 0
+        while done < len(batches):
+            chunk = batches[done:done + self.depth]
+            try:
+                self._run(self._send(chunk))
+                self.stats["pipelines"] += 1
+                self.stats["batches"] += len(chunk)
+                done += len(chunk)
+                attempt = 0
+            except Exception as e:
+                if self.committed is None:
+                    raise
+                # Batches commit in order, so the checkpoint shows which made it
+                committed_rows = self.committed()
+                made_it = sum(1 for rows, first_offset in chunk if first_offset + len(rows) <= committed_rows)
+                self.stats["batches"] += made_it
+                done += made_it
+                self._drop()
+                if not self.retry.should_retry(e, attempt):
+                    logging.getLogger().warning(f"Pipelined batch at row {chunk[made_it][1]} failed: {e}")
+                    self.stats["fallbacks"] += 1
+                    return done
+                attempt += 1
+                self.retry.backoff(attempt)
+                self.retry.stats["reconnects"] += 1
+        return done
+
+    def close(self):
+        self._drop()
+        self._loop.close()
+
+    def summary(self):
+        return dict(self.stats, depth=self.depth)
+
+
+def table_exists(cursor, table_name):
+    """
+    Return True if the table can be queried by the connected user
+    """
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE ROWNUM = 1")
+        cursor.fetchone()
+        return True
+    except Exception:
+        return False
+
+
+def is_partitioned(cursor, table_name):
+    cursor.execute("SELECT COUNT(*) FROM user_part_tables WHERE table_name = :1", [table_name.upper()])
+    return cursor.fetchone()[0] > 0
+
+
+def drop_table_if_exists(cursor, table_name):
+    import oracledb
+
+    try:
+        cursor.execute(f"DROP TABLE {table_name} PURGE")
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        # ORA-00942: table or view does not exist
+        if error.code != 942:
+            raise
+
+
+def staging_table_name(table_name, suffix="STG"):
+    """
+    Return the staging/backup table name for a target (max 128 bytes)
+    """
+    return f"{table_name[:128 - len(suffix) - 1]}_{suffix}".upper()
+
+
+def create_staging_table(cursor, target_table, staging_table, fields, target_exists, compression=None,
+                         partitioning=None):
+    """
+    Create an empty NOLOGGING staging table with the target's columns and no
+    indexes, partitioned by partitioning if given. NOLOGGING is dropped when
+    the database rejects it. The name must be unique to this load (see
+    staging_table_name): an existing table of that name is an error, never
+    dropped.
+    """
+    import oracledb
+
+    def create_sql(nologging):
+        option = "NOLOGGING " if nologging else ""
+        if target_exists:
+            if compression:
+                option += f"{COMPRESSION_CLAUSES[compression]} "
+            if partitioning is not None:
+                option += f"{partitioning.ddl()} "
+            return f"CREATE TABLE {staging_table} {option}AS SELECT * FROM {target_table} WHERE 1 = 0"
+        return generate_create_table_sql(staging_table, fields, compression, partitioning, nologging)
+
+    try:
+        cursor.execute(create_sql(nologging=True))
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        # ORA-00955: name is already used by an existing object
+        if error.code == 955:
+            raise
+        cursor.execute(create_sql(nologging=False))
+
+
+def referencing_constraints(cursor, table_name):
+    """
+    Return (table, constraint) of the foreign keys of other tables that
+    reference the table. They would follow the table when it is renamed
+    away, so a table referenced this way cannot be swapped.
+    """
+    cursor.execute("""
+        SELECT c.table_name, c.constraint_name
+        FROM user_constraints c
+        JOIN user_constraints r ON r.constraint_name = c.r_constraint_name
+        WHERE c.constraint_type = 'R' AND r.table_name = :1 AND c.table_name != :1
+    """, [table_name.upper()])
+    return cursor.fetchall()
+
+
+def table_triggers(cursor, table_name):
+    """
+    Return the names of the triggers on a table
+    """
+    cursor.execute("SELECT trigger_name FROM user_triggers WHERE table_name = :1", [table_name.upper()])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def copy_table_indexes(cursor, source_table, dest_table):
+    """
+    Recreate the source table's primary/unique, check and foreign key
+    constraints and plain indexes on dest_table under temporary names.
+    Returns (kind, temporary name, original name) tuples to rename once
+    dest_table has been swapped in. NOT NULL checks are already part of a
+    staging table created from the target.
+    """
+    source = source_table.upper()
+    renames = []
+
+    def add_constraint(name, generated, definition):
+        if generated == "GENERATED NAME":
+            # System names (SYS_C...) are not reused, the copy gets its own
+            cursor.execute(f"ALTER TABLE {dest_table} ADD {definition}")
+            return None
+        temp_name = staging_table_name(name, "S")
+        cursor.execute(f"ALTER TABLE {dest_table} ADD CONSTRAINT {temp_name} {definition}")
+        renames.append(("CONSTRAINT", temp_name, name))
+        return temp_name
+
+    cursor.execute("""
+        SELECT c.constraint_name, c.constraint_type, c.index_name, c.generated,
+               LISTAGG(cc.column_name, ', ') WITHIN GROUP (ORDER BY cc.position)
+        FROM user_constraints c
+        JOIN user_cons_columns cc ON cc.constraint_name = c.constraint_name
+        WHERE c.table_name = :1 AND c.constraint_type IN ('P', 'U')
+        GROUP BY c.constraint_name, c.constraint_type, c.index_name, c.generated
+    """, [source])
+    constraints = cursor.fetchall()
+    constraint_indexes = {row[2] for row in constraints}
+
+    for name, constraint_type, _, generated, column_list in constraints:
+        kind = "PRIMARY KEY" if constraint_type == "P" else "UNIQUE"
+        temp_name = add_constraint(name, generated, f"{kind} ({column_list})")
+        if temp_name is not None:
+            # The backing index is created with the constraint's name
+            renames.append(("INDEX", temp_name, name))
+
+    cursor.execute("""
+        SELECT constraint_name, generated, search_condition_vc
+        FROM user_constraints
+        WHERE table_name = :1 AND constraint_type = 'C'
+    """, [source])
+    for name, generated, condition in cursor.fetchall():
+        if re.fullmatch(r'"[^"]+" IS NOT NULL', condition.strip()):
+            continue
+        add_constraint(name, generated, f"CHECK ({condition})")
+
+    cursor.execute("""
+        SELECT c.constraint_name, c.generated, c.delete_rule, r.table_name,
+               LISTAGG(cc.column_name, ', ') WITHIN GROUP (ORDER BY cc.position),
+               LISTAGG(rc.column_name, ', ') WITHIN GROUP (ORDER BY rc.position)
+        FROM user_constraints c
+        JOIN user_constraints r ON r.constraint_name = c.r_constraint_name
+        JOIN user_cons_columns cc ON cc.constraint_name = c.constraint_name
+        JOIN user_cons_columns rc ON rc.constraint_name = r.constraint_name AND rc.position = cc.position
+        WHERE c.table_name = :1 AND c.constraint_type = 'R'
+        GROUP BY c.constraint_name, c.generated, c.delete_rule, r.table_name
+    """, [source])
+    for name, generated, delete_rule, referenced_table, column_list, referenced_columns in cursor.fetchall():
+        on_delete = f" ON DELETE {delete_rule}" if delete_rule in ("CASCADE", "SET NULL") else ""
+        add_constraint(
+            name, generated,
+            f"FOREIGN KEY ({column_list}) REFERENCES {referenced_table} ({referenced_columns}){on_delete}"
+        )
+
+    cursor.execute("""
+        SELECT i.index_name, i.uniqueness,
+               LISTAGG(ic.column_name, ', ') WITHIN GROUP (ORDER BY ic.column_position)
+        FROM user_indexes i
+        JOIN user_ind_columns ic ON ic.index_name = i.index_name
+        WHERE i.table_name = :1 AND i.index_type = 'NORMAL'
+        GROUP BY i.index_name, i.uniqueness
+    """, [source])
+    for name, uniqueness, column_list in cursor.fetchall():
+        if name in constraint_indexes:
+            continue
+        temp_name = staging_table_name(name, "S")
+        unique = "UNIQUE " if uniqueness == "UNIQUE" else ""
+        cursor.execute(f"CREATE {unique}INDEX {temp_name} ON {dest_table} ({column_list})")
+        renames.append(("INDEX", temp_name, name))
+
+    return renames
+
+
+def defer_table_indexes(cursor, table_name):
+    """
+    Disable primary/unique constraints and mark non-unique indexes UNUSABLE
+    before a direct-path load so they are built once afterwards. Constraints
+    that cannot be disabled (e.g. referenced by foreign keys) stay enabled.
+    Returns what was deferred, for restore_table_indexes.
+    """
+    import oracledb
+
+    table = table_name.upper()
+    deferred = {"constraints": [], "indexes": []}
+
+    cursor.execute("""
+        SELECT constraint_name FROM user_constraints
+        WHERE table_name = :1 AND constraint_type IN ('P', 'U') AND status = 'ENABLED'
+    """, [table])
+    for (name,) in cursor.fetchall():
+        try:
+            cursor.execute(f"ALTER TABLE {table} DISABLE CONSTRAINT {name}")
+            deferred["constraints"].append(name)
+        except oracledb.DatabaseError:
+            pass
+
+    # Unique indexes cannot be skipped by DML, so they stay usable
+    cursor.execute("""
+        SELECT index_name FROM user_indexes
+        WHERE table_name = :1 AND index_type = 'NORMAL'
+          AND uniqueness = 'NONUNIQUE' AND status = 'VALID'
+    """, [table])
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"ALTER INDEX {name} UNUSABLE")
+        deferred["indexes"].append(name)
+
+    return deferred
+
+
+def restore_table_indexes(cursor, table_name, deferred):
+    """
+    Rebuild indexes and re-enable constraints deferred by defer_table_indexes
+    """
+    for name in deferred["indexes"]:
+        cursor.execute(f"ALTER INDEX {name} REBUILD")
+    for name in deferred["constraints"]:
+        cursor.execute(f"ALTER TABLE {table_name.upper()} ENABLE CONSTRAINT {name}")
+
+
+def gather_table_stats(cursor, table_name):
+    cursor.execute(
+        "BEGIN DBMS_STATS.GATHER_TABLE_STATS(ownname => USER, tabname => :1); END;",
+        [table_name.upper()]
+    )
+
+
+def swap_tables(cursor, target_table, staging_table, backup_table, target_exists, renames):
+    """
+    Swap a loaded staging table in for the target by rename, then drop the
+    previous table (renamed to backup_table, a name unique to this load) and
+    give the new indexes/constraints their original names
+    """
+    target = target_table.upper()
+
+    # The target is only missing between these two statements
+    if target_exists:
+        cursor.execute(f"ALTER TABLE {target} RENAME TO {backup_table}")
+    try:
+        cursor.execute(f"ALTER TABLE {staging_table} RENAME TO {target}")
+    except Exception:
+        if target_exists:
+            cursor.execute(f"ALTER TABLE {backup_table} RENAME TO {target}")
+        raise
+
+    if target_exists:
+        # Grants stay with the old table object, carry them over
+        cursor.execute("""
+            SELECT grantee, privilege FROM user_tab_privs
+            WHERE table_name = :1 AND grantor = USER
+        """, [backup_table])
+        for grantee, privilege in cursor.fetchall():
+            cursor.execute(f"GRANT {privilege} ON {target} TO {grantee}")
+        drop_table_if_exists(cursor, backup_table)
+
+    for kind, temp_name, original_name in renames:
+        if kind == "CONSTRAINT":
+            cursor.execute(f"ALTER TABLE {target} RENAME CONSTRAINT {temp_name} TO {original_name}")
+        else:
+            cursor.execute(f"ALTER INDEX {temp_name} RENAME TO {original_name}")
+
+
+def prepare_load_table(cursor, target_table, fields, load_strategy, load_mode, compression, load_id,
+                       partitioning=None, partition_reload=None):
+    """
+    Create, truncate or stage the table a load inserts into; staging tables
+    are named for load_id. Tables it creates are partitioned by
+    partitioning, if given. With partition_reload the target is only
+    created if missing: the partitions the load touches are truncated or
+    exchanged by the PartitionLoader.
+    Returns (load table, whether the target existed, deferred indexes).
+    """
+    logger = logging.getLogger()
+
+    # Check if table exists, create if not
+    logger.info(f"Checking if table {target_table} exists")
+    target_exists = table_exists(cursor, target_table)
+    deferred_indexes = None
+
+    if load_strategy == "merge" and not target_exists:
+        logger.info(f"Table doesn't exist, creating {target_table}")
+        cursor.execute(generate_create_table_sql(target_table, fields, compression, partitioning))
+        target_exists = True
+
+    if (partitioning is not None and target_exists and load_strategy == "truncate"
+            and not is_partitioned(cursor, target_table)):
+        raise ValueError(f"{target_table} is not partitioned; drop it or load without partition_column")
+
+    if load_strategy in ("swap", "merge"):
+        # Load into a staging table; the live table is untouched until the swap/merge
+        load_table = staging_table_name(target_table, f"STG_{load_id}")
+        logger.info(f"Creating staging table {load_table}")
+        create_staging_table(cursor, target_table, load_table, fields, target_exists, compression, partitioning)
+    elif target_exists and partition_reload:
+        # Only the partitions the load touches are replaced
+        load_table = target_table
+        logger.info(f"Table exists, reloading the loaded partitions by {partition_reload}")
+    elif target_exists:
+        # Table exists, truncate it
+        load_table = target_table
+        logger.info(f"Table exists, truncating {target_table}")
+        cursor.execute(f"TRUNCATE TABLE {target_table}")
+        logger.info("Table truncated successfully")
+        if load_mode == "direct_path":
+            # Build indexes once after the load rather than row by row
+            deferred_indexes = defer_table_indexes(cursor, target_table)
+            logger.info(f"Deferred indexes/constraints: {deferred_indexes}")
+    else:
+        # Table doesn't exist, create it
+        load_table = target_table
+        logger.info(f"Table doesn't exist, creating {target_table}")
+        create_table_sql = generate_create_table_sql(target_table, fields, compression, partitioning)
+        logger.info(f"Create table SQL: {create_table_sql}")
+        cursor.execute(create_table_sql)
+        logger.info("Table created successfully")
+
+    return load_table, target_exists, deferred_indexes
+
+
+def complete_load(cursor, target_table, load_table, columns, load_strategy, target_exists,
+                  deferred_indexes, load_id, merge_keys=None, merge_parallel=None):
+    """
+    Finish a load once all rows are in load_table: rebuild deferred indexes,
+    swap the staging table in or merge it. Returns the merge counts, if any.
+    """
+    logger = logging.getLogger()
+
+    if deferred_indexes:
+        logger.info(f"Rebuilding deferred indexes/constraints on {target_table}")
+        restore_table_indexes(cursor, target_table, deferred_indexes)
+
+    if load_strategy == "swap":
+        # Indexes and stats are built once on the loaded data, then swapped in
+        logger.info(f"Building indexes and gathering stats on {load_table}")
+        renames = copy_table_indexes(cursor, target_table, load_table) if target_exists else []
+        gather_table_stats(cursor, load_table)
+        logger.info(f"Swapping {load_table} into {target_table}")
+        swap_tables(
+            cursor, target_table, load_table,
+            staging_table_name(target_table, f"OLD_{load_id}"), target_exists, renames
+        )
+
+    if load_strategy == "merge":
+        logger.info(f"Merging {load_table} into {target_table} on {merge_keys}")
+        merge_counts = merge_staging_table(
+            cursor, target_table, load_table, columns, merge_keys, merge_parallel
+        )
+        logger.info(f"Merge complete: {merge_counts}")
+        # DDL, so this also commits the MERGE
+        drop_table_if_exists(cursor, load_table)
+        return merge_counts
+    return None
+
+
+def abort_load(cursor, target_table, load_table, load_strategy, deferred_indexes):
+    """
+    Clean up after a failed load: drop the staging table, restore deferred indexes
+    """
+    logger = logging.getLogger()
+    if load_strategy in ("swap", "merge"):
+        logger.info(f"Load failed, dropping staging table {load_table}")
+        drop_table_if_exists(cursor, load_table)
+    if deferred_indexes:
+        try:
+            restore_table_indexes(cursor, target_table, deferred_indexes)
+        except Exception as restore_error:
+            logger.error(f"Could not restore indexes on {target_table}: {restore_error}")
+
+
+def merge_staging_table(cursor, target_table, staging_table, columns, keys, parallel=None):
+    """
+    Apply a loaded staging table to the target with one MERGE on the key
+    columns. Returns {"rows_inserted": n, "rows_updated": n}.
+
+    Keys must be unique in the staging table (ORA-30926 otherwise). With
+    parallel, the MERGE runs as parallel DML and must be committed before
+    the target is queried again in the same transaction.
+    """
+    on_clause = " AND ".join(f"t.{key} = s.{key}" for key in keys)
+    update_columns = [column for column in columns if column not in keys]
+
+    # MERGE only reports the total, so count the rows that will match first
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM {staging_table} s
+        WHERE EXISTS (SELECT 1 FROM {target_table} t WHERE {on_clause})
+    """)
+    rows_matched = cursor.fetchone()[0]
+
+    hint = ""
+    if parallel:
+        cursor.execute("ALTER SESSION ENABLE PARALLEL DML")
+        hint = f"/*+ PARALLEL(t, {int(parallel)}) */ "
+
+    merge_sql = f"MERGE {hint}INTO {target_table} t USING {staging_table} s ON ({on_clause})"
+    if update_columns:
+        merge_sql += " WHEN MATCHED THEN UPDATE SET " + ", ".join(
+            f"t.{column} = s.{column}" for column in update_columns
+        )
+    merge_sql += (
+        f" WHEN NOT MATCHED THEN INSERT ({', '.join(columns)})"
+        f" VALUES ({', '.join(f's.{column}' for column in columns)})"
+    )
+    cursor.execute(merge_sql)
+    rows_merged = cursor.rowcount
+
+    rows_updated = rows_matched if update_columns else 0
+    return {"rows_inserted": rows_merged - rows_updated, "rows_updated": rows_updated}
+
+
+class PartitionSpec:
+    """
+    Range partitioning of a target table on a date or numeric column:
+    interval partitions ("day"/"month"/"year" for dates, a width for
+    numbers) or range partitions below each of bounds plus MAXVALUE.
+    Maps rows to partition keys with Arrow compute and keys to
+    PARTITION FOR (...) clauses.
+    """
+
+    def __init__(self, column, fields, interval=None, bounds=None):
+        field = next((field for field in fields if field["name"] == column), None)
+        if field is None:
+            raise ValueError(f"partition_column {column} is not among the loaded columns")
+        delta_type = field["type"] if isinstance(field["type"], str) else "complex"
+        self.column = column
+        self.is_date = delta_type in ("date", "timestamp", "timestamp_ntz")
+        if not self.is_date and not (delta_type in ("long", "integer", "short", "byte", "float", "double")
+                                     or delta_type.startswith("decimal")):
+            raise ValueError(f"partition_column {column} must be a date, timestamp or numeric column, not {delta_type}")
+
+        self.interval = None
+        self.bounds = None
+        if bounds is not None:
+            parse = date.fromisoformat if self.is_date else float
+            self.bounds = [parse(str(bound)) for bound in bounds]
+            if not self.is_date:
+                self.bounds = [int(bound) if bound.is_integer() else bound for bound in self.bounds]
+            if not self.bounds or any(a >= b for a, b in zip(self.bounds, self.bounds[1:])):
+                raise ValueError(f"partition_bounds must be ascending: {bounds}")
+        elif self.is_date:
+            if interval not in PARTITION_INTERVALS:
+                raise ValueError(f"partition_interval for {column} must be one of {list(PARTITION_INTERVALS)}")
+            self.interval = interval
+        else:
+            width = float(interval)
+            if width <= 0:
+                raise ValueError(f"partition_interval for {column} must be positive")
+            self.interval = int(width) if width.is_integer() else width
+
+    def _literal(self, value):
+        if self.is_date:
+            return f"DATE '{value.isoformat()}'"
+        return repr(value)
+
+    def ddl(self):
+        """
+        The PARTITION BY clause of the table's DDL
+        """
+        if self.bounds is not None:
+            partitions = [f"PARTITION P{i} VALUES LESS THAN ({self._literal(bound)})"
+                          for i, bound in enumerate(self.bounds)]
+            partitions.append("PARTITION PMAX VALUES LESS THAN (MAXVALUE)")
+            return f"PARTITION BY RANGE ({self.column}) ({', '.join(partitions)})"
+        if self.is_date:
+            interval, transition = PARTITION_INTERVALS[self.interval], self._literal(PARTITION_TRANSITION)
+        else:
+            interval, transition = repr(self.interval), "0"
+        return (f"PARTITION BY RANGE ({self.column}) INTERVAL ({interval}) "
+                f"(PARTITION P0 VALUES LESS THAN ({transition}))")
+
+    def keys(self, arrow_table):
+        """
+        Partition key of every row as an int64 array: the range partition's
+        position, or the interval's number counted from the transition point
+        (-1 for the first partition). Null keys only occur with interval
+        partitioning, which has no partition for NULL.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        int64 = pa.int64()
+        column = arrow_table.column(self.column)
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        if self.is_date:
+            if not pa.types.is_date32(column.type):
+                column = column.cast(pa.date32())
+        else:
+            column = column.cast(pa.float64())
+
+        if self.bounds is not None:
+            keys = _constant_array("0", len(column), int64)
+            for bound in self.bounds:
+                keys = pc.add(keys, pc.greater_equal(column, _scalar(bound, column.type)).cast(int64))
+            # NULL sorts into the MAXVALUE partition
+            return pc.coalesce(keys, _scalar(len(self.bounds), int64))
+
+        if self.interval == "day":
+            keys = column.cast(pa.int32()).cast(int64)
+        elif self.interval == "month":
+            years = pc.subtract(pc.year(column), _scalar(PARTITION_TRANSITION.year, int64))
+            keys = pc.add(pc.multiply(years, _scalar(12, int64)), pc.subtract(pc.month(column), _scalar(1, int64)))
+        elif self.interval == "year":
+            keys = pc.subtract(pc.year(column), _scalar(PARTITION_TRANSITION.year, int64))
+        else:
+            keys = pc.floor(pc.divide(column, _scalar(self.interval, pa.float64()))).cast(int64)
+        return pc.max_element_wise(keys, _scalar(-1, int64), skip_nulls=False)
+
+    def partition_for(self, key):
+        """
+        PARTITION FOR (...) naming the partition of a key, None for NULL keys
+        """
+        if key is None:
+            return None
+        if self.bounds is not None:
+            if key:
+                value = self.bounds[key - 1]
+            else:
+                value = self.bounds[0] - (timedelta(days=1) if self.is_date else 1)
+        elif self.interval == "day":
+            value = PARTITION_TRANSITION + timedelta(days=key)
+        elif self.interval == "month":
+            value = date(PARTITION_TRANSITION.year + key // 12, key % 12 + 1, 1)
+        elif self.interval == "year":
+            value = date(PARTITION_TRANSITION.year + key, 1, 1)
+        else:
+            value = key * self.interval
+        return f"PARTITION FOR ({self._literal(value)})"
+
+
+# Source offsets travel with the rows through the partition buffers
+OFFSET_COLUMN = "__source_offset"
+
+
+class PartitionLoader:
+    """
+    Routes Arrow batches to the target's partitions and loads them on
+    `parallel` threads, each inserting through its own pooled connection
+    with a partition-extended INSERT. A partition is always loaded by the
+    same thread, so direct-path inserts into different partitions only
+    lock their own partition and run side by side.
+
+    Rows are buffered per partition and sent as batches of batch_size,
+    optionally sorted by sort_keys so each batch is stored clustered. The
+    thread queues are bounded: when the threads fall behind, add() blocks.
+
+    reload "truncate" truncates each partition before its first batch;
+    "exchange" loads each partition into its own FOR EXCHANGE table, named
+    for load_id so concurrent loads never share one, and swaps it in by
+    partition exchange in finish(), so readers see the old partition until
+    then. A transient error before a batch's commit is
+    retried on a new connection; a failed commit fails the load, as there
+    is no per-partition checkpoint to resume from.
+    """
+
+    def __init__(self, pool, table, columns, spec, batch_size, rejects, retry,
+                 load_mode="conventional", reload=None, sort_keys=None, parallel=1, queue_size=2, load_id=""):
+        import queue
+
+        missing = [key for key in sort_keys or [] if key not in columns]
+        if missing:
+            raise ValueError(f"partition_sort {missing} are not among the loaded columns")
+        self.pool = pool
+        self.table = table
+        self.columns = columns
+        self.spec = spec
+        self.batch_size = batch_size
+        self.rejects = rejects
+        self.retry = retry
+        self.hint = insert_hint(load_mode)
+        self.load_id = load_id
+        self.reload = reload
+        self.sort_keys = sort_keys
+        self.parallel = parallel
+        self.rows_inserted = 0
+        self.error = None
+        self.exchanges = []
+        self._buffers = {}
+        self._buffered_rows = 0
+        self._assignment = {}
+        self._prepared = set()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(parallel)]
+        self._threads = [
+            threading.Thread(target=self._run, args=(tasks,), daemon=True) for tasks in self._queues
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def add(self, arrow_table, offsets):
+        """
+        Route a table's rows, whose source offsets are listed in offsets,
+        to their partitions' buffers and send the full batches
+        """
+        import pyarrow.compute as pc
+
+        self._raise_error()
+        if not arrow_table.num_rows:
+            return
+        arrow_table = arrow_table.append_column(OFFSET_COLUMN, _int64_array(offsets))
+        keys = self.spec.keys(arrow_table)
+        order = pc.sort_indices(keys, null_placement="at_end")
+        arrow_table = arrow_table.take(order)
+
+        start = 0
+        for entry in pc.value_counts(keys.take(order)):
+            key, count = entry["values"].as_py(), entry["counts"].as_py()
+            self._buffers.setdefault(key, []).append(arrow_table.slice(start, count))
+            self._buffered_rows += count
+            start += count
+            self._flush(key, partial=False)
+
+        # Bound the rows held for partitions that fill up slowly
+        while self._buffered_rows > self.batch_size * max(4, 2 * self.parallel):
+            fullest = max(self._buffers, key=lambda k: sum(t.num_rows for t in self._buffers[k]))
+            self._flush(fullest, partial=True)
+
+    def _flush(self, key, partial):
+        tables = self._buffers.get(key)
+        if not tables:
+            return
+        buffered = concat_compact_tables(tables)
+        sent = 0
+        while buffered.num_rows - sent >= self.batch_size or (partial and sent < buffered.num_rows):
+            batch = buffered.slice(sent, self.batch_size)
+            self._send(key, batch)
+            sent += batch.num_rows
+        self._buffered_rows -= sent
+        if sent < buffered.num_rows:
+            self._buffers[key] = [buffered.slice(sent)]
+        else:
+            del self._buffers[key]
+
+    def _send(self, key, batch):
+        worker = self._assignment.setdefault(key, len(self._assignment) % self.parallel)
+        self._queues[worker].put((key, batch))
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def _run(self, tasks):
+        state = {}
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            # Keep draining after a failure so add() never blocks on a full queue
+            if self.error is not None:
+                continue
+            try:
+                self._load(state, *task)
+            except Exception as e:
+                with self._lock:
+                    if self.error is None:
+                        self.error = e
+        if "connection" in state:
+            try:
+                self.pool.release(state["connection"])
+            except Exception:
+                pass
+
+    def _connect(self, state):
+        if "connection" in state:
+            try:
+                self.pool.drop(state["connection"])
+            except Exception:
+                pass
+            self.retry.stats["reconnects"] += 1
+        state["connection"] = self.pool.acquire()
+        state["cursor"] = state["connection"].cursor()
+        state["rejects"] = self.rejects.fork(state["cursor"])
+
+    def _prepare(self, state, key):
+        """
+        First batch of a partition: truncate it or create its exchange table.
+        Returns the table to insert into and its partition clause.
+        """
+        partition = self.spec.partition_for(key)
+        if partition is None or self.reload is None:
+            return self.table, partition or ""
+
+        cursor = state["cursor"]
+        if key not in self._prepared:
+            # Locking a partition by value creates a missing interval partition
+            cursor.execute(f"LOCK TABLE {self.table} {partition} IN SHARE MODE")
+            if self.reload == "truncate":
+                cursor.execute(f"ALTER TABLE {self.table} TRUNCATE {partition} UPDATE GLOBAL INDEXES")
+            else:
+                with self._lock:
+                    exchange_table = next((name for k, name in self.exchanges if k == key), None)
+                    if exchange_table is None:
+                        exchange_table = staging_table_name(self.table, f"X{self.load_id}_{len(self.exchanges)}")
+                        self.exchanges.append((key, exchange_table))
+                # Only this load uses the name: a leftover is from a retried attempt
+                drop_table_if_exists(cursor, exchange_table)
+                cursor.execute(f"CREATE TABLE {exchange_table} FOR EXCHANGE WITH TABLE {self.table}")
+            self._prepared.add(key)
+
+        if self.reload == "exchange":
+            return next(name for k, name in self.exchanges if k == key), ""
+        return self.table, partition
+
+    def _load(self, state, key, batch):
+        if "connection" not in state:
+            self._connect(state)
+        table, partition = self.retry.call(lambda: self._prepare(state, key), on_retry=lambda e: self._connect(state))
+
+        if self.sort_keys:
+            batch = batch.sort_by([(column, "ascending") for column in self.sort_keys])
+        offsets = batch.column(OFFSET_COLUMN).to_pylist()
+        rows = arrow_to_rows(batch.remove_column(batch.schema.get_field_index(OFFSET_COLUMN)))
+        placeholders = ', '.join([f':{i+1}' for i in range(len(self.columns))])
+        insert_sql = (f"INSERT {self.hint}INTO {table} {partition} ({', '.join(self.columns)}) "
+                      f"VALUES ({placeholders})")
+
+        attempt = 0
+        while True:
+            try:
+                inserted = state["rejects"].insert_batch(insert_sql, rows, None, offsets)
+                break
+            except Exception as e:
+                # Nothing is committed yet, so the batch can be sent again
+                if not self.retry.should_retry(e, attempt):
+                    raise
+                attempt += 1
+                self.retry.backoff(attempt)
+                state["rejects"].batch_failed()
+                self._connect(state)
+        state["connection"].commit()
+        state["rejects"].batch_committed()
+        with self._lock:
+            self.rows_inserted += inserted
+            total = self.rows_inserted
+        logging.getLogger().info(f"Inserted {total} rows, {inserted} into {table} {partition}".rstrip())
+
+    def _stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        for tasks in self._queues:
+            tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        try:
+            self.pool.close(force=True)
+        except Exception:
+            pass
+
+    def finish(self, cursor):
+        """
+        Send the remaining rows, wait for the threads, then exchange the
+        loaded partitions in. Returns the number of rows inserted.
+        """
+        for key in list(self._buffers):
+            self._flush(key, partial=True)
+        self._stop()
+        self._raise_error()
+
+        logger = logging.getLogger()
+        for key, exchange_table in self.exchanges:
+            partition = self.spec.partition_for(key)
+            logger.info(f"Exchanging {self.table} {partition} with {exchange_table}")
+            cursor.execute(f"LOCK TABLE {self.table} {partition} IN SHARE MODE")
+            cursor.execute(f"ALTER TABLE {self.table} EXCHANGE {partition} WITH TABLE {exchange_table} "
+                           f"WITHOUT VALIDATION UPDATE GLOBAL INDEXES")
+            cursor.execute(f"ALTER TABLE {self.table} MODIFY {partition} REBUILD UNUSABLE LOCAL INDEXES")
+            drop_table_if_exists(cursor, exchange_table)
+        return self.rows_inserted
+
+    def abort(self, cursor):
+        """
+        Stop the threads after a failure and drop the exchange tables; the
+        target's partitions are left as they were
+        """
+        self._buffers = {}
+        with self._lock:
+            if self.error is None:
+                self.error = RuntimeError("Load aborted")
+        self._stop()
+        for _, exchange_table in self.exchanges:
+            try:
+                drop_table_if_exists(cursor, exchange_table)
+            except Exception as drop_error:
+                logging.getLogger().error(f"Could not drop {exchange_table}: {drop_error}")
+
+    def summary(self):
+        return {
+            "column": self.spec.column,
+            "partitions_loaded": len(self._assignment),
+            "parallel": self.parallel,
+            "reload": self.reload,
+            "exchanged": len(self.exchanges) if self.reload == "exchange" else 0,
+            "sort_keys": self.sort_keys
+        }
+
+
+class TargetLoader:
+    """
+    Loads the batches of a fan-out run ("targets") into one target table,
+    possibly in another database, on its own thread and connection. Each
+    target prepares its table, checkpoints, retries, rejects and records
+    its load in its own control table like a single-target load, and fails
+    on its own: a failed target stops taking batches while the others carry
+    on. Batches are shared by all targets and queued up to queue_size deep,
+    so the slowest target paces the read.
+    """
+
+    def __init__(self, name, connect, table, source_name, table_version, fields,
+                 control_table=DEFAULT_CONTROL_TABLE, reject_table=DEFAULT_REJECT_TABLE, reject_limit=0,
+                 load_strategy="truncate", load_mode="conventional", compression=None,
+                 merge_keys=None, merge_parallel=None, max_retries=DEFAULT_RETRIES, queue_size=2):
+        import queue
+
+        self.name = name
+        self.load_id = os.urandom(4).hex().upper()
+        self.connect = connect
+        self.table = table
+        self.source_name = source_name
+        self.table_version = table_version
+        self.fields = fields
+        self.columns = [field["name"] for field in fields]
+        self.control_table = control_table
+        self.reject_table = reject_table
+        self.reject_limit = reject_limit
+        self.load_strategy = load_strategy
+        self.load_mode = load_mode
+        self.compression = compression
+        self.merge_keys = merge_keys
+        self.merge_parallel = merge_parallel
+        self.retry = RetryPolicy(retries=max_retries)
+        self.rows_inserted = 0
+        self.status = None
+        self.error = None
+        self.result = {}
+        self.rejects = None
+        self.conn = None
+        self.cursor = None
+        self._reconnected = False
+        self._prepared = False
+        self._read_error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = time.perf_counter()
+
+    def open(self, force_reload=False, full_load=True):
+        """
+        Connect and compare the target's last full load with the source
+        version. Returns False (status "unchanged") when it is already loaded.
+        """
+        self.full_load = full_load
+        self.conn = self.retry.call(self.connect)
+        self.cursor = self.conn.cursor()
+        ensure_control_table(self.cursor, self.control_table)
+        ensure_reject_table(self.cursor, self.reject_table)
+        last_load = get_last_loaded_version(self.cursor, self.control_table, self.source_name, self.table)
+        if not force_reload and full_load and last_load and last_load["source_version"] == self.table_version:
+            self.status = "unchanged"
+            self.result = {"last_loaded_at": last_load["load_completed"],
+                           "rows_in_last_load": last_load["rows_loaded"]}
+            self.close()
+            return False
+        return True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def send(self, batch, offset):
+        """
+        Queue a batch whose first row is at source offset, unless the target failed
+        """
+        if self.error is None:
+            self._queue.put((batch, offset))
+
+    def finish(self, read_error=None):
+        """
+        Signal the end of the source (or that reading it failed), wait for
+        the thread and return the target's summary
+        """
+        self._read_error = read_error
+        self._queue.put(None)
+        self._thread.join()
+        return self.summary()
+
+    def _run(self):
+        done = False
+        try:
+            self._prepare()
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    done = True
+                    break
+                self._insert(*item)
+            if self._read_error is not None:
+                raise RuntimeError(f"Reading the source failed: {self._read_error}")
+            self._complete()
+        except Exception as e:
+            logging.getLogger().error(f"Target {self.name} ({self.table}) failed: {e}", exc_info=True)
+            self.error = e
+            self._fail()
+            # Keep draining so the reader never blocks on this target
+            while not done and self._queue.get() is not None:
+                pass
+        finally:
+            self.close()
+
+    def _prepare(self):
+        self.load_started = datetime.now(timezone.utc)
+        self.load_table, self.target_exists, self.deferred_indexes = prepare_load_table(
+            self.cursor, self.table, self.fields, self.load_strategy, self.load_mode,
+            self.compression, self.load_id
+        )
+        self._prepared = True
+        placeholders = ', '.join([f':{i+1}' for i in range(len(self.columns))])
+        self.insert_sql = f"INSERT {insert_hint(self.load_mode)}INTO {self.load_table} ({', '.join(self.columns)}) VALUES ({placeholders})"
+        self.rejects = RejectLog(
+            self.cursor, self.reject_table, self.source_name, self.table, self.load_started, self.reject_limit
+        )
+        start_load(self.cursor, self.control_table, self.source_name, self.table, self.table_version,
+                   self.load_started)
+        self.conn.commit()
+
+    def _reconnect(self, error):
+        logging.getLogger().warning(f"Transient error on target {self.name}, reconnecting: {error}")
+        self.rejects.batch_failed()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        self.conn = self.connect()
+        self.cursor = self.conn.cursor()
+        self.rejects.cursor = self.cursor
+        self.retry.stats["reconnects"] += 1
+        self._reconnected = True
+
+    def _insert(self, batch, offset):
+        batch_end = offset + len(batch)
+
+        def write():
+            if self._reconnected:
+                self._reconnected = False
+                # The commit may have gone through before the connection dropped
+                if get_load_checkpoint(self.cursor, self.control_table, self.source_name,
+                                       self.table, self.load_started) >= batch_end:
+                    return len(batch) - self.rejects.recover_batch(offset, batch_end)
+            inserted = self.rejects.insert_batch(self.insert_sql, batch, offset)
+            checkpoint_load(self.cursor, self.control_table, self.source_name, self.table,
+                            self.load_started, batch_end)
+            self.conn.commit()
+            self.rejects.batch_committed()
+            return inserted
+
+        self.rows_inserted += self.retry.call(write, on_retry=self._reconnect)
+        self.rejects.check_limit()
+
+    def _complete(self):
+        self.result["merge"] = complete_load(
+            self.cursor, self.table, self.load_table, self.columns, self.load_strategy,
+            self.target_exists, self.deferred_indexes, self.load_id, self.merge_keys, self.merge_parallel
+        )
+        self.deferred_indexes = None
+        self.conn.commit()
+        self.cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+        self.result["total_rows_in_oracle"] = self.cursor.fetchone()[0]
+        status = "SUCCESS" if self.full_load else "PARTIAL"
+        record_load(self.cursor, self.control_table, self.source_name, self.table, self.table_version,
+                    self.rows_inserted, self.load_started, status)
+        self.conn.commit()
+        self.status = "success"
+
+    def _fail(self):
+        self.status = "error"
+        if not self._prepared:
+            return
+        try:
+            record_load(self.cursor, self.control_table, self.source_name, self.table, self.table_version,
+                        self.rows_inserted, self.load_started, "FAILED")
+            self.conn.commit()
+        except Exception as record_error:
+            logging.getLogger().error(f"Could not record failed load of {self.table}: {record_error}")
+        try:
+            abort_load(self.cursor, self.table, self.load_table, self.load_strategy, self.deferred_indexes)
+        except Exception as abort_error:
+            logging.getLogger().error(f"Could not clean up {self.table}: {abort_error}")
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    def summary(self):
+        summary = dict(
+            self.result,
+            name=self.name,
+            status=self.status,
+            destination=self.table,
+            rows_migrated=self.rows_inserted,
+            seconds=round(time.perf_counter() - self._started, 3)
+        )
+        if self.rejects is not None:
+            summary["rejects"] = self.rejects.summary()
+        if self.status != "unchanged":
+            summary["retries"] = self.retry.summary()
+        if self.error is not None:
+            summary["error"] = str(self.error)
+            summary["type"] = type(self.error).__name__
+            if isinstance(self.error, RejectLimitExceeded):
+                summary["rejects"] = self.error.rejects
+        return summary
+
+
+def fan_out_load(loaders, scan, batch_size, conversion_pool=None, force_reload=False, full_load=True,
+                 start_progress=None):
+    """
+    Load one read of the scan into every TargetLoader: targets are opened
+    concurrently (those already holding this version are skipped), then each
+    batch is converted once and queued to every target still loading.
+    start_progress(loader) may return a ProgressReporter for a target.
+    Returns (the targets' summaries, the conversion summary) once the scan
+    ends; when it fails, the targets are finished as failed first.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    logger = logging.getLogger()
+
+    def open_target(loader):
+        try:
+            return loader.open(force_reload, full_load)
+        except Exception as e:
+            logger.error(f"Could not open target {loader.name}: {e}")
+            loader.status, loader.error = "error", e
+            return False
+
+    with ThreadPoolExecutor(max_workers=len(loaders)) as pool:
+        active = [loader for loader, ready in zip(loaders, pool.map(open_target, loaders)) if ready]
+    logger.info(f"Loading {scan.stats['files_total']} files into {len(active)} of {len(loaders)} targets: "
+                f"{[loader.name for loader in active]}")
+
+    progress = []
+    for loader in active:
+        loader.start()
+        reporter = start_progress(loader) if start_progress is not None else None
+        if reporter is not None:
+            progress.append((loader, reporter))
+
+    conversion = ConversionPipeline(batch_size, conversion_pool)
+    read_error = None
+    try:
+        if active:
+            batch = []
+            offset = 0
+            for rows, _ in conversion.iter((arrow_table, None) for arrow_table in scan):
+                batch.extend(rows)
+                while len(batch) >= batch_size:
+                    for loader in active:
+                        loader.send(batch[:batch_size], offset)
+                    offset += batch_size
+                    batch = batch[batch_size:]
+                if all(loader.error is not None for loader in active):
+                    # Nobody left to load into
+                    batch = []
+                    break
+            if batch:
+                for loader in active:
+                    loader.send(batch, offset)
+    except Exception as e:
+        read_error = e
+        raise
+    finally:
+        summaries = [loader.finish(read_error) if loader in active else loader.summary() for loader in loaders]
+        for loader, reporter in progress:
+            reporter.finish({"success": "SUCCESS" if full_load else "PARTIAL"}.get(loader.status, "FAILED"))
+    return summaries, conversion.summary()
+
+
+def get_oracle_connection(user, password, dsn, wallet_location=None, wallet_password=None):
+    """
+    Connect to Oracle ATP database
+    """
+    import oracledb
+
+    if wallet_location:
+        # For ATP with wallet
+        return oracledb.connect(
+            user=user,
+            password=password,
+            dsn=dsn,
+            config_dir=wallet_location,
+            wallet_location=wallet_location,
+            wallet_password=wallet_password
+        )
+    else:
+        # For regular connection or TLS without wallet
+        return oracledb.connect(user=user, password=password, dsn=dsn)
+
+
+async def get_oracle_async_connection(user, password, dsn, wallet_location=None, wallet_password=None):
+    """
+    Connect to Oracle ATP with an asyncio connection, which pipelines run on
+    """
+    import oracledb
+
+    if wallet_location:
+        return await oracledb.connect_async(
+            user=user,
+            password=password,
+            dsn=dsn,
+            config_dir=wallet_location,
+            wallet_location=wallet_location,
+            wallet_password=wallet_password
+        )
+    return await oracledb.connect_async(user=user, password=password, dsn=dsn)
+
+
+def get_oracle_pool(user, password, dsn, wallet_location=None, wallet_password=None, size=1):
+    """
+    Create a pool of size connections to Oracle ATP, for loads that write
+    on several connections at once
+    """
+    import oracledb
+
+    if wallet_location:
+        return oracledb.create_pool(
+            user=user,
+            password=password,
+            dsn=dsn,
+            config_dir=wallet_location,
+            wallet_location=wallet_location,
+            wallet_password=wallet_password,
+            min=size, max=size, increment=0
+        )
+    return oracledb.create_pool(user=user, password=password, dsn=dsn, min=size, max=size)
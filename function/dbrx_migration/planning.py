@@ -0,0 +1,164 @@
+"""
+Dry-run planning of a load from the file listing and past runs
+"""
+import json
+
+from .sharing import DEFAULT_DOWNLOAD_THREADS, MAX_SHARDS, default_shard_count
+
+
+# Dry-run planning: the limits of one invocation (memory from FN_MEMORY when
+# Fn sets it), the share of the timeout a planned run may use, the past runs
+# its load rate is taken from and the rate assumed before any are recorded
+FUNCTION_TIMEOUT_SECONDS = 300
+FUNCTION_MEMORY_MB = 512
+PLAN_TIMEOUT_SHARE = 0.8
+DEFAULT_PLAN_ROWS_PER_SECOND = 10000
+# Interpreter, pyarrow and oracledb before any data is read
+PLAN_BASE_MEMORY_MB = 150
+PLAN_MIN_BATCH = 1000
+PLAN_MAX_BATCH = 50000
+# Width assumed for strings without min/max statistics
+PLAN_STRING_BYTES = 32
+
+
+# Arrow bytes per value of fixed-width Delta types
+_ARROW_TYPE_BYTES = {
+    "byte": 1, "short": 2, "integer": 4, "long": 8, "float": 4, "double": 8,
+    "boolean": 1, "date": 4, "timestamp": 8, "timestamp_ntz": 8
+}
+
+
+def estimate_row_bytes(fields, file_stats):
+    """
+    Estimate (Arrow bytes, Python bind tuple bytes) per row of the fields.
+    String widths are the mean length of their min/max statistics.
+    """
+    lengths = {}
+    for stats in file_stats:
+        for kind in ("minValues", "maxValues"):
+            for name, value in (stats.get(kind) or {}).items():
+                if isinstance(value, str):
+                    lengths.setdefault(name, []).append(len(value))
+
+    # The tuple, and a pointer plus a small object per value
+    arrow_bytes = 0
+    python_bytes = 56
+    for field in fields:
+        field_type = field["type"] if isinstance(field["type"], str) else "struct"
+        if field_type in ("string", "binary"):
+            widths = lengths.get(field["name"])
+            width = sum(widths) / len(widths) if widths else PLAN_STRING_BYTES
+            arrow_bytes += width + 4
+            python_bytes += width + 57
+        elif field_type.startswith("decimal"):
+            arrow_bytes += 16
+            python_bytes += 112
+        else:
+            arrow_bytes += _ARROW_TYPE_BYTES.get(field_type, 8)
+            python_bytes += 40
+    return arrow_bytes, python_bytes
+
+
+def plan_load(scan, history=None, memory_mb=FUNCTION_MEMORY_MB, timeout_seconds=FUNCTION_TIMEOUT_SECONDS,
+              convert_workers=1):
+    """
+    Plan a load of the scan's files from their metadata alone: rows from
+    the numRecords statistics (scaled by size over files without them),
+    runtime from the load rate of past runs (history, see get_load_history),
+    peak memory of one invocation, and the batch size, download parallelism
+    and shard count that keep each invocation inside its memory and
+    PLAN_TIMEOUT_SHARE of its timeout. A sampled scan's rows are scaled by
+    the share of each sampled file it reads.
+    """
+    import math
+
+    files = scan.files
+    file_stats = [json.loads(add_file.stats) if add_file.stats else {} for add_file in files]
+    total_bytes = sum(add_file.size for add_file in files)
+    largest_file = max((add_file.size for add_file in files), default=0)
+    warnings = []
+
+    counted_rows = counted_bytes = largest_file_rows = 0
+    for add_file, stats in zip(files, file_stats):
+        if stats.get("numRecords") is not None:
+            counted_rows += stats["numRecords"]
+            counted_bytes += add_file.size
+            largest_file_rows = max(largest_file_rows, stats["numRecords"])
+    rows = None
+    if counted_bytes == total_bytes:
+        rows = counted_rows
+    elif counted_bytes:
+        rows = round(counted_rows * total_bytes / counted_bytes)
+        largest_file_rows = max(largest_file_rows, round(largest_file * counted_rows / counted_bytes))
+        warnings.append(f"{sum(1 for stats in file_stats if 'numRecords' not in stats)} files have no "
+                        f"numRecords statistics, their rows are estimated from their size")
+    else:
+        warnings.append("No numRecords statistics: rows and runtime cannot be estimated, "
+                        "shards are sized by bytes")
+    if rows is not None and scan.sample is not None:
+        rows = int(rows * scan.sample.file_fraction)
+    if rows is not None and scan.limit is not None:
+        rows = min(rows, scan.limit)
+
+    throughput = history
+    if not history or not history["rows_per_second"]:
+        throughput = {"rows_per_second": DEFAULT_PLAN_ROWS_PER_SECOND, "runs": 0, "scope": "default"}
+        warnings.append(f"No recorded runs, assuming {DEFAULT_PLAN_ROWS_PER_SECOND} rows/s")
+    rate = throughput["rows_per_second"]
+
+    # Memory: the fixed base, one decoded file, the files downloading ahead
+    # and the batches converting ahead (two per conversion worker)
+    megabyte = 1024 * 1024
+    budget = memory_mb * megabyte
+    base = PLAN_BASE_MEMORY_MB * megabyte
+    arrow_row_bytes, python_row_bytes = estimate_row_bytes(scan.output_fields(), file_stats)
+    decoded = largest_file_rows * arrow_row_bytes
+    prefetch = max(1, min(DEFAULT_DOWNLOAD_THREADS, len(files)))
+    while prefetch > 1 and decoded + (prefetch + 1) * largest_file > (budget - base) / 2:
+        prefetch -= 1
+    downloads = (prefetch + 1) * largest_file
+    in_flight = 2 * convert_workers + 1 if convert_workers > 1 else 1
+    batch_size = int(max(budget - base - decoded - downloads, 0) / 2 / (in_flight * python_row_bytes))
+    batch_size = max(PLAN_MIN_BATCH, min(PLAN_MAX_BATCH, batch_size // PLAN_MIN_BATCH * PLAN_MIN_BATCH))
+    if rows is not None:
+        batch_size = min(batch_size, max(PLAN_MIN_BATCH, rows))
+    peak = base + decoded + downloads + in_flight * batch_size * python_row_bytes
+    if peak > budget:
+        warnings.append(f"Projected peak memory {peak / megabyte:.0f} MB exceeds {memory_mb} MB: "
+                        f"the largest file ({largest_file / megabyte:.0f} MB) is too large for one invocation")
+
+    usable_seconds = timeout_seconds * PLAN_TIMEOUT_SHARE
+    seconds = rows / rate if rows is not None else None
+    if seconds is not None:
+        shard_count = max(1, min(MAX_SHARDS, len(files), math.ceil(seconds / usable_seconds)))
+        if seconds / shard_count > usable_seconds:
+            warnings.append(f"{shard_count} shards still need {seconds / shard_count:.0f}s each, over "
+                            f"{usable_seconds:.0f}s: split the load with predicates")
+    else:
+        shard_count = default_shard_count(files) if files else 1
+
+    recommended = {
+        "mode": "coordinator" if shard_count > 1 else "load",
+        "shard_count": shard_count,
+        "batch_size": batch_size,
+        "download_threads": prefetch,
+        "prefetch_files": prefetch,
+        "convert_workers": convert_workers
+    }
+    if shard_count > 1:
+        recommended["max_parallel_workers"] = shard_count
+
+    return {
+        "files": len(files),
+        "files_skipped": scan.stats["files_skipped"],
+        "bytes": total_bytes,
+        "largest_file_bytes": largest_file,
+        "estimated_rows": rows,
+        "throughput": throughput,
+        "projected_seconds": round(seconds, 1) if seconds is not None else None,
+        "projected_seconds_per_shard": round(seconds / shard_count, 1) if seconds is not None else None,
+        "projected_memory_mb": round(peak / megabyte),
+        "limits": {"memory_mb": memory_mb, "timeout_seconds": timeout_seconds},
+        "recommended": recommended,
+        "warnings": warnings
+    }
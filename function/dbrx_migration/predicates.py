@@ -0,0 +1,274 @@
+"""
+Delta Sharing jsonPredicateHints: file pruning on min/max statistics and
+vectorized evaluation on Arrow tables
+"""
+import json
+from datetime import date, datetime, timezone
+
+
+def _coerce_literal(value, value_type):
+    """
+    Convert a jsonPredicateHints literal or a min/max statistic to a Python
+    value that can be compared. Returns None when it cannot be converted.
+    """
+    if value is None:
+        return None
+    try:
+        if value_type in ("int", "long"):
+            return int(value)
+        if value_type in ("float", "double"):
+            return float(value)
+        if value_type == "boolean":
+            return value if isinstance(value, bool) else str(value).lower() == "true"
+        if value_type == "date":
+            return date.fromisoformat(str(value)[:10])
+        if value_type == "timestamp":
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        return str(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _split_comparison(node):
+    """
+    Return (column_node, literal_node, reversed) for a binary comparison
+    """
+    left, right = node.get("children", [None, None])[:2]
+    if left and right and left.get("op") == "column" and right.get("op") == "literal":
+        return left, right, False
+    if left and right and left.get("op") == "literal" and right.get("op") == "column":
+        return right, left, True
+    return None, None, False
+
+
+def _stat_value(stats, kind, column_name):
+    value = stats.get(kind, {})
+    for part in column_name.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+# jsonPredicateHints valueType of a Delta column type
+_PREDICATE_VALUE_TYPES = {
+    "long": "long",
+    "integer": "int",
+    "short": "int",
+    "byte": "int",
+    "double": "double",
+    "float": "float",
+    "boolean": "boolean",
+    "date": "date",
+    "timestamp": "timestamp"
+}
+
+_FLIPPED_OPS = {
+    "lessThan": "greaterThan",
+    "lessThanOrEqual": "greaterThanOrEqual",
+    "greaterThan": "lessThan",
+    "greaterThanOrEqual": "lessThanOrEqual",
+    "equal": "equal"
+}
+
+
+def file_may_match(add_file, predicate):
+    """
+    Decide from partition values and per-file min/max statistics whether a
+    file can contain rows matching the predicate. Unknown operators or
+    missing statistics always keep the file.
+    """
+    op = predicate.get("op")
+    children = predicate.get("children", [])
+
+    if op == "and":
+        return all(file_may_match(add_file, child) for child in children)
+    if op == "or":
+        return any(file_may_match(add_file, child) for child in children)
+
+    if op == "isNull":
+        column = children[0] if children else {}
+        name = column.get("name")
+        if name in add_file.partition_values:
+            return add_file.partition_values[name] is None
+        stats = json.loads(add_file.stats) if add_file.stats else {}
+        null_count = _stat_value(stats, "nullCount", name or "")
+        return null_count is None or null_count > 0
+
+    if op not in _FLIPPED_OPS:
+        return True
+
+    column, literal, flipped = _split_comparison(predicate)
+    if column is None:
+        return True
+    if flipped:
+        op = _FLIPPED_OPS[op]
+
+    value_type = literal.get("valueType") or column.get("valueType")
+    target = _coerce_literal(literal.get("value"), value_type)
+    name = column.get("name", "")
+
+    if name in add_file.partition_values:
+        low = high = _coerce_literal(add_file.partition_values[name], value_type)
+    else:
+        stats = json.loads(add_file.stats) if add_file.stats else {}
+        low = _coerce_literal(_stat_value(stats, "minValues", name), value_type)
+        high = _coerce_literal(_stat_value(stats, "maxValues", name), value_type)
+
+    try:
+        if op == "equal":
+            return (low is None or low <= target) and (high is None or target <= high)
+        if op == "lessThan":
+            return low is None or low < target
+        if op == "lessThanOrEqual":
+            return low is None or low <= target
+        if op == "greaterThan":
+            return high is None or high > target
+        if op == "greaterThanOrEqual":
+            return high is None or high >= target
+    except TypeError:
+        # Mismatched stat/literal types, keep the file
+        return True
+    return True
+
+
+def _string_array(values):
+    """
+    Build an Arrow string array from Python strings through raw buffers.
+    pa.array()/pa.scalar() on Python objects make pyarrow import pandas,
+    which the Arrow-only load path avoids.
+    """
+    import array
+    import pyarrow as pa
+
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = array.array("i", [0])
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return pa.Array.from_buffers(
+        pa.string(), len(encoded), [None, pa.py_buffer(offsets), pa.py_buffer(b"".join(encoded))]
+    )
+
+
+def _int64_array(values):
+    """
+    Build an Arrow int64 array from Python ints through a raw buffer (see
+    _string_array; pa.array() on a numpy array imports pandas as well)
+    """
+    import array
+    import pyarrow as pa
+
+    buffer = array.array("q", values)
+    return pa.Array.from_buffers(pa.int64(), len(buffer), [None, pa.py_buffer(buffer)])
+
+
+def _constant_array(value, length, arrow_type):
+    """
+    Return `length` copies of a string value (e.g. a partition value) cast
+    to arrow_type, or nulls when value is None
+    """
+    import pyarrow as pa
+
+    if value is None:
+        return pa.nulls(length, arrow_type)
+    indices = pa.Array.from_buffers(pa.int32(), length, [None, pa.py_buffer(bytes(4 * length))])
+    return _string_array([value]).cast(arrow_type).take(indices)
+
+
+def _literal_for_column(arrow_column, literal, value_type):
+    """
+    Build an Arrow scalar for a literal that compares cleanly with a column.
+    Returns (column, scalar), with scalar None if the literal is unusable.
+    """
+    import pyarrow as pa
+
+    value = _coerce_literal(literal.get("value"), value_type)
+    if value is None:
+        return arrow_column, None
+
+    if pa.types.is_dictionary(arrow_column.type):
+        arrow_column = arrow_column.cast(arrow_column.type.value_type)
+    column_type = arrow_column.type
+    if pa.types.is_timestamp(column_type) and hasattr(value, "year"):
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+        # Naive timestamps are compared as UTC, like the Delta statistics
+        text = value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+        return arrow_column, _string_array([text]).cast(pa.timestamp("us")).cast(column_type)[0]
+    if pa.types.is_decimal(column_type) or (pa.types.is_integer(column_type) and isinstance(value, float)):
+        return arrow_column.cast(pa.float64()), _string_array([repr(float(value))]).cast(pa.float64())[0]
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    elif hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return arrow_column, _string_array([str(value)]).cast(column_type)[0]
+
+
+def predicate_mask(arrow_table, predicate, exact=False):
+    """
+    Evaluate a jsonPredicateHints predicate row-wise against an Arrow table.
+    Returns a boolean array, or None when the predicate cannot be evaluated
+    (e.g. on a partition column that is not stored in the file).
+
+    An "and" whose children cannot all be evaluated keeps a superset of the
+    matching rows, which is only safe outside a "not": with exact=True (set
+    for the subtree of a "not") it returns None instead.
+    """
+    import pyarrow.compute as pc
+
+    op = predicate.get("op")
+    children = predicate.get("children", [])
+
+    if op in ("and", "or"):
+        masks = [predicate_mask(arrow_table, child, exact) for child in children]
+        if (op == "or" or exact) and any(mask is None for mask in masks):
+            return None
+        masks = [mask for mask in masks if mask is not None]
+        if not masks:
+            return None
+        combined = masks[0]
+        for mask in masks[1:]:
+            combined = pc.and_kleene(combined, mask) if op == "and" else pc.or_kleene(combined, mask)
+        return combined
+
+    if op == "not":
+        mask = predicate_mask(arrow_table, children[0], exact=True) if children else None
+        return pc.invert(mask) if mask is not None else None
+
+    if op == "isNull":
+        name = children[0].get("name") if children else None
+        if name not in arrow_table.column_names:
+            return None
+        return pc.is_null(arrow_table.column(name))
+
+    if op not in _FLIPPED_OPS:
+        return None
+
+    column, literal, flipped = _split_comparison(predicate)
+    if column is None or column.get("name") not in arrow_table.column_names:
+        return None
+    if flipped:
+        op = _FLIPPED_OPS[op]
+
+    value_type = literal.get("valueType") or column.get("valueType")
+    values, scalar = _literal_for_column(arrow_table.column(column["name"]), literal, value_type)
+    if scalar is None:
+        return None
+    compare = {
+        "equal": pc.equal,
+        "lessThan": pc.less,
+        "lessThanOrEqual": pc.less_equal,
+        "greaterThan": pc.greater,
+        "greaterThanOrEqual": pc.greater_equal
+    }[op]
+    return compare(values, scalar)
+
+
+def _predicate_columns(predicate):
+    names = set()
+    if predicate.get("op") == "column" and predicate.get("name"):
+        names.add(predicate["name"])
+    for child in predicate.get("children", []):
+        names |= _predicate_columns(child)
+    return names
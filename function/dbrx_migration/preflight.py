@@ -0,0 +1,193 @@
+"""
+Pre-flight validation of Arrow batches against the target's column
+definitions
+"""
+import json
+
+from .predicates import _string_array
+from .conversion import arrow_to_rows
+
+
+PREFLIGHT_PREFIX = "Pre-flight: "
+
+
+def get_target_columns(cursor, table_name):
+    """
+    Read a table's column definitions from the data dictionary, keyed by
+    upper-case column name. Returns {} when the table does not exist.
+    """
+    cursor.execute("""
+        SELECT column_name, data_type, data_length, char_length, char_used,
+               data_precision, data_scale, nullable
+        FROM user_tab_columns
+        WHERE table_name = :1
+    """, [table_name.upper()])
+    column_defs = {}
+    for name, data_type, data_length, char_length, char_used, precision, scale, nullable in cursor.fetchall():
+        column_defs[name] = {
+            "data_type": data_type,
+            "byte_length": data_length if char_used == "B" else None,
+            "char_length": char_length if char_used == "C" else None,
+            "precision": precision,
+            "scale": scale or 0,
+            "nullable": nullable == "Y"
+        }
+    return column_defs
+
+
+def column_defs_from_fields(fields):
+    """
+    Column definitions of the table generate_create_table_sql would create
+    """
+    column_defs = {}
+    for field in fields:
+        delta_type = field["type"] if isinstance(field["type"], str) else "string"
+        column_def = {"data_type": "VARCHAR2", "byte_length": None, "char_length": None,
+                      "precision": None, "scale": 0, "nullable": True}
+        if delta_type.startswith("decimal"):
+            precision, scale = delta_type[len("decimal("):-1].split(",")
+            column_def.update(data_type="NUMBER", precision=int(precision), scale=int(scale))
+        elif delta_type in ("long", "integer", "short", "byte", "float", "double", "boolean"):
+            column_def["data_type"] = "NUMBER"
+        elif delta_type in ("date", "timestamp", "timestamp_ntz"):
+            column_def["data_type"] = "DATE"
+        else:
+            column_def["byte_length"] = 4000
+        column_defs[field["name"].upper()] = column_def
+    return column_defs
+
+
+def _scalar(value, arrow_type):
+    # Through a string buffer, see _string_array
+    return _string_array([str(value)]).cast(arrow_type)[0]
+
+
+class PreflightValidator:
+    """
+    Vectorized checks of Arrow batches against target column definitions.
+    Violations carry the ORA code Oracle would raise for the row.
+    """
+
+    def __init__(self, column_defs, sample_size=20):
+        self.column_defs = column_defs
+        self.sample_size = sample_size
+
+    def violations(self, arrow_table):
+        """
+        Return (column, code, message, mask) for each failed check, where
+        mask is a boolean array marking the violating rows
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        false = _scalar("false", pa.bool_())
+        found = []
+
+        def add(column_name, code, message, mask):
+            mask = pc.coalesce(mask, false)
+            if pc.any(mask).as_py():
+                found.append((column_name, code, message, mask))
+
+        for column_name in arrow_table.column_names:
+            column_def = self.column_defs.get(column_name.upper())
+            if column_def is None:
+                continue
+            column = arrow_table.column(column_name)
+            if pa.types.is_dictionary(column.type):
+                column = column.cast(column.type.value_type)
+            column_type = column.type
+            data_type = column_def["data_type"]
+            target = f"{column_name.upper()} {data_type}"
+
+            if not column_def["nullable"] and column.null_count:
+                add(column_name, 1400, f"ORA-01400: cannot insert NULL into ({column_name.upper()})",
+                    pc.is_null(column))
+
+            is_string = pa.types.is_string(column_type) or pa.types.is_large_string(column_type)
+            if data_type in ("VARCHAR2", "NVARCHAR2", "CHAR", "NCHAR") and is_string:
+                if column_def["byte_length"]:
+                    limit = column_def["byte_length"]
+                    add(column_name, 12899, f"ORA-12899: value too large for column {target}({limit} BYTE)",
+                        pc.greater(pc.binary_length(column), _scalar(limit, pa.int32())))
+                if column_def["char_length"]:
+                    limit = column_def["char_length"]
+                    add(column_name, 12899, f"ORA-12899: value too large for column {target}({limit} CHAR)",
+                        pc.greater(pc.utf8_length(column), _scalar(limit, pa.int32())))
+
+            elif data_type == "NUMBER" and column_def["precision"]:
+                if pa.types.is_integer(column_type) or pa.types.is_floating(column_type) or pa.types.is_decimal(column_type):
+                    # Extra scale is rounded by Oracle; too many integer digits is an error
+                    precision, scale = column_def["precision"], column_def["scale"]
+                    limit = _scalar(repr(10.0 ** (precision - scale)), pa.float64())
+                    add(column_name, 1438,
+                        f"ORA-01438: value larger than specified precision allowed for this column "
+                        f"({column_name.upper()} NUMBER({precision},{scale}))",
+                        pc.greater_equal(pc.abs(column.cast(pa.float64())), limit))
+
+            elif data_type == "DATE" or data_type.startswith("TIMESTAMP"):
+                if pa.types.is_date(column_type) or pa.types.is_timestamp(column_type):
+                    years = pc.year(column)
+                    add(column_name, 1841, f"ORA-01841: (full) year must be between -4713 and +9999 ({column_name.upper()})",
+                        pc.or_(pc.less(years, _scalar(1, pa.int64())), pc.greater(years, _scalar(9999, pa.int64()))))
+                elif is_string:
+                    parsed = pc.strptime(column, format="%Y-%m-%d", unit="s", error_is_null=True)
+                    add(column_name, 1861, f"ORA-01861: literal does not match format string ({column_name.upper()})",
+                        pc.and_(pc.is_valid(column), pc.is_null(parsed)))
+        return found
+
+    def split(self, arrow_table, first_offset, found=None):
+        """
+        Separate violating rows. Returns (valid rows, their source offsets,
+        [(offset, code, message, row)] for the violating rows).
+        """
+        import pyarrow.compute as pc
+
+        if found is None:
+            found = self.violations(arrow_table)
+        if not found:
+            return arrow_table, range(first_offset, first_offset + arrow_table.num_rows), []
+
+        invalid_mask = found[0][3]
+        for _, _, _, mask in found[1:]:
+            invalid_mask = pc.or_(invalid_mask, mask)
+
+        # First violation per row, in check order
+        reasons = {}
+        for _, code, message, mask in found:
+            for index in pc.indices_nonzero(mask).to_pylist():
+                reasons.setdefault(index, (code, PREFLIGHT_PREFIX + message))
+
+        invalid_indices = pc.indices_nonzero(invalid_mask).to_pylist()
+        invalid_rows = arrow_to_rows(arrow_table.filter(invalid_mask))
+        invalid = [
+            (first_offset + index, reasons[index][0], reasons[index][1], row)
+            for index, row in zip(invalid_indices, invalid_rows)
+        ]
+        valid_mask = pc.invert(invalid_mask)
+        offsets = [first_offset + index for index in pc.indices_nonzero(valid_mask).to_pylist()]
+        return arrow_table.filter(valid_mask), offsets, invalid
+
+
+def preflight_check(scan, validator):
+    """
+    Validate every batch of a scan without loading it. Returns the number
+    of rows checked and invalid, violation counts per column and ORA code,
+    and a sample of violating rows.
+    """
+    report = {"rows_checked": 0, "rows_invalid": 0, "violations": {}, "sample": []}
+    import pyarrow.compute as pc
+
+    for arrow_table in scan:
+        found = validator.violations(arrow_table)
+        for column_name, code, _, mask in found:
+            counts = report["violations"].setdefault(column_name, {})
+            counts[f"ORA-{code:05d}"] = counts.get(f"ORA-{code:05d}", 0) + pc.sum(mask).as_py()
+        _, _, invalid = validator.split(arrow_table, report["rows_checked"], found)
+        report["rows_checked"] += arrow_table.num_rows
+        report["rows_invalid"] += len(invalid)
+        for offset, code, message, row in invalid[:validator.sample_size - len(report["sample"])]:
+            report["sample"].append({
+                "offset": offset, "code": code, "message": message[len(PREFLIGHT_PREFIX):],
+                "row": json.loads(json.dumps(list(row), default=str))
+            })
+    return report
@@ -0,0 +1,88 @@
+"""
+Transient errors: the HTTP statuses, ORA codes and driver errors worth
+retrying, and the backoff policy shared by the downloads and ATP writes
+"""
+import logging
+import sys
+import time
+
+
+TRANSIENT_HTTP_STATUS = (408, 429, 500, 502, 503, 504)
+# ORA-03113/03114/03135 lost connection, ORA-12170/12537/12547/12571 TNS
+# timeouts and lost contact, ORA-25408 cannot safely replay call
+TRANSIENT_ORA_CODES = (3113, 3114, 3135, 12170, 12537, 12547, 12571, 25408)
+# python-oracledb thin mode: connection closed by the database or network
+TRANSIENT_DPY_CODES = ("DPY-4011",)
+DEFAULT_RETRIES = 5
+
+
+def is_expired_url_response(resp):
+    """
+    True for the 400/403 object stores return once a presigned URL expires
+    (S3 "Request has expired", Azure "Signature not valid...", GCS "ExpiredToken")
+    """
+    text = resp.text.lower() if resp.text else ""
+    return resp.status_code in (400, 403) and ("expire" in text or "signature" in text)
+
+
+def is_transient_error(error):
+    """
+    Classify an exception from a download or an Oracle call as worth retrying
+    """
+    import requests
+
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return (error.response.status_code in TRANSIENT_HTTP_STATUS
+                or is_expired_url_response(error.response))
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return True
+
+    oracledb = sys.modules.get("oracledb")
+    if oracledb is not None and isinstance(error, oracledb.Error) and error.args:
+        ora_error = error.args[0]
+        return (getattr(ora_error, "isrecoverable", False)
+                or getattr(ora_error, "code", None) in TRANSIENT_ORA_CODES
+                or getattr(ora_error, "full_code", None) in TRANSIENT_DPY_CODES)
+    return False
+
+
+class RetryPolicy:
+    """
+    Exponential backoff for transient errors, shared by the source reads and
+    the Oracle writes of one run so the retry metrics add up in one place
+    """
+
+    def __init__(self, retries=DEFAULT_RETRIES, backoff_factor=1.0, max_backoff=30):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.stats = {"retries": 0, "backoff_seconds": 0.0, "reconnects": 0, "url_refreshes": 0}
+
+    def should_retry(self, error, attempt):
+        return attempt < self.retries and is_transient_error(error)
+
+    def backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        logging.getLogger().info(f"Retry {attempt}/{self.retries} in {delay:.1f}s")
+        time.sleep(delay)
+        self.stats["retries"] += 1
+        self.stats["backoff_seconds"] += delay
+
+    def call(self, fn, on_retry=None):
+        """
+        Call fn(), retrying transient errors; on_retry(error) runs before each retry
+        """
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+                attempt += 1
+                self.backoff(attempt)
+                if on_retry is not None:
+                    on_retry(e)
+
+    def summary(self):
+        return dict(self.stats, backoff_seconds=round(self.stats["backoff_seconds"], 3))
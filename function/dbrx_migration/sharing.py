@@ -0,0 +1,861 @@
+"""
+Delta Sharing REST client and the shared-table scan: file listing with
+predicate hints, file pruning, pooled Parquet downloads and projected reads
+"""
+import functools
+import io
+import json
+import logging
+import os
+import threading
+from collections import deque, namedtuple
+
+from .conversion import compact_table, delta_to_arrow_type
+from .predicates import _constant_array, _predicate_columns, file_may_match, predicate_mask
+from .retry import TRANSIENT_HTTP_STATUS
+
+
+DEFAULT_DOWNLOAD_THREADS = 4
+# Coordinator mode: compressed Parquet bytes per worker invocation when
+# shard_count is not given, and the most workers it starts
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024
+MAX_SHARDS = 32
+# Spooled scan output for replay by a retried run (/tmp survives between
+# invocations of a warm container, not across containers)
+DEFAULT_SPOOL_DIR = "/tmp/dbrx-spool"
+DEFAULT_SPOOL_MAX_MB = 256
+# Sampling keeps at least this many files, and row groups of each sampled
+# file, where there are that many before sampling rows, so a small sample
+# is still spread over the table
+DEFAULT_SAMPLE_SEED = 0
+SAMPLE_MIN_FILES = 8
+SAMPLE_MIN_ROW_GROUPS = 4
+# Bytes fetched from the end of a sampled file for its footer (what
+# pyarrow reads first), and the largest gap between the column chunks
+# fetched in one range request
+SAMPLE_FOOTER_BYTES = 64 * 1024
+SAMPLE_RANGE_GAP = 256 * 1024
+
+SharedTable = namedtuple("SharedTable", ["share", "schema", "name"])
+SharedFile = namedtuple("SharedFile", ["url", "id", "partition_values", "size", "stats"])
+TableFiles = namedtuple("TableFiles", ["version", "schema_string", "files"])
+SampledParquet = namedtuple("SampledParquet", ["source", "metadata", "row_groups", "row_fraction", "row_seed"])
+
+
+class SharingRestClient:
+    """
+    Minimal Delta Sharing REST client for bearer token profiles. Talking to
+    the server with requests directly keeps the delta_sharing package, and
+    the pandas/fsspec import chain it pulls in, off the load path.
+    """
+
+    def __init__(self, profile, timeout=120):
+        import requests
+
+        self.endpoint = profile["endpoint"].rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {profile['bearerToken']}",
+            "User-Agent": "dbrx-to-atp-migration"
+        })
+
+    def _table_path(self, table):
+        from urllib.parse import quote
+
+        return (f"{self.endpoint}/shares/{quote(table.share, safe='')}"
+                f"/schemas/{quote(table.schema, safe='')}/tables/{quote(table.name, safe='')}")
+
+    def query_table_version(self, table):
+        resp = self.session.get(f"{self._table_path(table)}/version", timeout=self.timeout)
+        resp.raise_for_status()
+        return int(resp.headers["delta-table-version"])
+
+    def list_files_in_table(self, table, jsonPredicateHints=None, limitHint=None, version=None):
+        data = {}
+        if jsonPredicateHints is not None:
+            data["jsonPredicateHints"] = jsonPredicateHints
+        if limitHint is not None:
+            data["limitHint"] = limitHint
+        if version is not None:
+            data["version"] = version
+
+        resp = self.session.post(f"{self._table_path(table)}/query", json=data, timeout=self.timeout)
+        resp.raise_for_status()
+
+        schema_string = None
+        files = []
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            action = json.loads(line)
+            if "metaData" in action:
+                schema_string = action["metaData"]["schemaString"]
+            elif "file" in action:
+                f = action["file"]
+                files.append(SharedFile(
+                    f["url"], f["id"], f.get("partitionValues", {}), int(f["size"]), f.get("stats")
+                ))
+        return TableFiles(int(resp.headers["delta-table-version"]), schema_string, files)
+
+
+def get_sharing_rest_client(profile_path, share_name, schema_name, table_name):
+    """
+    Return a Delta Sharing REST client and the table it should query.
+    Bearer token profiles use the lightweight SharingRestClient; other
+    profile types (e.g. OAuth) fall back to the delta_sharing package.
+    """
+    table = SharedTable(share_name, schema_name, table_name)
+
+    with open(profile_path) as f:
+        profile = json.load(f)
+    if profile.get("shareCredentialsVersion", 1) == 1 and profile.get("bearerToken"):
+        return SharingRestClient(profile), table
+
+    from delta_sharing.protocol import DeltaSharingProfile
+    from delta_sharing.rest_client import DataSharingRestClient
+
+    return DataSharingRestClient(DeltaSharingProfile.read_from_file(profile_path)), table
+
+
+def get_delta_table_version(profile_path, share_name, schema_name, table_name):
+    """
+    Return the current version of a shared table via the Delta Sharing
+    table version endpoint (a single HEAD-style request, no file listing)
+    """
+    rest_client, table = get_sharing_rest_client(profile_path, share_name, schema_name, table_name)
+    version = rest_client.query_table_version(table)
+    return version if isinstance(version, int) else version.delta_table_version
+
+
+def list_table_files(profile_path, share_name, schema_name, table_name,
+                     version=None, predicate=None, limit=None):
+    """
+    List the Parquet files of a shared table, passing the predicate to the
+    server as jsonPredicateHints so it can skip files on its side
+    """
+    rest_client, table = get_sharing_rest_client(profile_path, share_name, schema_name, table_name)
+    listing = rest_client.list_files_in_table(
+        table,
+        jsonPredicateHints=json.dumps(predicate) if predicate else None,
+        # A limit hint is only safe when every returned row is kept
+        limitHint=limit if predicate is None else None,
+        version=version
+    )
+    if isinstance(listing, TableFiles):
+        return listing
+
+    return TableFiles(
+        listing.delta_table_version,
+        listing.metadata.schema_string,
+        [SharedFile(f.url, f.id, f.partition_values, f.size, f.stats) for f in listing.add_files]
+    )
+
+
+class ParquetDownloader:
+    """
+    Downloads presigned Parquet files concurrently. Each worker thread keeps
+    its own keep-alive pooled requests session, transient errors (connection
+    resets, 429 and 5xx responses) are retried with exponential backoff, and
+    results are yielded in input order while up to `prefetch` later files
+    are fetched in the background.
+    """
+
+    def __init__(self, max_workers=DEFAULT_DOWNLOAD_THREADS, prefetch=None,
+                 retries=5, backoff_factor=0.5, timeout=120):
+        self.max_workers = max(1, max_workers)
+        self.prefetch = max(1, prefetch if prefetch is not None else self.max_workers)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=self.retries,
+                connect=self.retries,
+                read=self.retries,
+                status=self.retries,
+                backoff_factor=self.backoff_factor,
+                status_forcelist=TRANSIENT_HTTP_STATUS,
+                allowed_methods=frozenset(["GET"])
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def fetch(self, url):
+        """
+        Download one file into memory
+        """
+        resp = self._session().get(url, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.content
+
+    def fetch_file(self, add_file):
+        """
+        Download a file action's whole file, see fetch
+        """
+        return self.fetch(add_file.url)
+
+    def fetch_range(self, url, start, end):
+        """
+        Download bytes [start, end) of a file. Returns (content, partial):
+        a server that ignores the Range header sends the whole file
+        """
+        resp = self._session().get(url, headers={"Range": f"bytes={start}-{end - 1}"}, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.content, resp.status_code == 206
+
+    def iter_fetch(self, files, fetch=None):
+        """
+        Yield (file, content) for each file action, in order. `fetch`
+        (add_file -> content) replaces fetch_file, downloading the whole file.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        fetch = fetch or self.fetch_file
+        files = iter(files)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                for add_file in files:
+                    pending.append((add_file, pool.submit(fetch, add_file)))
+                    if len(pending) >= self.prefetch:
+                        break
+
+                while pending:
+                    add_file, future = pending.popleft()
+                    content = future.result()
+                    next_file = next(files, None)
+                    if next_file is not None:
+                        pending.append((next_file, pool.submit(fetch, next_file)))
+                    yield add_file, content
+            finally:
+                # Stopped early (limit reached or error): drop queued downloads
+                for _, future in pending:
+                    future.cancel()
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+
+
+class RangeFile(io.RawIOBase):
+    """
+    Read-only file over a presigned URL that downloads the byte ranges read
+    from it with HTTP range requests and keeps them. load() fetches a range
+    ahead of the reads; a server that ignores Range sends the whole file,
+    which is then kept instead.
+    """
+
+    def __init__(self, downloader, url, size):
+        super().__init__()
+        self.downloader = downloader
+        self.url = url
+        self.size = size
+        self.position = 0
+        self.bytes_fetched = 0
+        self._ranges = {}
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = base + offset
+        return self.position
+
+    def _cached(self, start, end):
+        for offset, content in self._ranges.items():
+            if offset <= start and end <= offset + len(content):
+                return content[start - offset:end - offset]
+        return None
+
+    def load(self, start, end):
+        if self._cached(start, end) is not None:
+            return
+        content, partial = self.downloader.fetch_range(self.url, start, end)
+        self.bytes_fetched += len(content)
+        if partial:
+            self._ranges[start] = content
+        else:
+            self._ranges = {0: content}
+
+    def readinto(self, buffer):
+        end = min(self.size, self.position + len(buffer))
+        if end <= self.position:
+            return 0
+        self.load(self.position, end)
+        content = self._cached(self.position, end)
+        buffer[:len(content)] = content
+        self.position += len(content)
+        return len(content)
+
+
+class TableSample:
+    """
+    A deterministic sample of about `fraction` of a table's rows, or of
+    `rows` rows by the files' numRecords statistics, drawn in three
+    stages: files, row groups of each sampled file, then rows of those row
+    groups. Files and row groups are ranked by a hash of `seed` and their
+    id, rows by a random draw seeded from it, so the same seed returns the
+    same subset of a table version. Each stage keeps at least
+    SAMPLE_MIN_FILES / SAMPLE_MIN_ROW_GROUPS units (where there are that
+    many) and leaves the rest of the fraction to the next one. Only the
+    footer and the sampled row groups' column chunks of a file are
+    downloaded, with range requests.
+    """
+
+    def __init__(self, fraction=None, rows=None, seed=DEFAULT_SAMPLE_SEED):
+        self.fraction = fraction
+        self.rows = rows
+        self.seed = seed
+        # Share of the rows of a sampled file to keep
+        self.file_fraction = 1.0
+        self.stats = {"files_total": 0, "files_sampled": 0, "row_groups_total": 0, "row_groups_sampled": 0}
+
+    def _rank(self, *parts):
+        import hashlib
+
+        return hashlib.sha256(json.dumps([self.seed, *parts]).encode()).hexdigest()
+
+    @staticmethod
+    def _split(fraction, units, minimum):
+        """
+        Return how many of `units` to keep for `fraction` of their rows,
+        at least `minimum` (or all), and the fraction left within them
+        """
+        if units == 0:
+            return 0, fraction
+        keep = int(min(units, max(-(-units * fraction // 1), minimum, 1)))
+        return keep, min(1.0, fraction * units / keep)
+
+    def choose_files(self, files):
+        """
+        Return the sampled files, in listing order
+        """
+        if self.fraction is None:
+            counts = file_row_counts(files)
+            if None in counts:
+                raise ValueError("sample_rows needs numRecords statistics on every file, use sample_fraction")
+            self.fraction = min(1.0, self.rows / sum(counts)) if sum(counts) else 1.0
+        keep, self.file_fraction = self._split(self.fraction, len(files), SAMPLE_MIN_FILES)
+        chosen = {add_file.id for add_file in sorted(files, key=lambda add_file: self._rank(add_file.id))[:keep]}
+        self.stats["files_total"] += len(files)
+        self.stats["files_sampled"] += len(chosen)
+        return [add_file for add_file in files if add_file.id in chosen]
+
+    def fetch(self, downloader, add_file, columns=None):
+        """
+        Download a sampled file's footer and the column chunks (of
+        `columns`, None for all) of its sampled row groups
+        """
+        import pyarrow.parquet as pq
+
+        source = RangeFile(downloader, add_file.url, add_file.size)
+        source.load(max(0, add_file.size - SAMPLE_FOOTER_BYTES), add_file.size)
+        metadata = pq.read_metadata(source)
+        keep, row_fraction = self._split(self.file_fraction, metadata.num_row_groups, SAMPLE_MIN_ROW_GROUPS)
+        row_groups = sorted(sorted(range(metadata.num_row_groups), key=lambda rg: self._rank(add_file.id, rg))[:keep])
+
+        spans = []
+        for rg in row_groups:
+            row_group = metadata.row_group(rg)
+            for ci in range(row_group.num_columns):
+                chunk = row_group.column(ci)
+                if columns is None or chunk.path_in_schema.split(".")[0] in columns:
+                    start = min(offset for offset in (chunk.dictionary_page_offset, chunk.data_page_offset) if offset)
+                    spans.append((start, start + chunk.total_compressed_size))
+        merged = []
+        for start, end in sorted(spans):
+            if merged and start - merged[-1][1] <= SAMPLE_RANGE_GAP:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        for start, end in merged:
+            source.load(start, end)
+        return SampledParquet(source, metadata, row_groups, row_fraction, int(self._rank(add_file.id, "rows")[:8], 16))
+
+    @staticmethod
+    def read(sampled, columns=None, read_dictionary=None):
+        """
+        Read the sampled row groups of a fetched file (all of them if it
+        has none to choose from) and sample their rows
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(sampled.source, metadata=sampled.metadata, read_dictionary=read_dictionary)
+        if not sampled.row_groups:
+            return parquet_file.read(columns=columns, use_threads=False)
+        table = parquet_file.read_row_groups(sampled.row_groups, columns=columns, use_threads=False)
+        if sampled.row_fraction < 1:
+            draws = pc.random(table.num_rows, initializer=sampled.row_seed)
+            table = table.filter(pc.less(draws, pa.scalar(sampled.row_fraction)))
+        return table
+
+    def summary(self):
+        return dict(self.stats, fraction=self.fraction, seed=self.seed)
+
+
+def read_parquet_file(add_file, content, columns, predicate, fields):
+    """
+    Decode one Parquet file into an Arrow table, reading only the requested
+    columns (plus any the predicate needs) and applying the predicate
+    row-wise. String columns stored with a dictionary page are read
+    dictionary-encoded and the table is compacted (see compact_table).
+    `content` is the file's bytes or a SampledParquet, read with
+    TableSample.read.
+    Returns (table, compressed bytes of columns not decoded, bytes saved
+    by the compact representation).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sampled = content if isinstance(content, SampledParquet) else None
+    if sampled is not None:
+        metadata = sampled.metadata
+        row_groups = sampled.row_groups
+    else:
+        metadata = pq.read_metadata(io.BytesIO(content))
+        row_groups = range(metadata.num_row_groups)
+    schema = metadata.schema.to_arrow_schema()
+    dictionary_columns = set()
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        for ci in range(row_group.num_columns):
+            chunk = row_group.column(ci)
+            if chunk.has_dictionary_page:
+                dictionary_columns.add(chunk.path_in_schema)
+    read_dictionary = [
+        field.name for field in schema
+        if field.name in dictionary_columns and pa.types.is_string(field.type)
+    ]
+
+    file_columns = schema.names
+
+    read_columns = None
+    if columns is not None:
+        wanted = set(columns) | (_predicate_columns(predicate) if predicate else set())
+        read_columns = [c for c in file_columns if c in wanted]
+
+    skipped_bytes = 0
+    if read_columns is not None:
+        for rg in row_groups:
+            row_group = metadata.row_group(rg)
+            for ci in range(row_group.num_columns):
+                chunk = row_group.column(ci)
+                if chunk.path_in_schema.split(".")[0] not in read_columns:
+                    skipped_bytes += chunk.total_compressed_size
+
+    if sampled is not None:
+        arrow_table = TableSample.read(sampled, read_columns, read_dictionary)
+    else:
+        parquet_file = pq.ParquetFile(io.BytesIO(content), metadata=metadata, read_dictionary=read_dictionary)
+        arrow_table = parquet_file.read(columns=read_columns, use_threads=False)
+    if predicate:
+        mask = predicate_mask(arrow_table, predicate)
+        if mask is not None:
+            arrow_table = arrow_table.filter(mask)
+
+    # Partition columns are not stored in the data files
+    for field in fields:
+        col = field["name"]
+        if col in arrow_table.column_names or (columns is not None and col not in columns):
+            continue
+        arrow_type = delta_to_arrow_type(field["type"]) or pa.string()
+        values = _constant_array(add_file.partition_values.get(col), arrow_table.num_rows, arrow_type)
+        arrow_table = arrow_table.append_column(col, values)
+
+    arrow_table, saved_bytes = compact_table(arrow_table)
+    return arrow_table, skipped_bytes, saved_bytes
+
+
+def shard_files(files, shard_count):
+    """
+    Split files into shard_count lists balanced by size (largest file to the
+    lightest shard first). Deterministic for a given file list, so every
+    worker computes the same split; each shard keeps the listing order.
+    """
+    totals = [0] * shard_count
+    assignment = {}
+    for position, add_file in sorted(enumerate(files), key=lambda item: (-item[1].size, item[1].id)):
+        shard = min(range(shard_count), key=lambda i: (totals[i], i))
+        totals[shard] += add_file.size
+        assignment[position] = shard
+    shards = [[] for _ in range(shard_count)]
+    for position, add_file in enumerate(files):
+        shards[assignment[position]].append(add_file)
+    return shards
+
+
+def file_row_counts(files):
+    """
+    Return each file's numRecords statistic, None where it has none
+    """
+    counts = []
+    for add_file in files:
+        stats = json.loads(add_file.stats) if add_file.stats else {}
+        counts.append(stats.get("numRecords"))
+    return counts
+
+
+def files_for_limit(files, limit):
+    """
+    Return the leading files that hold the first `limit` rows by their
+    numRecords statistics (files without statistics are kept and not counted)
+    """
+    needed = []
+    rows = 0
+    for add_file, count in zip(files, file_row_counts(files)):
+        if rows >= limit:
+            break
+        needed.append(add_file)
+        rows += count or 0
+    return needed
+
+
+def default_shard_count(files, shard_bytes=DEFAULT_SHARD_BYTES):
+    total_bytes = sum(add_file.size for add_file in files)
+    return max(1, min(len(files), MAX_SHARDS, -(-total_bytes // shard_bytes)))
+
+
+class BatchSpool:
+    """
+    Spools a scan's Arrow tables, one Arrow IPC file per source file, so a
+    retried run of the same selection replays them instead of downloading
+    and decoding the files again. A manifest records each file's rows,
+    size and SHA-256; replay memory-maps the file and checks the hash,
+    and a file that fails it is dropped and downloaded again. Spooling
+    stops once max_bytes are spooled (or the disk is short), keeping what
+    is there. Spools of the same source under another key (e.g. an older
+    version) are removed when a spool is opened; clear() removes this one
+    once the load is verified.
+    """
+
+    def __init__(self, directory, source_name, key, max_bytes=DEFAULT_SPOOL_MAX_MB * 1024 * 1024):
+        import hashlib
+
+        prefix = "".join(c if c.isalnum() else "_" for c in source_name)
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        self.root = directory
+        self.path = os.path.join(directory, f"{prefix}-{digest}")
+        self.max_bytes = max_bytes
+        self.stats = {"files_written": 0, "bytes_written": 0, "files_replayed": 0, "bytes_replayed": 0,
+                      "checksum_failures": 0, "capped": False, "cleared": False}
+
+        os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.startswith(f"{prefix}-") and os.path.join(directory, name) != self.path:
+                self._remove(os.path.join(directory, name))
+        self._manifest_path = os.path.join(self.path, "manifest.json")
+        try:
+            with open(self._manifest_path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _remove(path):
+        import shutil
+
+        shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _checksum(path):
+        import hashlib
+
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            return hashlib.sha256(source.read_buffer()).hexdigest()
+
+    def _save(self):
+        # Replace the manifest atomically, so a crash never leaves a torn one
+        with open(self._manifest_path + ".tmp", "w") as f:
+            json.dump(self.entries, f)
+        os.replace(self._manifest_path + ".tmp", self._manifest_path)
+
+    def spooled_bytes(self):
+        return sum(entry["bytes"] for entry in self.entries.values())
+
+    def replay(self, file_id):
+        """
+        Return the spooled table of a source file (memory-mapped), or None
+        if it is not spooled or its checksum does not match
+        """
+        import pyarrow as pa
+
+        entry = self.entries.get(file_id)
+        if entry is None:
+            return None
+        path = os.path.join(self.path, entry["name"])
+        try:
+            valid = self._checksum(path) == entry["sha256"]
+        except OSError:
+            valid = False
+        if not valid:
+            logging.getLogger().warning(f"Spooled {entry['name']} is missing or corrupt, reading the source file")
+            self.stats["checksum_failures"] += 1
+            del self.entries[file_id]
+            self._save()
+            return None
+        arrow_table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        self.stats["files_replayed"] += 1
+        self.stats["bytes_replayed"] += entry["bytes"]
+        return arrow_table
+
+    def write(self, file_id, arrow_table):
+        """
+        Spool a source file's table unless the cap (or free disk) is reached
+        """
+        import hashlib
+        import shutil
+
+        import pyarrow as pa
+
+        if self.stats["capped"] or file_id in self.entries:
+            return
+        spooled = self.spooled_bytes()
+        if (spooled + arrow_table.nbytes > self.max_bytes
+                or shutil.disk_usage(self.path).free < 2 * arrow_table.nbytes):
+            logging.getLogger().info(f"Spool full at {spooled} bytes, not spooling further files")
+            self.stats["capped"] = True
+            return
+        # Named after the source file, so a name is never reused by another
+        # entry (a count of entries repeats once a corrupt one is dropped)
+        name = hashlib.sha256(file_id.encode()).hexdigest() + ".arrow"
+        path = os.path.join(self.path, name)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        size = os.path.getsize(path)
+        self.entries[file_id] = {"name": name, "rows": arrow_table.num_rows, "bytes": size,
+                                 "sha256": self._checksum(path)}
+        self._save()
+        self.stats["files_written"] += 1
+        self.stats["bytes_written"] += size
+
+    def clear(self):
+        self._remove(self.path)
+        self.entries = {}
+        self.stats["cleared"] = True
+
+    def summary(self):
+        return dict(self.stats, directory=self.path, files_spooled=len(self.entries))
+
+
+def open_spool(directory, max_mb, source_name, version, columns, predicate, limit, shard=None, sample=None):
+    """
+    Open the spool of a scan selection, or None (logged) when the
+    directory cannot be used
+    """
+    try:
+        return BatchSpool(
+            directory, source_name,
+            {"version": version, "columns": columns, "predicate": predicate, "limit": limit, "shard": shard,
+             "sample": sample},
+            int(max_mb * 1024 * 1024)
+        )
+    except OSError as e:
+        logging.getLogger().warning(f"Cannot spool to {directory}, loading without a spool: {e}")
+        return None
+
+
+class SharedTableScan:
+    """
+    Streams a shared table as Arrow tables, one per Parquet file, with
+    server-side predicate hints, client-side file pruning on min/max
+    statistics and Parquet column projection, optionally reading only a
+    TableSample of it. `stats` is updated as the scan progresses.
+    """
+
+    def __init__(self, profile_path, share_name, schema_name, table_name, downloader,
+                 version=None, columns=None, predicate=None, limit=None, retry=None, shard=None, spool=None,
+                 sample=None):
+        self.downloader = downloader
+        self.spool = spool
+        self.sample = sample
+        self.columns = columns
+        self.predicate = predicate
+        self.limit = limit
+        self.retry = retry
+        self._listing_args = (profile_path, share_name, schema_name, table_name, version)
+
+        listing = list_table_files(
+            profile_path, share_name, schema_name, table_name,
+            version=version, predicate=predicate, limit=limit
+        )
+        self.schema_json = json.loads(listing.schema_string)
+        self.fields = self.schema_json["fields"]
+        schema_columns = [field["name"] for field in self.fields]
+
+        if columns is not None:
+            unknown = [c for c in columns if c not in schema_columns]
+            if unknown:
+                raise ValueError(f"Unknown columns requested: {unknown}")
+        self.output_columns = columns if columns is not None else schema_columns
+
+        self.files = []
+        self.current_file = None
+        self.stats = {
+            "files_total": len(listing.files),
+            "files_scanned": 0,
+            "files_skipped": 0,
+            "bytes_scanned": 0,
+            "bytes_skipped": 0,
+            "column_bytes_skipped": 0,
+            "rows_read": 0,
+            "arrow_bytes": 0,
+            "memory_saved_bytes": 0
+        }
+        for add_file in listing.files:
+            if predicate and not file_may_match(add_file, predicate):
+                self.stats["files_skipped"] += 1
+                self.stats["bytes_skipped"] += add_file.size
+            else:
+                self.files.append(add_file)
+        if limit is not None and predicate is None:
+            # Every row is kept, so later files are never needed, not even to prefetch
+            self.files = files_for_limit(self.files, limit)
+
+        if sample is not None:
+            # Sampled before sharding, so every worker draws the same files
+            self.files = sample.choose_files(self.files)
+
+        if shard is not None:
+            # Only this worker's share of the remaining files
+            shard_index, shard_count = shard
+            self.files = shard_files(self.files, shard_count)[shard_index]
+
+    def output_fields(self):
+        """
+        Return the Delta schema fields of the scan's output columns, in order
+        """
+        by_name = {field["name"]: field for field in self.fields}
+        return [by_name[col] for col in self.output_columns]
+
+    def estimated_rows(self):
+        """
+        Rows in the files to scan from their numRecords statistics (capped
+        by the limit), or None if a file has none
+        """
+        total = 0
+        for add_file in self.files:
+            stats = json.loads(add_file.stats) if add_file.stats else {}
+            if stats.get("numRecords") is None:
+                return None
+            total += stats["numRecords"]
+        if self.sample is not None:
+            total = int(total * self.sample.file_fraction)
+        return min(total, self.limit) if self.limit is not None else total
+
+    def refresh_urls(self):
+        """
+        Re-list the files (same version) for freshly signed URLs
+        """
+        profile_path, share_name, schema_name, table_name, version = self._listing_args
+        listing = list_table_files(
+            profile_path, share_name, schema_name, table_name,
+            version=version, predicate=self.predicate, limit=self.limit
+        )
+        urls = {add_file.id: add_file.url for add_file in listing.files}
+        self.files = [add_file._replace(url=urls.get(add_file.id, add_file.url)) for add_file in self.files]
+
+    def __iter__(self):
+        # Files spooled by an earlier run of this selection are replayed first
+        replayed = set()
+        if self.spool is not None:
+            for add_file in self.files:
+                arrow_table = self.spool.replay(add_file.id)
+                if arrow_table is None:
+                    continue
+                replayed.add(add_file.id)
+                self.current_file = add_file.url.split("?")[0].rsplit("/", 1)[-1]
+                self.stats["files_scanned"] += 1
+                self.stats["bytes_scanned"] += add_file.size
+                self.stats["rows_read"] += arrow_table.num_rows
+                yield arrow_table
+                if self.limit is not None and self.stats["rows_read"] >= self.limit:
+                    return
+
+        fetch = None
+        if self.sample is not None:
+            # Only the sampled row groups of the columns read are downloaded
+            read_columns = None
+            if self.columns is not None:
+                read_columns = set(self.columns) | (_predicate_columns(self.predicate) if self.predicate else set())
+
+            fetch = functools.partial(self.sample.fetch, self.downloader, columns=read_columns)
+
+        position = 0
+        attempt = 0
+        while True:
+            # Recomputed after refresh_urls replaces self.files
+            files = [add_file for add_file in self.files if add_file.id not in replayed]
+            if position >= len(files):
+                break
+            fetched = self.downloader.iter_fetch(files[position:], fetch)
+            try:
+                for add_file, content in fetched:
+                    arrow_table, column_bytes_skipped, saved_bytes = read_parquet_file(
+                        add_file, content, self.columns, self.predicate, self.fields
+                    )
+                    fetched_bytes = add_file.size
+                    if isinstance(content, SampledParquet):
+                        fetched_bytes = content.source.bytes_fetched
+                        self.sample.stats["row_groups_total"] += content.metadata.num_row_groups
+                        self.sample.stats["row_groups_sampled"] += len(content.row_groups)
+                    del content
+                    position += 1
+                    attempt = 0
+                    self.current_file = add_file.url.split("?")[0].rsplit("/", 1)[-1]
+                    self.stats["files_scanned"] += 1
+                    self.stats["bytes_scanned"] += fetched_bytes
+                    self.stats["column_bytes_skipped"] += column_bytes_skipped
+                    self.stats["arrow_bytes"] += arrow_table.nbytes
+                    self.stats["memory_saved_bytes"] += saved_bytes
+
+                    if self.limit is not None:
+                        arrow_table = arrow_table.slice(0, self.limit - self.stats["rows_read"])
+                    self.stats["rows_read"] += arrow_table.num_rows
+                    arrow_table = arrow_table.select(self.output_columns)
+                    if self.spool is not None:
+                        self.spool.write(add_file.id, arrow_table)
+                    yield arrow_table
+
+                    if self.limit is not None and self.stats["rows_read"] >= self.limit:
+                        return
+            except Exception as e:
+                # Resume at the file that failed, with re-signed URLs
+                if self.retry is None or not self.retry.should_retry(e, attempt):
+                    raise
+                attempt += 1
+                self.retry.backoff(attempt)
+                self.refresh_urls()
+                self.retry.stats["url_refreshes"] += 1
+            finally:
+                fetched.close()
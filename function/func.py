@@ -1,19 +1,266 @@
+import time
+
+_INIT_STARTED = time.perf_counter()
+
 import io
 import json
 import logging
 import os
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
 
+# Only fdk is imported at module load. requests, pyarrow and oracledb are
+# imported on the code paths that need them so a cold start does not pay for
+# them before the handler runs (see scripts/check_import_time.py).
 try:
     from fdk import response
-    import delta_sharing
-    import oracledb
-    import pandas as pd
 except ImportError as e:
     # Log import errors for debugging
-    import sys
     sys.stderr.write(f"Import error: {str(e)}\n")
     raise
 
+# fdk loads this file by path, so its directory is not on sys.path for the
+# dbrx_migration package next to it
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dbrx_migration.retry import DEFAULT_RETRIES, RetryPolicy
+from dbrx_migration.conversion import ConversionPipeline, available_cpus, get_conversion_pool
+from dbrx_migration.sharing import (
+    DEFAULT_DOWNLOAD_THREADS, DEFAULT_SAMPLE_SEED, DEFAULT_SPOOL_DIR, DEFAULT_SPOOL_MAX_MB, ParquetDownloader,
+    SharedTableScan, TableSample, get_delta_table_version, open_spool
+)
+from dbrx_migration.control import (
+    DEFAULT_CONTROL_TABLE, DEFAULT_PROGRESS_INTERVAL, DEFAULT_PROGRESS_TABLE, DEFAULT_REJECT_TABLE,
+    ProgressReporter, RejectLimitExceeded, RejectLog, checkpoint_load, checkpoint_statement,
+    ensure_control_table, ensure_reject_table, get_last_loaded_version, get_load_checkpoint,
+    get_load_history, record_load, start_load
+)
+from dbrx_migration.preflight import (
+    PreflightValidator, column_defs_from_fields, get_target_columns, preflight_check
+)
+from dbrx_migration.loaders import (
+    COMPRESSION_CLAUSES, DEFAULT_PIPELINE_DEPTH, LOAD_MODES, PARTITION_RELOADS, PartitionLoader, PartitionSpec,
+    PipelinedInserter, TargetLoader, abort_load, complete_load, fan_out_load, get_oracle_async_connection,
+    get_oracle_connection, get_oracle_pool, insert_hint, prepare_load_table, referencing_constraints,
+    table_exists, table_triggers
+)
+from dbrx_migration.hash_sync import DEFAULT_SYNC_RANGE_ROWS, HashDiffSync, sync_load
+from dbrx_migration.export import EXPORT_SPLITS, export_request
+from dbrx_migration.jobs import (
+    DEFAULT_JOB_TABLE, coordinate_load, get_shard_invoker, job_status, run_job, submit_request
+)
+from dbrx_migration.planning import FUNCTION_MEMORY_MB, FUNCTION_TIMEOUT_SECONDS, plan_load
+
+MODES = ("load", "coordinator", "export", "dry_run")
+# "submit" records a job and runs it detached; "status" reads a job back
+ACTIONS = ("run", "submit", "status")
+# Settings each of a fan-out run's "targets" can override
+TARGET_KEYS = ("oracle_user", "oracle_password", "oracle_dsn", "oracle_wallet_location", "oracle_wallet_password")
+PREFLIGHT_MODES = ("check", "reject")
+LOAD_STRATEGIES = ("truncate", "swap", "merge", "sync")
+REQUIRED_PARAMS = (
+    "delta_profile_base64", "share_name", "schema_name", "table_name",
+    "oracle_user", "oracle_password", "oracle_dsn"
+)
+DRY_RUN_REQUIRED_PARAMS = REQUIRED_PARAMS[:4]
+STATUS_REQUIRED_PARAMS = ("oracle_user", "oracle_password", "oracle_dsn", "job_id")
+EXPORT_REQUIRED_PARAMS = ("oracle_user", "oracle_password", "oracle_dsn", "output_uri")
+
+# True until the first invocation in this container has been handled
+_cold_start = True
+
+
+class InvalidRequest(ValueError):
+    """
+    A request the handler cannot run, answered with a 400 response
+    """
+
+
+def require(condition, error):
+    """
+    Raise InvalidRequest with the error message unless condition holds
+    """
+    if not condition:
+        raise InvalidRequest(error)
+
+
+def get_targets(body):
+    """
+    Return the request's "targets" (a list, or the same as a JSON string),
+    each inheriting the connection settings and table it does not set;
+    None without targets
+    """
+    targets = body.get("targets")
+    if isinstance(targets, str):
+        try:
+            targets = json.loads(targets)
+        except ValueError as e:
+            raise InvalidRequest(f"targets must be a JSON list of objects: {e}") from e
+    if not targets:
+        return None
+    require(isinstance(targets, list) and all(isinstance(target, dict) for target in targets),
+            "targets must be a list of objects")
+    return [
+        dict({"name": f"target{index}", **{key: body.get(key) for key in TARGET_KEYS},
+              "oracle_table_name": body.get("oracle_table_name", body.get("table_name"))}, **target)
+        for index, target in enumerate(targets)
+    ]
+
+
+def validate_load_request(body):
+    """
+    Raise InvalidRequest unless the request body names a source and a target
+    and its load options are ones the handler knows
+    """
+    mode = body.get("mode", "load")
+    require(mode in MODES, f"Invalid mode: {mode}, expected one of {list(MODES)}")
+    action = body.get("action", "run")
+    require(action in ACTIONS, f"Invalid action: {action}, expected one of {list(ACTIONS)}")
+    if action == "status":
+        missing = [name for name in STATUS_REQUIRED_PARAMS if not body.get(name)]
+        require(not missing, f"Missing required parameters: {missing}")
+        return
+    max_retries = body.get("max_retries", DEFAULT_RETRIES)
+    require(isinstance(max_retries, int) and max_retries >= 0,
+            f"Invalid max_retries: {max_retries}, expected a non-negative integer")
+
+    if mode == "export":
+        missing = [name for name in EXPORT_REQUIRED_PARAMS if not body.get(name)]
+        if not (body.get("export_table") or body.get("export_query")):
+            missing.append("export_table or export_query")
+        require(not missing, f"Missing required parameters: {missing}")
+        export_split = body.get("export_split")
+        require(export_split is None or (export_split in EXPORT_SPLITS and body.get("export_table")),
+                f"Invalid export_split: {export_split}, expected one of {list(EXPORT_SPLITS)} with export_table")
+        require(export_split != "key" or body.get("split_column"), "export_split key requires split_column")
+        return
+
+    # A dry run reads ATP only for past runs' load rates, when given; a
+    # fan-out run connects to each target (a submitted one records its job
+    # on the request's own connection)
+    targets = get_targets(body)
+    fan_out = targets and action != "submit"
+    required = DRY_RUN_REQUIRED_PARAMS if mode == "dry_run" or fan_out else REQUIRED_PARAMS
+    missing = [name for name in required if not body.get(name)]
+    if fan_out:
+        missing += [f"targets[{index}].{name}" for index, target in enumerate(targets)
+                    for name in REQUIRED_PARAMS[4:] if not target.get(name)]
+    require(not missing, f"Missing required parameters: {missing}")
+    require(not targets or (mode == "load" and body.get("shard_index") is None and body.get("preflight") is None
+                            and body.get("partition_column") is None
+                            and len({target["name"] for target in targets}) == len(targets)),
+            "targets need mode load without shard_index, preflight or partition_column, and unique target names")
+
+    load_strategy = body.get("load_strategy", "truncate")
+    require(load_strategy in LOAD_STRATEGIES,
+            f"Invalid load_strategy: {load_strategy}, expected one of {list(LOAD_STRATEGIES)}")
+    require(load_strategy not in ("merge", "sync") or body.get("merge_keys"),
+            f"load_strategy {load_strategy} requires merge_keys")
+
+    load_mode = body.get("load_mode", "conventional")
+    require(load_mode in LOAD_MODES, f"Invalid load_mode: {load_mode}, expected one of {list(LOAD_MODES)}")
+    compression = body.get("compression")
+    require(compression is None or compression in COMPRESSION_CLAUSES,
+            f"Invalid compression: {compression}, expected one of {list(COMPRESSION_CLAUSES)}")
+
+    reject_limit = body.get("reject_limit", 0)
+    require(reject_limit is None or (isinstance(reject_limit, int) and reject_limit >= 0),
+            f"Invalid reject_limit: {reject_limit}, expected null or a non-negative integer")
+
+    shard_index = body.get("shard_index")
+    shard_count = body.get("shard_count")
+    require(shard_count is None or (isinstance(shard_count, int) and shard_count > 0),
+            f"Invalid shard_count: {shard_count}, expected a positive integer")
+    if mode == "load" and shard_index is not None:
+        require(isinstance(shard_index, int) and shard_count and 0 <= shard_index < shard_count,
+                f"Invalid shard: {shard_index} of {shard_count}")
+    require(mode != "coordinator" or load_mode != "direct_path",
+            "load_mode direct_path is not supported in coordinator mode")
+    require(load_mode != "pipelined" or (body.get("partition_column") is None and not targets),
+            "load_mode pipelined is not supported with partition_column or targets")
+    pipeline_depth = body.get("pipeline_depth", DEFAULT_PIPELINE_DEPTH)
+    require(isinstance(pipeline_depth, int) and pipeline_depth >= 1,
+            f"Invalid pipeline_depth: {pipeline_depth}, expected a positive integer")
+    sample_fraction = body.get("sample_fraction")
+    sample_rows = body.get("sample_rows")
+    sampled = sample_fraction is not None or sample_rows is not None
+    require(not sampled or (
+        (sample_fraction is None or sample_rows is None) and body.get("limit_rows") is None
+        and (sample_fraction is None or (isinstance(sample_fraction, (int, float)) and 0 < sample_fraction <= 1))
+        and (sample_rows is None or (isinstance(sample_rows, int) and sample_rows >= 1))
+    ), "Give one of sample_fraction (0 < fraction <= 1) or sample_rows (at least 1), without limit_rows")
+    sample_seed = body.get("sample_seed", DEFAULT_SAMPLE_SEED)
+    require(isinstance(sample_seed, int), f"Invalid sample_seed: {sample_seed}, expected an integer")
+    require(load_strategy != "sync" or (
+        mode == "load" and shard_index is None and not targets and body.get("partition_column") is None
+        and body.get("predicate") is None and body.get("limit_rows") is None and not sampled
+        and body.get("preflight") != "reject" and load_mode == "conventional"
+    ), "load_strategy sync needs the whole table in one invocation (no coordinator, shard_index, targets, "
+       "partition_column, predicate, limit_rows, sampling or preflight reject) and load_mode conventional")
+    sync_range_rows = body.get("sync_range_rows", DEFAULT_SYNC_RANGE_ROWS)
+    require(isinstance(sync_range_rows, int) and sync_range_rows >= 1,
+            f"Invalid sync_range_rows: {sync_range_rows}, expected a positive integer")
+    preflight = body.get("preflight")
+    require(preflight is None or preflight in PREFLIGHT_MODES,
+            f"Invalid preflight: {preflight}, expected one of {list(PREFLIGHT_MODES)}")
+    progress_interval = body.get("progress_interval") or 0
+    require(isinstance(progress_interval, (int, float)) and progress_interval >= 0,
+            f"Invalid progress_interval: {progress_interval}, expected seconds >= 0")
+    spool_max_mb = body.get("spool_max_mb", DEFAULT_SPOOL_MAX_MB)
+    require(isinstance(spool_max_mb, (int, float)) and spool_max_mb > 0,
+            f"Invalid spool_max_mb: {spool_max_mb}, expected a positive number")
+
+    partition_column = body.get("partition_column")
+    partition_interval = body.get("partition_interval")
+    partition_bounds = body.get("partition_bounds")
+    require((partition_column is None) == (partition_interval is None and partition_bounds is None)
+            and (partition_interval is None or partition_bounds is None),
+            "partition_column requires one of partition_interval or partition_bounds")
+    partition_parallel = body.get("partition_parallel", 1)
+    require(isinstance(partition_parallel, int) and partition_parallel >= 1,
+            f"Invalid partition_parallel: {partition_parallel}, expected a positive integer")
+    partition_reload = body.get("partition_reload")
+    require(partition_reload is None or (partition_reload in PARTITION_RELOADS and partition_column is not None
+                                         and load_strategy == "truncate" and mode != "coordinator"),
+            f"Invalid partition_reload: {partition_reload}, expected one of {list(PARTITION_RELOADS)} "
+            f"with partition_column and load_strategy truncate, outside coordinator mode")
+
+
+def check_load_strategy(cursor, target_table, columns, load_strategy, merge_keys):
+    """
+    Raise InvalidRequest when load_strategy cannot be applied to the target
+    table; returns warnings about what the load does not carry over
+    """
+    warnings = []
+    if load_strategy == "swap" and table_exists(cursor, target_table):
+        referenced_by = referencing_constraints(cursor, target_table)
+        require(not referenced_by,
+                f"load_strategy swap cannot replace {target_table}, it is referenced by "
+                f"foreign keys {referenced_by}; use truncate")
+        triggers = table_triggers(cursor, target_table)
+        if triggers:
+            warnings.append(f"Triggers on {target_table} are dropped by the swap: {triggers}")
+
+    if load_strategy == "merge":
+        missing_keys = [key for key in merge_keys if key not in columns]
+        require(not missing_keys, f"merge_keys {missing_keys} are not among the loaded columns")
+    return warnings
+
+
+def json_response(ctx, result, status_code=200):
+    """
+    Wrap a JSON-serializable result in an fdk response
+    """
+    return response.Response(
+        ctx,
+        response_data=json.dumps(result),
+        headers={"Content-Type": "application/json"},
+        status_code=status_code
+    )
+
+
 def handler(ctx, data: io.BytesIO = None):
     """
     OCI Function handler to migrate data from Databricks Delta Share to Oracle ATP
@@ -30,16 +277,266 @@ def handler(ctx, data: io.BytesIO = None):
         "oracle_wallet_location": "/tmp/wallet",
         "oracle_wallet_password": null,
         "batch_size": 100,
-        "limit_rows": null
+        "limit_rows": null,
+        "sample_fraction": null,
+        "sample_rows": null,
+        "sample_seed": 0,
+        "control_table": "DBRX_MIGRATION_CONTROL",
+        "force_reload": false,
+        "columns": ["col_a", "col_b"],
+        "predicate": {"op": "greaterThanOrEqual", "children": [
+            {"op": "column", "name": "transaction_date", "valueType": "date"},
+            {"op": "literal", "value": "2024-01-01", "valueType": "date"}]},
+        "download_threads": 4,
+        "prefetch_files": 4,
+        "spool": false,
+        "spool_dir": "/tmp/dbrx-spool",
+        "spool_max_mb": 256,
+        "load_strategy": "truncate",
+        "merge_keys": ["transaction_id"],
+        "merge_parallel": null,
+        "sync_range_rows": 500000,
+        "load_mode": "conventional",
+        "compression": null,
+        "pipeline_depth": 4,
+        "reject_table": "DBRX_MIGRATION_REJECTS",
+        "reject_limit": 0,
+        "max_retries": 5,
+        "mode": "load",
+        "shard_count": null,
+        "shard_bytes": 268435456,
+        "max_parallel_workers": null,
+        "invoker": "oci",
+        "function_id": null,
+        "export_table": null,
+        "export_query": null,
+        "export_where": null,
+        "output_uri": "https://objectstorage.../p/<par>/n/<ns>/b/<bucket>/o/exports/",
+        "file_size_mb": 128,
+        "fetch_rows": 50000,
+        "export_parallel": 1,
+        "export_split": null,
+        "split_column": null,
+        "preflight": null,
+        "partition_column": "transaction_date",
+        "partition_interval": "month",
+        "partition_bounds": null,
+        "partition_parallel": 4,
+        "partition_sort": ["transaction_id"],
+        "partition_reload": null,
+        "run_id": null,
+        "progress_table": "DBRX_MIGRATION_PROGRESS",
+        "progress_interval": 10,
+        "convert_workers": null,
+        "action": "run",
+        "job_id": null,
+        "job_table": "DBRX_MIGRATION_JOBS",
+        "targets": [{"name": "prod", "oracle_dsn": "prod_connection_string", "oracle_table_name": "t"}],
+        "memory_mb": null,
+        "timeout_seconds": 300
     }
+
+    "columns" limits the load to a subset of columns; unrequested columns are
+    never decoded. "predicate" uses the Delta Sharing jsonPredicateHints format;
+    it is sent to the server, used to prune files by their min/max statistics,
+    and applied to the rows that are read.
+
+    "sample_fraction" (or "sample_rows", converted to a fraction with the
+    files' numRecords statistics) loads a reproducible sample for dev/test
+    instead of the first "limit_rows": a set of files is drawn, then row
+    groups of each drawn file, then rows of those row groups, each by
+    "sample_seed". At least 8 files and 4 row groups per file are kept
+    where there are that many, so the sample is spread over the table;
+    only the sampled row groups' column chunks are downloaded, with HTTP
+    range requests (the whole file if the server ignores them). The same
+    seed loads the same rows of a table version, in coordinator mode too.
+
+    Data files are downloaded by "download_threads" threads over pooled
+    keep-alive sessions; up to "prefetch_files" files are fetched ahead of
+    the one currently being inserted.
+
+    "spool" true writes each decoded file's Arrow table to a memory-mapped
+    Arrow IPC file under "spool_dir", with a SHA-256 checksum in the
+    spool's manifest, up to "spool_max_mb" in total (later files are not
+    spooled). A retried or re-invoked load of the same table, version,
+    columns and predicate replays the verified files instead of downloading
+    and decoding them again; a file whose checksum does not match is
+    downloaded again. The spool is removed once the row count in ATP
+    matches the load; it only outlives the invocation in a warm container
+    or on a mounted volume.
+
+    "load_strategy" is "truncate" (truncate the live table and insert into
+    it) or "swap": load into a NOLOGGING staging table without indexes,
+    build the target's indexes and gather stats afterwards, then swap the
+    staging table in by rename. Readers keep seeing the previous data until
+    the swap and a failed load leaves the live table untouched. Constraints,
+    indexes and grants are carried over; triggers are not (the response
+    lists them under "warnings") and a table referenced by other tables'
+    foreign keys cannot be swapped.
+    "merge" bulk-loads the rows into a staging table the same way and applies
+    them to the target with a single MERGE on the "merge_keys" columns:
+    matching rows are updated, new rows inserted, other rows left as they
+    are. "merge_parallel" runs the MERGE as parallel DML with that degree.
+    "sync" applies only the differences, for tables without a change feed:
+    a 64-bit hash of each source row's non-key columns, computed with
+    Arrow, is compared per "merge_keys" key with the hash stored by the
+    previous sync in <table>_HASH. New keys are inserted, changed rows
+    updated and keys gone from the source deleted, in executemany batches
+    committed with their hashes. The comparison runs one range of the
+    first key column at a time, of about "sync_range_rows" rows, so memory
+    stays bounded; only the files whose key statistics overlap a range are
+    read for it. The first sync of an existing table rewrites it once to
+    store the hashes. Needs the whole table: no "predicate" or
+    "limit_rows".
+
+    "load_mode" "direct_path" inserts with /*+ APPEND_VALUES */, which skips
+    undo and (on NOLOGGING tables) most redo. Every batch is committed on
+    its own, as a direct-path insert must be before the table is touched
+    again in the same transaction (ORA-12838), so use large batch sizes.
+    On an existing table loaded with "truncate", primary/unique constraints
+    and non-unique indexes are disabled for the load and rebuilt after it.
+    "compression" ("basic" or "advanced") adds table compression to the
+    DDL of tables the function creates.
+
+    "load_mode" "pipelined" inserts conventionally but sends
+    "pipeline_depth" batches at a time, each with its checkpoint update and
+    commit, in one python-oracledb pipeline on an asyncio connection, so on
+    Oracle Database 23ai a pipeline costs about one round trip instead of
+    two per batch; older databases run the operations one by one. Batch
+    errors are not available in a pipeline: a batch Oracle rejects stops
+    its pipeline, is inserted again conventionally with batch errors, and
+    pipelining resumes after it. Not supported with "partition_column" or
+    "targets". scripts/benchmark_pipeline.py measures the gain by RTT.
+
+    Batches are inserted with batch errors enabled: rows Oracle rejects
+    (value too large, invalid number, ...) are written to "reject_table"
+    with their ORA code and offset in the source, and the rest of the batch
+    is loaded. The run fails once more than "reject_limit" rows have been
+    rejected (null for no limit); the response reports the reject count and
+    a sample of the errors.
+
+    "preflight" validates the rows against the target's column definitions
+    (from the data dictionary, or the DDL the load would create) with
+    vectorized Arrow checks: VARCHAR2 byte/char lengths, NUMBER(p,s)
+    integer digits, NOT NULL and DATE ranges/formats. "check" reads the
+    whole selection and reports the violations without writing anything
+    (status "valid" or "invalid"). "reject" checks each batch before it is
+    inserted and sends violating rows to the reject table with the ORA
+    code Oracle would have raised, counted against "reject_limit".
+
+    Transient failures (connection resets, ORA-03113/03114, HTTP 429/5xx,
+    expired presigned URLs) are retried up to "max_retries" times with
+    exponential backoff. A failed download re-lists the files for fresh
+    URLs and resumes at that file; a failed batch reconnects to ATP and
+    resumes after the last committed batch, found from the checkpoint the
+    load's control table row is updated with in the same transaction.
+    Retry counts and backoff time are reported under "retries".
+
+    "mode" "coordinator" fans one table out over several invocations of
+    this function. The coordinator lists and prunes the files, prepares the
+    target (truncate, create or staging table), then invokes "shard_count"
+    workers (by default one per "shard_bytes" of Parquet) in parallel with
+    the same payload plus "shard_index"/"shard_count" and the pinned
+    "table_version". Each worker loads its share of the files, balanced by
+    size, into the prepared table. The coordinator aggregates their results,
+    finishes the load (index rebuild, swap or merge), verifies the row count
+    and records the load. "invoker" is "oci" (invoke "function_id", by
+    default this function, through the OCI SDK with resource principals) or
+    "local" (run the workers through handler() in this process, for
+    testing). Workers insert conventionally (pipelined if asked):
+    concurrent direct-path inserts into one table serialize on its table
+    lock. The coordinator's
+    own timeout must cover the slowest worker.
+
+    "mode" "export" goes the other way: it snapshots "export_table" (with
+    optional "columns" and "export_where") or "export_query" from ATP to
+    Parquet files under "output_uri", an Object Storage pre-authenticated
+    request prefix or a local directory; the Delta Sharing parameters are
+    not needed. Rows are fetched as Arrow batches of "fetch_rows" and
+    written as they arrive, rolling over to a new file at "file_size_mb",
+    so memory stays bounded by one batch per connection. For a table,
+    "export_parallel" connections can each export a share of it, split by
+    "export_split": "rowid" (ranges of the table's extents) or "key"
+    (ranges of "split_column"). The splits are computed and read as of one
+    SCN, so the files are a consistent snapshot; the response reports it.
+
+    "partition_column" partitions the tables the function creates by range:
+    interval partitioning by "partition_interval" ("day", "month" or "year"
+    for a date column, a width for a numeric one) or range partitions below
+    each of "partition_bounds" plus a MAXVALUE partition. The rows of each
+    scanned file are routed to their partition and loaded by
+    "partition_parallel" threads on pooled connections, each owning a set
+    of partitions and inserting into them by PARTITION FOR, so direct-path
+    loads of different partitions run concurrently. "partition_sort" sorts
+    every batch by those columns before it is inserted. "partition_reload"
+    replaces only the partitions the rows fall into, for partial reloads
+    with a "predicate": "truncate" truncates each one before its first
+    batch, "exchange" loads each into a separate table and swaps it in by
+    partition exchange at the end. Routing assumes an existing target is
+    partitioned as described by these parameters.
+
+    Scanned rows are converted into bind tuples by a pool of
+    "convert_workers" processes (default: the CPUs available to the
+    container; 1 converts inline) while the main thread inserts the batches
+    converted before. A few batches are converted ahead at most, so memory
+    stays bounded when the inserts are the bottleneck.
+
+    "mode" "dry_run" plans a load without downloading or writing anything:
+    from the table's metadata and file listing (after "columns",
+    "predicate" and "limit_rows") it returns the file count, bytes,
+    estimated rows from the files' numRecords statistics and the schema,
+    projects runtime from the load rate of the source's past runs in the
+    control table (when ATP credentials are given) and peak memory, and
+    recommends the batch size, download parallelism and shard count that
+    fit an invocation of "memory_mb" (default: the function's) and
+    "timeout_seconds".
+
+    Every load has a "run_id" (generated unless given; a coordinator's
+    workers use "<run_id>:<shard>") returned in the response. While it runs,
+    a background thread upserts the run's row in "progress_table" every
+    "progress_interval" seconds (0 disables it) on a separate connection:
+    status, rows committed, rows/s, files done, current file and an ETA
+    from the files' row count statistics. scripts/tail_progress.py follows
+    a run from there.
+
+    "targets" loads the same selection into several tables or databases in
+    one run: each target is an object overriding the oracle_* connection
+    settings and "oracle_table_name" (and naming itself with "name"). Each
+    batch is read and converted once and handed to one loader thread per
+    target, which prepares its table and checks, commits, rejects, retries
+    and records its load on its own connection, skipping targets that
+    already have this version. A failed target does not stop the others;
+    the response reports every target under "targets" and is an error if
+    any of them failed. Progress is written per target as
+    "<run_id>:<name>".
+
+    "action" "submit" validates the request, records a QUEUED job in
+    "job_table" and invokes the function again detached ("invoker" and
+    "function_id" as for coordinator mode) to run it, returning the
+    "job_id" at once with status 202. The run marks the job RUNNING, then
+    stores its final status and response. "action" "status" with a
+    "job_id" returns the job and its progress rows (of the coordinator's
+    workers too), so callers poll instead of holding the request open.
+
+    When the shared table version matches the last successful full load
+    recorded in the control table, the load is skipped and the response
+    has status "unchanged".
     """
+    global _cold_start
+
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
 
+    handler_started = time.perf_counter()
+    timing = {"cold_start": _cold_start, "init_seconds": round(INIT_SECONDS, 3)}
+    _cold_start = False
+    run_id = None
+
     try:
         # Parse input
         body = json.loads(data.getvalue()) if data.getvalue() else {}
         logger.info(f"Received request with keys: {body.keys()}")
+        validate_load_request(body)
 
         # Extract parameters
         delta_profile_b64 = body.get("delta_profile_base64")
@@ -53,192 +550,717 @@ def handler(ctx, data: io.BytesIO = None):
         oracle_wallet_password = body.get("oracle_wallet_password")
         batch_size = body.get("batch_size", 100)
         limit_rows = body.get("limit_rows")
+        sample_fraction = body.get("sample_fraction")
+        sample_rows = body.get("sample_rows")
+        sample_seed = body.get("sample_seed", DEFAULT_SAMPLE_SEED)
+        sampled = sample_fraction is not None or sample_rows is not None
         oracle_table_name = body.get("oracle_table_name", table_name)
+        control_table = body.get("control_table", DEFAULT_CONTROL_TABLE)
+        force_reload = bool(body.get("force_reload", False))
+        columns = body.get("columns")
+        predicate = body.get("predicate")
+        if isinstance(predicate, str):
+            predicate = json.loads(predicate)
+        download_threads = int(body.get("download_threads", DEFAULT_DOWNLOAD_THREADS))
+        prefetch_files = int(body.get("prefetch_files", download_threads))
+        load_strategy = body.get("load_strategy", "truncate")
+        merge_keys = body.get("merge_keys")
+        if isinstance(merge_keys, str):
+            merge_keys = [key.strip() for key in merge_keys.split(",") if key.strip()]
+        merge_parallel = body.get("merge_parallel")
+        load_mode = body.get("load_mode", "conventional")
+        compression = body.get("compression")
+        reject_table = body.get("reject_table", DEFAULT_REJECT_TABLE)
+        reject_limit = body.get("reject_limit", 0)
+        max_retries = body.get("max_retries", DEFAULT_RETRIES)
+        preflight = body.get("preflight")
+        mode = body.get("mode", "load")
+        shard_index = body.get("shard_index")
+        shard_count = body.get("shard_count")
+        is_worker = mode == "load" and shard_index is not None
+        partition_column = body.get("partition_column")
+        partition_interval = body.get("partition_interval")
+        partition_bounds = body.get("partition_bounds")
+        partition_parallel = body.get("partition_parallel", 1)
+        partition_sort = body.get("partition_sort")
+        if isinstance(partition_sort, str):
+            partition_sort = [key.strip() for key in partition_sort.split(",") if key.strip()]
+        partition_reload = body.get("partition_reload")
+        run_id = body.get("run_id") or uuid.uuid4().hex
+        if is_worker:
+            run_id = f"{run_id}:{shard_index}"
+        progress_table = body.get("progress_table", DEFAULT_PROGRESS_TABLE)
+        progress_interval = float(body.get("progress_interval", DEFAULT_PROGRESS_INTERVAL) or 0)
+        convert_workers = int(body.get("convert_workers") or available_cpus())
+        spool_enabled = bool(body.get("spool", False))
+        spool_dir = body.get("spool_dir") or DEFAULT_SPOOL_DIR
+        spool_max_mb = body.get("spool_max_mb", DEFAULT_SPOOL_MAX_MB)
+        action = body.get("action", "run")
+        job_id = body.get("job_id")
+        job_table = body.get("job_table", DEFAULT_JOB_TABLE)
+        targets = get_targets(body)
 
-        # Validate required parameters
-        required_params = {
-            "delta_profile_base64": delta_profile_b64,
-            "share_name": share_name,
-            "schema_name": schema_name,
-            "table_name": table_name,
-            "oracle_user": oracle_user,
-            "oracle_password": oracle_password,
-            "oracle_dsn": oracle_dsn
-        }
+        retry = RetryPolicy(retries=max_retries)
+
+        def connect():
+            return get_oracle_connection(
+                oracle_user, oracle_password, oracle_dsn,
+                oracle_wallet_location, oracle_wallet_password
+            )
 
-        missing = [k for k, v in required_params.items() if not v]
-        if missing:
-            return response.Response(
-                ctx,
-                response_data=json.dumps({"error": f"Missing required parameters: {missing}"}),
-                headers={"Content-Type": "application/json"},
-                status_code=400
+        if action == "status":
+            job = job_status(lambda: retry.call(connect), job_table, progress_table, job_id)
+            if job is None:
+                return json_response(ctx, {"error": f"Unknown job_id: {job_id}"}, 404)
+            return json_response(ctx, job)
+
+        if action == "submit":
+            if mode == "export":
+                source, destination = body.get("export_table") or "query", body.get("output_uri")
+            else:
+                source, destination = f"{share_name}.{schema_name}.{table_name}", oracle_table_name
+            invoker = get_shard_invoker(body.get("invoker", "oci"), handler, body.get("function_id"))
+            # The job runs under its own id, so its progress rows are the job's
+            result = submit_request(body, lambda: retry.call(connect), invoker, job_table, run_id, source, destination)
+            logger.info(f"Submitted job: {result}")
+            return json_response(ctx, result, 202)
+
+        if job_id:
+            # A submitted job, invoked detached
+            status_code, result = run_job(handler, body, lambda: retry.call(connect), job_table)
+            return json_response(ctx, result, status_code)
+
+        if mode == "export":
+            result = dict(
+                export_request(body, connect, retry), status="success", mode="export", retries=retry.summary(),
+                timing=dict(timing, handler_seconds=round(time.perf_counter() - handler_started, 3))
             )
+            logger.info(f"Result: {result}")
+            return json_response(ctx, result)
 
         # Decode and save delta profile
         import base64
         profile_content = base64.b64decode(delta_profile_b64).decode('utf-8')
         profile_path = "/tmp/delta.share"
-        with open(profile_path, 'w') as f:
+        # Written via a temp file so in-process shard workers sharing /tmp
+        # never read a half-written profile
+        temp_path = f"{profile_path}.{os.getpid()}.{threading.get_ident()}"
+        with open(temp_path, 'w') as f:
             f.write(profile_content)
+        os.replace(temp_path, profile_path)
+
+        source_name = f"{share_name}.{schema_name}.{table_name}"
+        full_load = limit_rows is None and predicate is None and not columns and not sampled
+
+        def table_sample():
+            if not sampled:
+                return None
+            return TableSample(fraction=sample_fraction, rows=sample_rows, seed=sample_seed)
 
-        logger.info(f"Loading data from Delta Share: {share_name}.{schema_name}.{table_name}")
+        sample_key = [sample_fraction, sample_rows, sample_seed] if sampled else None
 
-        # Load data from Delta Share
-        table_url = f"{profile_path}#{share_name}.{schema_name}.{table_name}"
-        df = delta_sharing.load_as_pandas(table_url, limit=limit_rows)
-        total_rows = len(df)
+        # Query the current table version (cheap, no data files listed).
+        # Workers use the version their coordinator pinned.
+        table_version = body.get("table_version")
+        if table_version is None:
+            table_version = get_delta_table_version(profile_path, share_name, schema_name, table_name)
+        logger.info(f"Delta Share table version: {table_version}")
 
-        logger.info(f"Loaded {total_rows} rows from Delta Share")
+        if mode == "dry_run":
+            # Metadata and the file listing only: nothing is downloaded or written
+            scan = SharedTableScan(
+                profile_path, share_name, schema_name, table_name, None,
+                version=table_version, columns=columns, predicate=predicate, limit=limit_rows,
+                sample=table_sample()
+            )
+            history = None
+            if oracle_user and oracle_password and oracle_dsn:
+                oracle_conn = retry.call(connect)
+                with oracle_conn.cursor() as cursor:
+                    history = get_load_history(cursor, control_table, source_name)
+                oracle_conn.close()
+
+            plan = plan_load(
+                scan, history,
+                memory_mb=int(body.get("memory_mb") or os.environ.get("FN_MEMORY") or FUNCTION_MEMORY_MB),
+                timeout_seconds=int(body.get("timeout_seconds") or FUNCTION_TIMEOUT_SECONDS),
+                convert_workers=convert_workers
+            )
+            result = dict(
+                plan,
+                status="planned",
+                mode="dry_run",
+                table_version=table_version,
+                schema=[{"name": field["name"], "type": field["type"], "nullable": field.get("nullable", True)}
+                        for field in scan.output_fields()],
+                source=source_name,
+                destination=oracle_table_name,
+                timing=dict(timing, handler_seconds=round(time.perf_counter() - handler_started, 3))
+            )
+            if scan.sample is not None:
+                result["sample"] = scan.sample.summary()
+            logger.info(f"Dry run plan: {result}")
+            return json_response(ctx, result)
+
+        if targets:
+            # Read and convert each batch once, load it into every target on its own thread
+            conversion_pool = get_conversion_pool(convert_workers) if convert_workers > 1 else None
+            downloader = ParquetDownloader(max_workers=download_threads, prefetch=prefetch_files)
+            spool = None
+            if spool_enabled:
+                spool = open_spool(spool_dir, spool_max_mb, source_name, table_version, columns, predicate,
+                                   limit_rows, sample=sample_key)
+            scan = SharedTableScan(
+                profile_path, share_name, schema_name, table_name, downloader,
+                version=table_version, columns=columns, predicate=predicate, limit=limit_rows, retry=retry,
+                spool=spool, sample=table_sample()
+            )
+
+            def target_connect(target):
+                return lambda: get_oracle_connection(
+                    target["oracle_user"], target["oracle_password"], target["oracle_dsn"],
+                    target["oracle_wallet_location"], target["oracle_wallet_password"]
+                )
+
+            def start_progress(loader):
+                if progress_interval <= 0:
+                    return None
+                return ProgressReporter(
+                    loader.connect, progress_table, f"{run_id}:{loader.name}", source_name, loader.table,
+                    lambda: {
+                        "rows_committed": loader.rows_inserted,
+                        "files_done": scan.stats["files_scanned"],
+                        "bytes_done": scan.stats["bytes_scanned"],
+                        "current_file": scan.current_file
+                    },
+                    interval=progress_interval, rows_total=scan.estimated_rows(), files_total=len(scan.files),
+                    bytes_total=sum(add_file.size for add_file in scan.files)
+                ).start()
+
+            loaders = [
+                TargetLoader(
+                    target["name"], target_connect(target), target["oracle_table_name"], source_name,
+                    table_version, scan.output_fields(), control_table=control_table,
+                    reject_table=reject_table, reject_limit=reject_limit, load_strategy=load_strategy,
+                    load_mode=load_mode, compression=compression, merge_keys=merge_keys,
+                    merge_parallel=merge_parallel, max_retries=max_retries
+                )
+                for target in targets
+            ]
+            try:
+                summaries, conversion_summary = fan_out_load(
+                    loaders, scan, batch_size, conversion_pool, force_reload, full_load, start_progress
+                )
+            finally:
+                downloader.close()
+
+            failed = [summary for summary in summaries if summary["status"] == "error"]
+            if failed:
+                status = "error"
+            elif any(summary["status"] == "success" for summary in summaries):
+                status = "success"
+            else:
+                status = "unchanged"
+            result = {
+                "status": status,
+                "run_id": run_id,
+                "rows_read": scan.stats["rows_read"],
+                "table_version": table_version,
+                "scan": scan.stats,
+                "conversion": conversion_summary,
+                "load_strategy": load_strategy,
+                "load_mode": load_mode,
+                "targets": summaries,
+                "source": source_name,
+                "timing": dict(timing, handler_seconds=round(time.perf_counter() - handler_started, 3))
+            }
+            if spool is not None:
+                if status == "success":
+                    spool.clear()
+                result["spool"] = spool.summary()
+            if scan.sample is not None:
+                result["sample"] = scan.sample.summary()
+            if failed:
+                result["error"] = f"{len(failed)} of {len(loaders)} targets failed: {[t['name'] for t in failed]}"
+            logger.info(f"Result: {result}")
+            return json_response(ctx, result, 500 if failed else 200)
 
         # Connect to Oracle ATP
         logger.info("Connecting to Oracle ATP")
-        oracle_conn = get_oracle_connection(
-            oracle_user, oracle_password, oracle_dsn,
-            oracle_wallet_location, oracle_wallet_password
-        )
+        oracle_conn = retry.call(connect)
         oracle_cursor = oracle_conn.cursor()
 
-        # Get DataFrame columns and types
-        columns = df.columns.tolist()
+        ensure_control_table(oracle_cursor, control_table)
+        ensure_reject_table(oracle_cursor, reject_table)
+        last_load = get_last_loaded_version(oracle_cursor, control_table, source_name, oracle_table_name)
 
-        # Check if table exists, create if not
-        logger.info(f"Checking if table {oracle_table_name} exists")
-        try:
-            oracle_cursor.execute(f"SELECT COUNT(*) FROM {oracle_table_name} WHERE ROWNUM = 1")
-            # Table exists, truncate it
-            logger.info(f"Table exists, truncating {oracle_table_name}")
-            oracle_cursor.execute(f"TRUNCATE TABLE {oracle_table_name}")
-            logger.info("Table truncated successfully")
-        except Exception as e:
-            # Table doesn't exist, create it
-            logger.info(f"Table doesn't exist, creating {oracle_table_name}")
-            create_table_sql = generate_create_table_sql(oracle_table_name, df)
-            logger.info(f"Create table SQL: {create_table_sql}")
-            oracle_cursor.execute(create_table_sql)
+        if (not is_worker and preflight != "check" and not force_reload and full_load and last_load
+                and last_load["source_version"] == table_version):
+            logger.info(f"Source unchanged since version {table_version}, skipping load")
+            oracle_cursor.close()
+            oracle_conn.close()
+
+            result = {
+                "status": "unchanged",
+                "table_version": table_version,
+                "last_loaded_at": last_load["load_completed"],
+                "rows_in_last_load": last_load["rows_loaded"],
+                "source": source_name,
+                "destination": oracle_table_name,
+                "timing": dict(timing, handler_seconds=round(time.perf_counter() - handler_started, 3))
+            }
+            return json_response(ctx, result)
+
+        load_started = datetime.now(timezone.utc)
+
+        logger.info(f"Loading data from Delta Share: {source_name} (version {table_version})")
+
+        # Started before the load starts any threads, so it can fork
+        conversion_pool = None
+        if (convert_workers > 1 and mode != "coordinator" and preflight != "check" and partition_column is None
+                and load_strategy != "sync"):
+            conversion_pool = get_conversion_pool(convert_workers)
+
+        # Stream data from Delta Share, pinned to the version we compared against.
+        # Files download in the background while earlier ones are inserted.
+        downloader = ParquetDownloader(max_workers=download_threads, prefetch=prefetch_files)
+        shard = (int(shard_index), int(shard_count)) if is_worker else None
+        spool = None
+        if spool_enabled and mode != "coordinator" and preflight != "check" and load_strategy != "sync":
+            spool = open_spool(spool_dir, spool_max_mb, source_name, table_version, columns, predicate,
+                               limit_rows, shard, sample_key)
+        scan = SharedTableScan(
+            profile_path, share_name, schema_name, table_name, downloader,
+            version=table_version, columns=columns, predicate=predicate, limit=limit_rows,
+            retry=retry, shard=shard, spool=spool, sample=table_sample()
+        )
+        logger.info(f"Scanning {scan.stats['files_total']} files with {download_threads} download threads")
+
+        columns = scan.output_columns
+
+        if preflight == "check":
+            # Validate everything before anything is written
+            column_defs = (get_target_columns(oracle_cursor, oracle_table_name)
+                           or column_defs_from_fields(scan.output_fields()))
+            report = preflight_check(scan, PreflightValidator(column_defs))
+            downloader.close()
+            oracle_cursor.close()
+            oracle_conn.close()
+
+            result = dict(
+                report,
+                status="valid" if report["rows_invalid"] == 0 else "invalid",
+                table_version=table_version,
+                scan=scan.stats,
+                source=source_name,
+                destination=oracle_table_name,
+                timing=dict(timing, handler_seconds=round(time.perf_counter() - handler_started, 3))
+            )
+            logger.info(f"Pre-flight result: {result}")
+            return json_response(ctx, result)
+
+        if load_strategy == "sync":
+            # Diff against the stored row hashes, one key range at a time
+            rejects = RejectLog(
+                oracle_cursor, reject_table, source_name, oracle_table_name, load_started, reject_limit
+            )
+            sync = HashDiffSync(oracle_conn, oracle_table_name, scan.output_fields(), merge_keys,
+                                batch_size, rejects, compression)
+            sync.prepare()
+            start_load(oracle_cursor, control_table, source_name, oracle_table_name, table_version, load_started)
+            oracle_conn.commit()
+
+            def range_scan(range_predicate):
+                return SharedTableScan(
+                    profile_path, share_name, schema_name, table_name, downloader,
+                    version=table_version, columns=columns, predicate=range_predicate, retry=retry
+                )
+
+            def start_progress(counters):
+                if progress_interval <= 0:
+                    return None
+                return ProgressReporter(
+                    connect, progress_table, run_id, source_name, oracle_table_name, counters,
+                    interval=progress_interval, files_total=len(scan.files),
+                    bytes_total=sum(add_file.size for add_file in scan.files)
+                ).start()
+
+            try:
+                scan_stats = sync_load(
+                    sync, scan, range_scan, body.get("sync_range_rows", DEFAULT_SYNC_RANGE_ROWS),
+                    connect, retry, start_progress
+                )
+            except Exception:
+                try:
+                    record_load(sync.cursor, control_table, source_name, oracle_table_name, table_version,
+                                sync.rows_written(), load_started, "FAILED")
+                    sync.connection.commit()
+                except Exception as record_error:
+                    logger.error(f"Could not record failed load: {record_error}")
+                raise
+            finally:
+                downloader.close()
+
+            oracle_conn, oracle_cursor = sync.connection, sync.cursor
+            rows_written = sync.rows_written()
+            oracle_cursor.execute(f"SELECT COUNT(*) FROM {oracle_table_name}")
+            oracle_count = oracle_cursor.fetchone()[0]
+            record_load(oracle_cursor, control_table, source_name, oracle_table_name, table_version,
+                        rows_written, load_started, "SUCCESS")
+            oracle_conn.commit()
+            oracle_cursor.close()
+            oracle_conn.close()
+
+            result = {
+                "status": "success",
+                "run_id": run_id,
+                "rows_migrated": rows_written,
+                "total_rows_in_oracle": oracle_count,
+                "table_version": table_version,
+                "scan": scan_stats,
+                "load_strategy": load_strategy,
+                "sync": sync.summary(),
+                "rejects": rejects.summary(),
+                "retries": retry.summary(),
+                "source": source_name,
+                "destination": oracle_table_name,
+                "timing": dict(timing, handler_seconds=round(time.perf_counter() - handler_started, 3))
+            }
+            logger.info(f"Result: {result}")
+            return json_response(ctx, result)
+
+        partitioning = None
+        if partition_column is not None:
+            try:
+                partitioning = PartitionSpec(
+                    partition_column, scan.output_fields(), partition_interval, partition_bounds
+                )
+            except ValueError as e:
+                raise InvalidRequest(str(e)) from e
+            missing_sort_keys = [key for key in partition_sort or [] if key not in columns]
+            require(not missing_sort_keys, f"partition_sort {missing_sort_keys} are not among the loaded columns")
+
+
+        warnings = []
+        load_id = os.urandom(4).hex().upper()
+        if is_worker:
+            # The coordinator prepared the table and finishes the load
+            load_table = oracle_table_name
+            target_exists = True
+            deferred_indexes = None
+        else:
+            warnings = check_load_strategy(oracle_cursor, oracle_table_name, columns, load_strategy, merge_keys)
+            for warning in warnings:
+                logger.warning(warning)
+            load_table, target_exists, deferred_indexes = prepare_load_table(
+                oracle_cursor, oracle_table_name, scan.output_fields(),
+                load_strategy, load_mode, compression, load_id, partitioning, partition_reload
+            )
             oracle_conn.commit()
-            logger.info("Table created successfully")
+        merge_counts = None
+        shards = None
 
-        # Dynamically build insert statement based on DataFrame columns
+        # Dynamically build insert statement based on the scanned columns
         placeholders = ', '.join([f':{i+1}' for i in range(len(columns))])
-        insert_sql = f"INSERT INTO {oracle_table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+        insert_sql = f"INSERT {insert_hint(load_mode)}INTO {load_table} ({', '.join(columns)}) VALUES ({placeholders})"
 
         logger.info(f"Insert SQL: {insert_sql}")
 
         rows_inserted = 0
+        rows_offset = 0
+        scan_offset = 0
         batch = []
+        # Source offsets of the batch rows, when pre-flight rejects leave gaps
+        batch_offsets = []
+        validator = None
+        if preflight == "reject":
+            validator = PreflightValidator(get_target_columns(oracle_cursor, load_table))
+        rejects = RejectLog(
+            oracle_cursor, reject_table, source_name, oracle_table_name, load_started, reject_limit
+        )
+        start_load(oracle_cursor, control_table, source_name, oracle_table_name, table_version, load_started)
+        oracle_conn.commit()
+        reconnected = False
 
-        for idx, row in df.iterrows():
-            # Convert row to tuple, handling None values and type conversions
-            row_values = []
-            for col in columns:
-                val = row[col]
-                # Handle pandas NA/NaN values
-                if val is None or (hasattr(val, '__class__') and 'NA' in val.__class__.__name__):
-                    row_values.append(None)
-                elif isinstance(val, bool):
-                    row_values.append(1 if val else 0)
-                else:
-                    row_values.append(val)
-
-            batch.append(tuple(row_values))
-
-            if len(batch) >= batch_size:
-                oracle_cursor.executemany(insert_sql, batch)
-                oracle_conn.commit()
-                rows_inserted += len(batch)
-                logger.info(f"Inserted {rows_inserted} rows...")
-                batch = []
+        loader = None
+        if partitioning is not None and mode != "coordinator":
+            pool = retry.call(lambda: get_oracle_pool(
+                oracle_user, oracle_password, oracle_dsn,
+                oracle_wallet_location, oracle_wallet_password, partition_parallel
+            ))
+            loader = PartitionLoader(
+                pool, load_table, columns, partitioning, batch_size, rejects, retry,
+                load_mode=load_mode, reload=partition_reload, sort_keys=partition_sort,
+                parallel=partition_parallel, load_id=load_id
+            )
+
+        progress = None
+        if progress_interval > 0:
+            progress = ProgressReporter(
+                connect, progress_table, run_id, source_name, oracle_table_name,
+                lambda: {
+                    "rows_committed": loader.rows_inserted if loader is not None else rows_inserted,
+                    "files_done": scan.stats["files_scanned"],
+                    "bytes_done": scan.stats["bytes_scanned"],
+                    "current_file": scan.current_file
+                },
+                interval=progress_interval, rows_total=scan.estimated_rows(),
+                files_total=len(scan.files), bytes_total=sum(add_file.size for add_file in scan.files)
+            ).start()
 
-        # Insert remaining rows
-        if batch:
-            oracle_cursor.executemany(insert_sql, batch)
+        pipelined = None
+        # (rows, source offsets, first row offset) of batches waiting for a pipeline
+        pending = []
+        if load_mode == "pipelined":
+            pipelined = PipelinedInserter(
+                lambda: get_oracle_async_connection(
+                    oracle_user, oracle_password, oracle_dsn,
+                    oracle_wallet_location, oracle_wallet_password
+                ),
+                insert_sql, body.get("pipeline_depth", DEFAULT_PIPELINE_DEPTH),
+                checkpoint=lambda batch_end: checkpoint_statement(
+                    control_table, source_name, oracle_table_name, load_started, batch_end
+                ),
+                committed=lambda: get_load_checkpoint(
+                    oracle_cursor, control_table, source_name, oracle_table_name, load_started
+                ),
+                retry=retry
+            )
+
+        def write_batch():
+            nonlocal reconnected
+            batch_end = rows_offset + len(batch)
+            if reconnected:
+                reconnected = False
+                # The commit may have gone through before the connection dropped
+                if get_load_checkpoint(oracle_cursor, control_table, source_name,
+                                       oracle_table_name, load_started) >= batch_end:
+                    logger.info(f"Batch ending at row {batch_end} was already committed")
+                    if validator is not None:
+                        return len(batch) - rejects.recover_batch(batch_offsets[0], batch_offsets[-1] + 1)
+                    return len(batch) - rejects.recover_batch(rows_offset, batch_end)
+            inserted = rejects.insert_batch(insert_sql, batch, rows_offset, batch_offsets if validator else None)
+            checkpoint_load(oracle_cursor, control_table, source_name, oracle_table_name,
+                            load_started, batch_end)
             oracle_conn.commit()
-            rows_inserted += len(batch)
+            rejects.batch_committed()
+            return inserted
+
+        def reconnect(error):
+            nonlocal oracle_conn, oracle_cursor, reconnected
+            logger.warning(f"Transient error writing batch at row {rows_offset}, reconnecting: {error}")
+            rejects.batch_failed()
+            try:
+                oracle_conn.close()
+            except Exception:
+                pass
+            oracle_conn = connect()
+            oracle_cursor = oracle_conn.cursor()
+            rejects.cursor = oracle_cursor
+            retry.stats["reconnects"] += 1
+            reconnected = True
+
+        def insert_batch():
+            nonlocal rows_inserted, rows_offset
+            if pipelined is not None:
+                pending.append((batch, batch_offsets, rows_offset))
+                rows_offset += len(batch)
+                if len(pending) >= pipelined.depth:
+                    flush_pipeline()
+                return
+            rows_inserted += retry.call(write_batch, on_retry=reconnect)
+            rows_offset += len(batch)
+            rejects.check_limit()
+
+        def flush_pipeline():
+            nonlocal rows_inserted, rows_offset, batch, batch_offsets
+            while pending:
+                done = pipelined.run([(rows, first_offset) for rows, _, first_offset in pending])
+                rows_inserted += sum(len(rows) for rows, _, _ in pending[:done])
+                del pending[:done]
+                if pending:
+                    # A data error stopped the pipeline: insert that batch with batch errors
+                    end_offset = rows_offset
+                    batch, batch_offsets, rows_offset = pending.pop(0)
+                    rows_inserted += retry.call(write_batch, on_retry=reconnect)
+                    rows_offset = end_offset
+                    rejects.check_limit()
+
+        def route_invalid_rows(arrow_table, first_offset):
+            valid_table, offsets, invalid = validator.split(arrow_table, first_offset)
+            if invalid:
+                rejects.quarantine(invalid)
+                oracle_conn.commit()
+                rejects.batch_committed()
+            return valid_table, offsets
+
+        def scanned_tables():
+            """
+            Yield (table, source offsets or None) to insert from this thread;
+            partitioned loads are handed to the loader instead
+            """
+            nonlocal scan_offset
+            for arrow_table in scan:
+                first_offset = scan_offset
+                scan_offset += arrow_table.num_rows
+                offsets = None
+                if validator is not None:
+                    arrow_table, offsets = retry.call(
+                        lambda: route_invalid_rows(arrow_table, first_offset), on_retry=reconnect
+                    )
+                    rejects.check_limit()
+
+                if loader is not None:
+                    # Loaded by the partition threads
+                    loader.add(arrow_table, range(first_offset, scan_offset) if offsets is None else offsets)
+                    rejects.check_limit()
+                    continue
+                yield arrow_table, offsets
 
-        logger.info(f"Migration complete! Total rows inserted: {rows_inserted}")
+        conversion = ConversionPipeline(batch_size, conversion_pool)
+
+        try:
+            if mode == "coordinator":
+                invoker = get_shard_invoker(body.get("invoker", "oci"), handler, body.get("function_id"))
+                rows_inserted, shards = coordinate_load(
+                    dict(body, run_id=run_id), scan.files, load_table, table_version, invoker,
+                    scan.stats, rejects, retry, scan.sample
+                )
+                rejects.check_limit()
+            else:
+                # Chunks are converted in the pool while earlier batches are inserted
+                for rows, row_offsets in conversion.iter(scanned_tables()):
+                    batch.extend(rows)
+                    if validator is not None:
+                        batch_offsets.extend(row_offsets)
+
+                    while len(batch) >= batch_size:
+                        rest, rest_offsets = batch[batch_size:], batch_offsets[batch_size:]
+                        batch, batch_offsets = batch[:batch_size], batch_offsets[:batch_size]
+                        insert_batch()
+                        logger.info(f"Inserted {rows_inserted} rows...")
+                        batch, batch_offsets = rest, rest_offsets
+
+                # Insert remaining rows
+                if batch:
+                    insert_batch()
+                if pending:
+                    flush_pipeline()
+                if loader is not None:
+                    rows_inserted = loader.finish(oracle_cursor)
+                    rejects.check_limit()
+
+            if not is_worker:
+                merge_counts = complete_load(
+                    oracle_cursor, oracle_table_name, load_table, columns, load_strategy,
+                    target_exists, deferred_indexes, load_id, merge_keys, merge_parallel
+                )
+                deferred_indexes = None
+                oracle_conn.commit()
+        except Exception:
+            try:
+                record_load(
+                    oracle_cursor, control_table, source_name, oracle_table_name, table_version,
+                    rows_inserted, load_started, "FAILED"
+                )
+                oracle_conn.commit()
+            except Exception as record_error:
+                logger.error(f"Could not record failed load: {record_error}")
+            if loader is not None:
+                loader.abort(oracle_cursor)
+            if pipelined is not None:
+                pipelined.close()
+            if progress is not None:
+                progress.finish("FAILED")
+            if not is_worker:
+                abort_load(oracle_cursor, oracle_table_name, load_table, load_strategy, deferred_indexes)
+            raise
+
+        downloader.close()
+        if pipelined is not None:
+            pipelined.close()
+        scan_stats = scan.stats
+        logger.info(f"Migration complete! Total rows inserted: {rows_inserted}, scan: {scan_stats}")
 
         # Verify count
         oracle_cursor.execute(f"SELECT COUNT(*) FROM {oracle_table_name}")
         oracle_count = oracle_cursor.fetchone()[0]
 
+        # Record the load so the next run can skip an unchanged source.
+        # A worker's record only covers its shard.
+        if is_worker:
+            status = "SHARD"
+        else:
+            status = "SUCCESS" if full_load else "PARTIAL"
+        record_load(
+            oracle_cursor, control_table, source_name, oracle_table_name, table_version,
+            rows_inserted, load_started, status
+        )
+        oracle_conn.commit()
+
+        if progress is not None:
+            progress.finish(status)
+
         oracle_cursor.close()
         oracle_conn.close()
 
         result = {
             "status": "success",
+            "run_id": run_id,
             "rows_migrated": rows_inserted,
             "total_rows_in_oracle": oracle_count,
-            "source": f"{share_name}.{schema_name}.{table_name}",
-            "destination": oracle_table_name
+            "table_version": table_version,
+            "scan": scan_stats,
+            "conversion": conversion.summary(),
+            "load_strategy": load_strategy,
+            "warnings": warnings,
+            "load_mode": load_mode,
+            "merge": merge_counts,
+            "rejects": rejects.summary(),
+            "retries": retry.summary(),
+            "source": source_name,
+            "destination": oracle_table_name,
+            "timing": dict(timing, handler_seconds=round(time.perf_counter() - handler_started, 3))
         }
 
+        if spool is not None:
+            # Other shards' rows, partitions kept by a reload or merged rows make the counts differ
+            if (oracle_count == rows_inserted or is_worker or partition_reload is not None
+                    or load_strategy == "merge"):
+                spool.clear()
+            result["spool"] = spool.summary()
+        if scan.sample is not None:
+            result["sample"] = scan.sample.summary()
+        if loader is not None:
+            result["partitions"] = loader.summary()
+        if pipelined is not None:
+            result["pipeline"] = pipelined.summary()
+        if is_worker:
+            result["shard"] = {"index": shard_index, "count": shard_count}
+        if shards is not None:
+            result["shards"] = shards
+            if load_strategy != "merge":
+                result["verified"] = oracle_count == rows_inserted
+
         logger.info(f"Result: {result}")
 
-        return response.Response(
-            ctx,
-            response_data=json.dumps(result),
-            headers={"Content-Type": "application/json"}
-        )
+        return json_response(ctx, result)
+
+    except InvalidRequest as e:
+        return json_response(ctx, {"error": str(e)}, 400)
 
     except Exception as e:
         logger.error(f"Error during migration: {str(e)}", exc_info=True)
-        return response.Response(
-            ctx,
-            response_data=json.dumps({
-                "status": "error",
-                "error": str(e),
-                "type": type(e).__name__
-            }),
-            headers={"Content-Type": "application/json"},
-            status_code=500
-        )
-
-
-def generate_create_table_sql(table_name, df):
-    """
-    Generate CREATE TABLE SQL based on pandas DataFrame schema
-    """
-    import pandas as pd
-    import numpy as np
-
-    column_definitions = []
-    for col in df.columns:
-        dtype = df[col].dtype
-
-        # Map pandas dtypes to Oracle types
-        if pd.api.types.is_integer_dtype(dtype):
-            oracle_type = "NUMBER"
-        elif pd.api.types.is_float_dtype(dtype):
-            oracle_type = "NUMBER"
-        elif pd.api.types.is_bool_dtype(dtype):
-            oracle_type = "NUMBER(1)"
-        elif pd.api.types.is_datetime64_any_dtype(dtype):
-            oracle_type = "DATE"
-        else:
-            # Default to VARCHAR2 for strings and unknown types
-            oracle_type = "VARCHAR2(4000)"
-
-        column_definitions.append(f"{col} {oracle_type}")
-
-    create_sql = f"CREATE TABLE {table_name} (\n  " + ",\n  ".join(column_definitions) + "\n)"
-    return create_sql
+        error_result = {
+            "status": "error",
+            "error": str(e),
+            "type": type(e).__name__
+        }
+        if run_id is not None:
+            error_result["run_id"] = run_id
+        if isinstance(e, RejectLimitExceeded):
+            error_result["rejects"] = e.rejects
+        return json_response(ctx, error_result, 500)
 
 
-def get_oracle_connection(user, password, dsn, wallet_location=None, wallet_password=None):
-    """
-    Connect to Oracle ATP database
-    """
-    if wallet_location:
-        # For ATP with wallet
-        return oracledb.connect(
-            user=user,
-            password=password,
-            dsn=dsn,
-            config_dir=wallet_location,
-            wallet_location=wallet_location,
-            wallet_password=wallet_password
-        )
-    else:
-        # For regular connection or TLS without wallet
-        return oracledb.connect(user=user, password=password, dsn=dsn)
+INIT_SECONDS = time.perf_counter() - _INIT_STARTED
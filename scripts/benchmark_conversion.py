@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark the handler's conversion stage: Arrow batches of a
+subscription_transactions-like table are converted into bind tuples inline
+or by a process pool of N workers (func.ConversionPipeline) while the main
+thread "inserts" each batch, simulated by sleeping for a round trip plus a
+per-row server time. With a pool, conversion overlaps the inserts; the gain
+needs as many CPUs as workers, so run it on the function's shape.
+
+Usage:
+    python scripts/benchmark_conversion.py [--rows 200000] [--batch-size 5000]
+        [--workers 1,2,4] [--insert-ms 20] [--insert-us-per-row 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "function"))
+import func  # noqa: E402
+
+
+def make_table(rows, seed=0):
+    """
+    Columns shaped like subscription_transactions: ids, strings, low-cardinality
+    dictionary columns, decimals, dates and timestamps
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(rows, dtype=np.int64)
+    days = rng.integers(0, 3 * 365, rows)
+    plans = pa.array(np.array(["basic", "standard", "premium", "enterprise"])[rng.integers(0, 4, rows)])
+    return pa.table({
+        "transaction_id": ids,
+        "user_id": pa.array([f"user_{i % 50000:06d}" for i in ids]),
+        "user_email": pa.array([f"user{i % 50000}@example.com" for i in ids]),
+        "subscription_plan": plans.dictionary_encode(),
+        "currency": pa.array(np.array(["USD", "EUR", "GBP"])[rng.integers(0, 3, rows)]).dictionary_encode(),
+        "amount": pa.array(rng.integers(100, 100000, rows)).cast(pa.decimal128(21, 0)).cast(pa.decimal128(21, 2)),
+        "transaction_date": pa.array(days.astype("datetime64[D]").astype("datetime64[s]")),
+        "start_date": pa.array(days.astype("datetime64[D]")),
+        "is_renewal": pa.array(rng.integers(0, 2, rows).astype(bool)),
+        "discount_applied": pa.array(rng.random(rows) * 30),
+    })
+
+
+def run(files, batch_size, workers, insert_seconds, per_row_seconds):
+    pool = func.get_conversion_pool(workers) if workers > 1 else None
+    pipeline = func.ConversionPipeline(batch_size, pool)
+    started = time.perf_counter()
+    rows = 0
+    for batch, _ in pipeline.iter((table, None) for table in files):
+        rows += len(batch)
+        # The network round trip and server time of executemany
+        time.sleep(insert_seconds + per_row_seconds * len(batch))
+    elapsed = time.perf_counter() - started
+    return rows, elapsed, pipeline.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inline vs process-pool conversion")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--files", type=int, default=8, help="Split the table into this many scanned files")
+    parser.add_argument("--workers", default=None,
+                        help=f"Comma-separated pool sizes (default: 1,2,...,{func.available_cpus()})")
+    parser.add_argument("--insert-ms", type=float, default=20, help="Simulated round trip per batch")
+    parser.add_argument("--insert-us-per-row", type=float, default=5, help="Simulated server time per row")
+    args = parser.parse_args()
+
+    cpus = func.available_cpus()
+    worker_counts = ([int(w) for w in args.workers.split(",")] if args.workers
+                     else sorted({1, *[n for n in (2, 4, 8) if n <= cpus], cpus}))
+
+    table = make_table(args.rows)
+    per_file = -(-args.rows // args.files)
+    files = [table.slice(offset, per_file) for offset in range(0, args.rows, per_file)]
+
+    started = time.perf_counter()
+    for file_table in files:
+        func.arrow_to_rows(file_table)
+    convert_only = time.perf_counter() - started
+    insert_only = (args.rows / args.batch_size) * args.insert_ms / 1000 + args.rows * args.insert_us_per_row / 1e6
+
+    print(f"{args.rows} rows, batch size {args.batch_size}, {cpus} CPUs available")
+    print(f"conversion alone: {convert_only:.2f}s, simulated inserts alone: {insert_only:.2f}s")
+    print(f"{'workers':>8} {'seconds':>9} {'rows/s':>10} {'waited':>8} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        rows, elapsed, summary = run(files, args.batch_size, workers,
+                                     args.insert_ms / 1000, args.insert_us_per_row / 1e6)
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {rows / elapsed:>10,.0f} {summary['wait_seconds']:>8.2f} "
+              f"{baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
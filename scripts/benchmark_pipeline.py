@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pipelined load mode against conventional inserts as network
+latency grows. A local TCP proxy delays every chunk by half the round trip
+in each direction; both loaders connect through it and insert the same
+batches into a scratch table, committing each batch: conventionally with
+executemany + commit per batch (two round trips), pipelined with
+dbrx_migration.loaders.PipelinedInserter sending "depth" batches per pipeline.
+
+Pipelining only saves round trips on Oracle Database 23ai, e.g. the Oracle
+Database Free container:
+    docker run -d -p 1521:1521 -e ORACLE_PWD=... container-registry.oracle.com/database/free
+
+The proxy forwards plain TCP, so point it at a listener without TLS (an
+Autonomous Database's TCPS endpoint checks the host name it is reached by).
+
+Usage:
+    python scripts/benchmark_pipeline.py [--rtt-ms 0,5,20,50] [--rows 20000]
+        [--batch-size 500] [--depth 1,4,16] [--table BENCH_PIPELINE]
+
+Connects with ORACLE_USER, ORACLE_PASSWORD and ORACLE_HOST, ORACLE_PORT,
+ORACLE_SERVICE (from the environment or .env).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import oracledb
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "function"))
+from dbrx_migration.loaders import PipelinedInserter  # noqa: E402
+
+
+class LatencyProxy:
+    """
+    Forwards localhost:<port> to host:port, delivering each chunk
+    delay_seconds after it was read, in order
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.delay_seconds = 0.0
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self._accept, "127.0.0.1", 0))
+        self.listen_port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self.loop.run_forever()
+
+    async def _accept(self, client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(self.host, self.port)
+        await asyncio.gather(
+            self._pipe(client_reader, upstream_writer),
+            self._pipe(upstream_reader, client_writer),
+            return_exceptions=True
+        )
+
+    async def _pipe(self, reader, writer):
+        chunks = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                due, chunk = await chunks.get()
+                if chunk is None:
+                    break
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+                writer.write(chunk)
+                await writer.drain()
+            writer.close()
+
+        delivering = asyncio.ensure_future(deliver())
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                await chunks.put((time.monotonic() + self.delay_seconds, chunk))
+        finally:
+            await chunks.put((0, None))
+            await delivering
+
+
+def make_batches(rows, batch_size):
+    data = [(i, f"customer_{i % 10000:05d}", round(i * 0.37 % 1000, 2)) for i in range(rows)]
+    return [data[offset:offset + batch_size] for offset in range(0, rows, batch_size)]
+
+
+def load_conventional(connect, insert_sql, batches):
+    conn = connect()
+    cursor = conn.cursor()
+    for rows in batches:
+        cursor.executemany(insert_sql, rows)
+        conn.commit()
+    conn.close()
+
+
+def load_pipelined(connect_async, insert_sql, batches, depth):
+    inserter = PipelinedInserter(connect_async, insert_sql, depth)
+    offset = 0
+    numbered = []
+    for rows in batches:
+        numbered.append((rows, offset))
+        offset += len(rows)
+    done = inserter.run(numbered)
+    inserter.close()
+    if done != len(batches):
+        raise RuntimeError(f"Only {done} of {len(batches)} batches were loaded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipelined vs conventional inserts by RTT")
+    parser.add_argument("--rtt-ms", default="0,5,20,50", help="Comma-separated round trip times to inject")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--depth", default="1,4,16", help="Comma-separated pipeline depths")
+    parser.add_argument("--table", default="BENCH_PIPELINE", help="Scratch table, dropped and recreated")
+    args = parser.parse_args()
+
+    load_dotenv()
+    user, password = os.getenv("ORACLE_USER"), os.getenv("ORACLE_PASSWORD")
+    proxy = LatencyProxy(os.getenv("ORACLE_HOST", "localhost"), int(os.getenv("ORACLE_PORT", "1521")))
+    dsn = f"127.0.0.1:{proxy.listen_port}/{os.getenv('ORACLE_SERVICE', 'FREEPDB1')}"
+
+    def connect():
+        return oracledb.connect(user=user, password=password, dsn=dsn)
+
+    def connect_async():
+        return oracledb.connect_async(user=user, password=password, dsn=dsn)
+
+    admin = connect()
+    cursor = admin.cursor()
+    print(f"Oracle Database {admin.version}" + ("" if admin.version.startswith("23")
+                                                else " (pipelines run unbatched before 23ai)"))
+    try:
+        cursor.execute(f"DROP TABLE {args.table} PURGE")
+    except oracledb.DatabaseError:
+        pass
+    cursor.execute(f"CREATE TABLE {args.table} (id NUMBER(12), name VARCHAR2(40), amount NUMBER(12,2))")
+    insert_sql = f"INSERT INTO {args.table} (id, name, amount) VALUES (:1, :2, :3)"
+
+    batches = make_batches(args.rows, args.batch_size)
+    depths = [int(depth) for depth in args.depth.split(",")]
+    print(f"{args.rows} rows in {len(batches)} batches of {args.batch_size}, one commit per batch")
+    print(f"{'rtt ms':>7} {'conventional':>13} " + " ".join(f"{f'depth {d}':>10}" for d in depths) + "   rows/s")
+
+    for rtt_ms in [float(rtt) for rtt in args.rtt_ms.split(",")]:
+        proxy.delay_seconds = rtt_ms / 2000
+        rates = []
+        for load in [lambda: load_conventional(connect, insert_sql, batches)] + [
+                lambda depth=depth: load_pipelined(connect_async, insert_sql, batches, depth) for depth in depths]:
+            cursor.execute(f"TRUNCATE TABLE {args.table}")
+            started = time.perf_counter()
+            load()
+            rates.append(args.rows / (time.perf_counter() - started))
+        print(f"{rtt_ms:>7g} {rates[0]:>13,.0f} " + " ".join(f"{rate:>10,.0f}" for rate in rates[1:]))
+
+    cursor.execute(f"DROP TABLE {args.table} PURGE")
+    admin.close()
+
+
+if __name__ == "__main__":
+    main()
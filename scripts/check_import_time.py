@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Fail when importing function/func.py gets slower or starts pulling heavy
+modules back into module load (what every cold start pays before the handler runs)
+
+Usage:
+    python scripts/check_import_time.py [--budget-ms 200]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+FUNCTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "function")
+
+# Modules that must only be imported on the code paths that need them
+DEFERRED_MODULES = ["pandas", "numpy", "pyarrow", "delta_sharing", "fsspec", "oracledb", "requests", "oci"]
+
+DEFAULT_BUDGET_MS = 200
+
+
+def measure_import():
+    """
+    Import func in a fresh interpreter with -X importtime.
+    Returns {module name: cumulative microseconds}
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import func"],
+        cwd=FUNCTION_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        raise SystemExit("Importing func.py failed")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check func.py import cost")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum cumulative import time of func.py (default: {DEFAULT_BUDGET_MS})")
+    args = parser.parse_args()
+
+    timings = measure_import()
+    func_ms = timings.get("func", 0) / 1000
+    loaded = [name for name in DEFERRED_MODULES if name in timings]
+
+    print(f"func.py import time: {func_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("Slowest imports:")
+    for name, micros in sorted(timings.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if func_ms > args.budget_ms:
+        print(f"FAIL: import time {func_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"FAIL: modules imported at module load instead of on demand: {loaded}")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Follow a migration run in the ATP progress table the function writes to
+every progress_interval seconds, including a coordinator's workers
+(run ids "<run_id>:<shard>"). Exits once the run is no longer RUNNING.
+
+Usage:
+    python scripts/tail_progress.py <run_id> [--table DBRX_MIGRATION_PROGRESS] [--interval 5] [--once]
+
+Connects with ORACLE_USER, ORACLE_PASSWORD, ORACLE_DSN and optionally
+ORACLE_WALLET_LOCATION / ORACLE_WALLET_PASSWORD (from the environment or .env).
+"""
+import argparse
+import os
+import time
+
+import oracledb
+from dotenv import load_dotenv
+
+DEFAULT_PROGRESS_TABLE = "DBRX_MIGRATION_PROGRESS"
+
+
+def connect():
+    wallet_location = os.getenv("ORACLE_WALLET_LOCATION")
+    if wallet_location:
+        return oracledb.connect(
+            user=os.getenv("ORACLE_USER"),
+            password=os.getenv("ORACLE_PASSWORD"),
+            dsn=os.getenv("ORACLE_DSN"),
+            config_dir=wallet_location,
+            wallet_location=wallet_location,
+            wallet_password=os.getenv("ORACLE_WALLET_PASSWORD")
+        )
+    return oracledb.connect(user=os.getenv("ORACLE_USER"), password=os.getenv("ORACLE_PASSWORD"),
+                            dsn=os.getenv("ORACLE_DSN"))
+
+
+def fetch_progress(cursor, table, run_id):
+    cursor.execute(f"""
+        SELECT run_id, status, rows_committed, rows_total, rows_per_second,
+               files_done, files_total, current_file, eta_seconds, updated_at
+        FROM {table}
+        WHERE run_id = :1 OR run_id LIKE :2
+        ORDER BY run_id
+    """, [run_id, f"{run_id}:%"])
+    columns = [d[0].lower() for d in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def format_row(row):
+    total = f"/{row['rows_total']:,}" if row["rows_total"] is not None else ""
+    files = f"{row['files_done'] or 0}/{row['files_total'] or 0}"
+    eta = f"{row['eta_seconds']:.0f}s" if row["eta_seconds"] is not None else "-"
+    return (f"{row['run_id']}  {row['status']:<8} rows {row['rows_committed'] or 0:,}{total}"
+            f"  {row['rows_per_second'] or 0:,.0f} rows/s  files {files}  eta {eta}"
+            f"  {row['current_file'] or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow a migration run's progress")
+    parser.add_argument("run_id", help="run_id from the function's response or logs")
+    parser.add_argument("--table", default=DEFAULT_PROGRESS_TABLE,
+                        help=f"Progress table (default: {DEFAULT_PROGRESS_TABLE})")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between polls (default: 5)")
+    parser.add_argument("--once", action="store_true", help="Print the current state and exit")
+    args = parser.parse_args()
+
+    load_dotenv()
+    conn = connect()
+    cursor = conn.cursor()
+    seen = {}
+
+    try:
+        while True:
+            rows = fetch_progress(cursor, args.table, args.run_id)
+            if not rows:
+                print(f"No progress for run {args.run_id} yet")
+            for row in rows:
+                if seen.get(row["run_id"]) != row["updated_at"]:
+                    seen[row["run_id"]] = row["updated_at"]
+                    print(f"{row['updated_at']:%H:%M:%S}  {format_row(row)}")
+            if len(rows) > 1:
+                committed = sum(row["rows_committed"] or 0 for row in rows)
+                rate = sum(row["rows_per_second"] or 0 for row in rows if row["status"] == "RUNNING")
+                print(f"          total rows {committed:,}, {rate:,.0f} rows/s across running workers")
+
+            if args.once or (rows and all(row["status"] != "RUNNING" for row in rows)):
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
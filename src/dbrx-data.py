@@ -1,16 +1,142 @@
 from databricks import sql
+import json
 import os
+import queue
+import sys
+import threading
+from datetime import timedelta
 from faker import Faker
 import random
 import oracledb
+import pandas as pd
 from dotenv import load_dotenv
-import delta_sharing
+
+# Delta Sharing reads use the scan and downloader of the OCI function's package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "function"))
+from dbrx_migration.control import DEFAULT_CONTROL_TABLE, RejectLimitExceeded, get_load_history
+from dbrx_migration.loaders import COMPRESSION_CLAUSES, PARTITION_INTERVALS, insert_hint
+from dbrx_migration.planning import FUNCTION_MEMORY_MB, FUNCTION_TIMEOUT_SECONDS, plan_load
+from dbrx_migration.sharing import (
+    DEFAULT_DOWNLOAD_THREADS, DEFAULT_SAMPLE_SEED, ParquetDownloader, SharedTableScan, TableSample, file_row_counts
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
 fake = Faker()
 
+DEFAULT_REJECT_FILE = "rejected_rows.jsonl"
+# High-water marks of incremental migrate_to_oracle runs, per table and column
+DEFAULT_WATERMARK_TABLE = "DBRX_MIGRATION_WATERMARKS"
+# Columns of subscription_transactions an incremental run can track, with
+# their position in the row
+WATERMARK_COLUMNS = {"transaction_id": 0, "transaction_date": 9}
+INCREMENTAL_STRATEGIES = ("append", "merge")
+SUBSCRIPTION_COLUMNS = (
+    "transaction_id", "user_id", "user_name", "user_email", "subscription_plan", "billing_cycle",
+    "amount", "currency", "payment_method", "transaction_date", "start_date", "end_date",
+    "status", "is_renewal", "discount_applied", "country"
+)
+
+
+class RejectWriter:
+    """
+    Inserts batches with executemany(batcherrors=True) and appends the rows
+    Oracle rejects, with their ORA code and source offset, to a JSON lines file
+    """
+
+    def __init__(self, path, limit=0, sample_size=5):
+        self.path = path
+        self.limit = limit
+        self.sample_size = sample_size
+        self.count = 0
+        self.sample = []
+
+    def insert_batch(self, cursor, insert_sql, batch, offset):
+        """
+        Insert a batch whose first row is at source position offset.
+        Returns the number of rows inserted; the caller commits.
+        """
+        cursor.executemany(insert_sql, batch, batcherrors=True)
+        errors = cursor.getbatcherrors()
+        if not errors:
+            return len(batch)
+
+        with open(self.path, "a") as f:
+            for error in errors:
+                reject = {"offset": offset + error.offset, "code": error.code, "message": error.message}
+                if len(self.sample) < self.sample_size:
+                    self.sample.append(reject)
+                f.write(json.dumps(dict(reject, row=list(batch[error.offset])), default=str) + "\n")
+        self.count += len(errors)
+        return len(batch) - len(errors)
+
+    def check_limit(self):
+        if self.limit is not None and self.count > self.limit:
+            raise RejectLimitExceeded(
+                f"{self.count} rows rejected, more than reject_limit {self.limit}; see {self.path}",
+                {"count": self.count, "limit": self.limit, "file": self.path, "sample": self.sample}
+            )
+
+
+class TargetWriter:
+    """
+    Inserts the batches of a multi-target migration into one Oracle target
+    on its own thread and connection, with its own commits and reject file.
+    A failure stops only this target; the batches are shared with the
+    other targets and queued up to queue_size deep.
+    """
+
+    def __init__(self, name, connection, insert_sql, reject_file, reject_limit=0, queue_size=2):
+        self.name = name
+        self.conn = connection
+        self.cursor = connection.cursor()
+        self.insert_sql = insert_sql
+        self.rejects = RejectWriter(reject_file, reject_limit)
+        self.rows_inserted = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, batch, offset):
+        if self.error is None:
+            self._queue.put((batch, offset))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            # Keep draining after a failure so send() never blocks
+            if self.error is not None:
+                continue
+            batch, offset = item
+            try:
+                self.rows_inserted += self.rejects.insert_batch(self.cursor, self.insert_sql, batch, offset)
+                self.conn.commit()
+                self.rejects.check_limit()
+                print(f"[{self.name}] Inserted {self.rows_inserted} rows...")
+            except Exception as e:
+                print(f"[{self.name}] Failed: {e}")
+                self.error = e
+
+    def finish(self, table_name):
+        """
+        Wait for the queued batches, then report the target's row count
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is None:
+            self.cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+            print(f"[{self.name}] Migration complete! Inserted {self.rows_inserted} rows, "
+                  f"verified rows in Oracle: {self.cursor.fetchone()[0]}")
+        if self.rejects.count:
+            print(f"[{self.name}] Rejected {self.rejects.count} rows, see {self.rejects.path}: {self.rejects.sample}")
+        self.cursor.close()
+        self.conn.close()
+
+
 def get_connection():
     return sql.connect(
         server_hostname=os.getenv("DATABRICKS_SERVER_HOSTNAME"),
@@ -86,7 +212,6 @@ def insert_synthetic_data(num_rows=1000, start_id=1):
         else:
             days = 365
 
-        from datetime import timedelta
         end_date = start_date + timedelta(days=days)
 
         # Apply discount
@@ -122,16 +247,36 @@ def insert_synthetic_data(num_rows=1000, start_id=1):
     cursor.close()
     connection.close()
 
-def read_data(limit=5):
+def read_data(limit=5, exact_count=False):
+    """
+    Print the table's size and row count from its metadata, and its first
+    rows. The row count is the statistic ANALYZE TABLE records, so the table
+    is not scanned; exact_count=True runs COUNT(*) instead.
+    """
+    import re
+
     connection = get_connection()
     cursor = connection.cursor()
 
-    # Get total count
-    cursor.execute("SELECT COUNT(*) FROM subscription_transactions")
-    count = cursor.fetchone()
-    print(f"Total rows in table: {count[0]}")
+    cursor.execute("DESCRIBE DETAIL subscription_transactions")
+    detail = dict(zip([column[0] for column in cursor.description], cursor.fetchone()))
+    print(f"Table files: {detail['numFiles']}, size: {detail['sizeInBytes']} bytes")
+
+    if exact_count:
+        cursor.execute("SELECT COUNT(*) FROM subscription_transactions")
+        print(f"Total rows in table: {cursor.fetchone()[0]}")
+    else:
+        # "Statistics" reads e.g. "1530 bytes, 1000 rows" once computed
+        cursor.execute("DESCRIBE TABLE EXTENDED subscription_transactions")
+        statistics = next((row[1] for row in cursor.fetchall() if row[0] == "Statistics"), None)
+        rows = re.search(r"(\d+) rows", statistics or "")
+        if rows:
+            print(f"Total rows in table: {rows.group(1)} (as of the last ANALYZE TABLE)")
+        else:
+            print("Total rows in table: unknown, run ANALYZE TABLE subscription_transactions "
+                  "COMPUTE STATISTICS or pass exact_count=True")
 
-    # Get sample data
+    # Get sample data, limited on the server
     cursor.execute(f"SELECT * FROM subscription_transactions LIMIT {limit}")
     print(f"\nSample data (showing {limit} rows):")
     for row in cursor.fetchall():
@@ -140,40 +285,128 @@ def read_data(limit=5):
     cursor.close()
     connection.close()
 
-def read_data_delta_share(profile_path, share_name, schema_name, table_name, limit=5):
+def iter_delta_share(profile_path, share_name, schema_name, table_name, limit=None,
+                     download_threads=DEFAULT_DOWNLOAD_THREADS,
+                     sample_fraction=None, sample_rows=None, sample_seed=DEFAULT_SAMPLE_SEED):
     """
-    Read data using Delta Sharing
+    Stream a shared table as pandas DataFrames, one per Parquet file, with
+    files downloaded concurrently by a ParquetDownloader (see SharedTableScan).
+    The scan compacts each file, so low-cardinality strings come back as
+    categoricals and integers as the narrowest lossless dtype.
     Args:
         profile_path: Path to Delta Sharing profile file (.share)
         share_name: Name of the share
         schema_name: Name of the schema
         table_name: Name of the table
-        limit: Number of rows to display (default: 5)
+        limit: Maximum number of rows to return (optional)
+        download_threads: Number of concurrent file downloads
+        sample_fraction: Return a reproducible sample of this share of the rows instead (see TableSample)
+        sample_rows: Return a sample of about this many rows instead
+        sample_seed: Seed of the sample
     """
-    # Create Delta Sharing client
-    client = delta_sharing.SharingClient(profile_path)
-
-    # Construct table URL
-    table_url = f"{profile_path}#{share_name}.{schema_name}.{table_name}"
+    sample = None
+    if sample_fraction is not None or sample_rows is not None:
+        sample = TableSample(sample_fraction, sample_rows, sample_seed)
+    downloader = ParquetDownloader(max_workers=download_threads)
+    try:
+        for arrow_table in SharedTableScan(profile_path, share_name, schema_name, table_name, downloader,
+                                           limit=limit, sample=sample):
+            yield arrow_table.to_pandas(date_as_object=True)
+    finally:
+        downloader.close()
 
-    # Load table as pandas DataFrame
-    df = delta_sharing.load_as_pandas(table_url)
 
-    # Get total count
-    total_rows = len(df)
-    print(f"Total rows in table: {total_rows}")
+def read_data_delta_share(profile_path, share_name, schema_name, table_name, limit=5,
+                          download_threads=DEFAULT_DOWNLOAD_THREADS):
+    """
+    Read data using Delta Sharing: the row count comes from the files'
+    numRecords statistics and only the files holding the sample rows are
+    downloaded, so large tables are inspected without reading them
+    Args:
+        profile_path: Path to Delta Sharing profile file (.share)
+        share_name: Name of the share
+        schema_name: Name of the schema
+        table_name: Name of the table
+        limit: Number of rows to display (default: 5)
+        download_threads: Number of concurrent file downloads
+    Returns the sample as a pandas DataFrame
+    """
+    # Get total count from the file listing, without downloading anything
+    scan = SharedTableScan(profile_path, share_name, schema_name, table_name, None)
+    counts = file_row_counts(scan.files)
+    total_rows = sum(count for count in counts if count is not None)
+    missing = counts.count(None)
+    if missing:
+        print(f"Total rows in table: at least {total_rows} "
+              f"({missing} of {len(counts)} files have no numRecords statistics)")
+    else:
+        print(f"Total rows in table: {total_rows}")
 
-    # Display sample data
-    print(f"\nSample data (showing {min(limit, total_rows)} rows):")
-    print(df.head(limit))
+    # Display sample data, limited on the server and in the files fetched
+    chunks = list(iter_delta_share(profile_path, share_name, schema_name, table_name, limit=limit,
+                                   download_threads=download_threads))
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    print(f"\nSample data (showing {len(df)} rows):")
+    print(df)
 
     return df
 
+def plan_delta_share_load(profile_path, share_name, schema_name, table_name, limit=None,
+                          oracle_user=None, oracle_password=None, oracle_dsn=None,
+                          wallet_location=None, wallet_password=None, control_table=DEFAULT_CONTROL_TABLE,
+                          memory_mb=FUNCTION_MEMORY_MB, timeout_seconds=FUNCTION_TIMEOUT_SECONDS):
+    """
+    Plan a migration from the shared table's metadata and file list only,
+    without downloading any data, as the OCI function's dry_run mode does:
+    file count, bytes, rows from the files' numRecords statistics, projected
+    runtime and memory, and the batch size, download threads and function
+    shard count to use
+    Args:
+        profile_path: Path to Delta Sharing profile file (.share)
+        share_name: Name of the share
+        schema_name: Name of the schema
+        table_name: Name of the table
+        limit: Maximum number of rows the migration would load (optional)
+        oracle_user, oracle_password, oracle_dsn, wallet_location, wallet_password:
+            ATP connection to read past load rates from control_table (optional)
+        control_table: The function's load control table
+        memory_mb: Memory of one run (the function's by default)
+        timeout_seconds: Time limit of one run (the function's by default)
+    """
+    scan = SharedTableScan(profile_path, share_name, schema_name, table_name, None, limit=limit)
+
+    # Load rate of past runs recorded by the function
+    history = None
+    if oracle_user and oracle_password and oracle_dsn:
+        oracle_conn = get_oracle_connection(oracle_user, oracle_password, oracle_dsn, wallet_location, wallet_password)
+        cursor = oracle_conn.cursor()
+        try:
+            history = get_load_history(cursor, control_table, f"{share_name}.{schema_name}.{table_name}")
+        finally:
+            cursor.close()
+            oracle_conn.close()
+
+    plan = plan_load(scan, history, memory_mb=memory_mb, timeout_seconds=timeout_seconds)
+    plan["schema"] = [(field["name"], field["type"]) for field in scan.output_fields()]
+    recommended = plan["recommended"]
+    rows = plan["estimated_rows"]
+    print(f"{plan['files']} files, {plan['bytes']:,} bytes, ~{rows if rows is not None else '?'} rows")
+    print(f"Projected {plan['projected_seconds']}s at {plan['throughput']['rows_per_second']} rows/s "
+          f"({plan['throughput']['scope']} rate), ~{plan['projected_memory_mb']} MB")
+    print(f"Recommended: batch_size={recommended['batch_size']}, "
+          f"download_threads={recommended['download_threads']}, shard_count={recommended['shard_count']}")
+    for warning in plan["warnings"]:
+        print(f"Warning: {warning}")
+    return plan
+
 def migrate_to_oracle_delta_share(profile_path, share_name, schema_name, table_name,
                                    oracle_user, oracle_password, oracle_dsn,
-                                   wallet_location=None, wallet_password=None, batch_size=100):
+                                   wallet_location=None, wallet_password=None, batch_size=100,
+                                   download_threads=DEFAULT_DOWNLOAD_THREADS, load_mode="conventional",
+                                   reject_file=DEFAULT_REJECT_FILE, reject_limit=0, targets=None):
     """
-    Read data from Delta Share and insert into Oracle ATP
+    Read data from Delta Share and insert into Oracle ATP, or into several
+    ATP databases at once (targets)
     Args:
         profile_path: Path to Delta Sharing profile file (.share)
         share_name: Name of the share
@@ -185,70 +418,100 @@ def migrate_to_oracle_delta_share(profile_path, share_name, schema_name, table_n
         wallet_location: Path to wallet directory (optional)
         wallet_password: Wallet password (optional)
         batch_size: Number of rows to insert per batch
+        download_threads: Number of concurrent file downloads
+        load_mode: "conventional" or "direct_path" (APPEND_VALUES, use large batches)
+        reject_file: JSON lines file for rows Oracle rejects
+        reject_limit: Fail once more rows than this are rejected (None for no limit)
+        targets: List of dicts with a "name" and any of user, password, dsn,
+            wallet_location, wallet_password that differ from the arguments above.
+            Each batch is built once and inserted into every target by its own
+            thread, with its own commits and "<name>_<reject_file>"; a failed
+            target stops alone and the others are completed.
+    """
+    insert_sql = f"""
+        INSERT {insert_hint(load_mode)}INTO subscription_transactions
+        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15, :16)
     """
-    # Load data from Delta Share
-    table_url = f"{profile_path}#{share_name}.{schema_name}.{table_name}"
-    df = delta_sharing.load_as_pandas(table_url)
-
-    total_rows = len(df)
-    print(f"Total rows to migrate from Delta Share: {total_rows}")
 
-    # Connect to Oracle
-    oracle_conn = get_oracle_connection(oracle_user, oracle_password, oracle_dsn, wallet_location, wallet_password)
-    oracle_cursor = oracle_conn.cursor()
+    writers = None
+    if targets:
+        writers = []
+        for index, target in enumerate(targets):
+            name = target.get("name", f"target{index}")
+            connection = get_oracle_connection(
+                target.get("user", oracle_user), target.get("password", oracle_password),
+                target.get("dsn", oracle_dsn), target.get("wallet_location", wallet_location),
+                target.get("wallet_password", wallet_password)
+            )
+            target_reject_file = os.path.join(os.path.dirname(reject_file), f"{name}_{os.path.basename(reject_file)}")
+            writers.append(TargetWriter(name, connection, insert_sql, target_reject_file, reject_limit))
+    else:
+        # Connect to Oracle
+        oracle_conn = get_oracle_connection(oracle_user, oracle_password, oracle_dsn, wallet_location, wallet_password)
+        oracle_cursor = oracle_conn.cursor()
 
     rows_inserted = 0
+    batch_offset = 0
+    rejects = RejectWriter(reject_file, reject_limit)
     batch = []
 
-    for idx, row in df.iterrows():
-        # Convert boolean to number for Oracle if needed
-        is_renewal = 1 if row.get('is_renewal', False) else 0
-
-        batch.append((
-            int(row.get('transaction_id', 0)),
-            str(row.get('user_id', '')),
-            str(row.get('user_name', '')),
-            str(row.get('user_email', '')),
-            str(row.get('subscription_plan', '')),
-            str(row.get('billing_cycle', '')),
-            float(row.get('amount', 0.0)),
-            str(row.get('currency', '')),
-            str(row.get('payment_method', '')),
-            row.get('transaction_date'),
-            row.get('start_date'),
-            row.get('end_date'),
-            str(row.get('status', '')),
-            is_renewal,
-            float(row.get('discount_applied', 0.0)),
-            str(row.get('country', ''))
-        ))
-
-        if len(batch) >= batch_size:
-            oracle_cursor.executemany(
-                """
-                INSERT INTO subscription_transactions
-                VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15, :16)
-                """,
-                batch
-            )
+    def insert_batch():
+        nonlocal rows_inserted, batch_offset
+        if writers is not None:
+            for writer in writers:
+                writer.send(batch, batch_offset)
+        else:
+            rows_inserted += rejects.insert_batch(oracle_cursor, insert_sql, batch, batch_offset)
             oracle_conn.commit()
-            rows_inserted += len(batch)
+            rejects.check_limit()
             print(f"Inserted {rows_inserted} rows...")
-            batch = []
+        batch_offset += len(batch)
+
+    # Files are downloaded in the background while earlier ones are inserted
+    for df in iter_delta_share(profile_path, share_name, schema_name, table_name,
+                               download_threads=download_threads):
+        for idx, row in df.iterrows():
+            # Convert boolean to number for Oracle if needed
+            is_renewal = 1 if row.get('is_renewal', False) else 0
+
+            batch.append((
+                int(row.get('transaction_id', 0)),
+                str(row.get('user_id', '')),
+                str(row.get('user_name', '')),
+                str(row.get('user_email', '')),
+                str(row.get('subscription_plan', '')),
+                str(row.get('billing_cycle', '')),
+                float(row.get('amount', 0.0)),
+                str(row.get('currency', '')),
+                str(row.get('payment_method', '')),
+                row.get('transaction_date'),
+                row.get('start_date'),
+                row.get('end_date'),
+                str(row.get('status', '')),
+                is_renewal,
+                float(row.get('discount_applied', 0.0)),
+                str(row.get('country', ''))
+            ))
+
+            if len(batch) >= batch_size:
+                insert_batch()
+                batch = []
 
     # Insert remaining rows
     if batch:
-        oracle_cursor.executemany(
-            """
-            INSERT INTO subscription_transactions
-            VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15, :16)
-            """,
-            batch
-        )
-        oracle_conn.commit()
-        rows_inserted += len(batch)
+        insert_batch()
+
+    if writers is not None:
+        for writer in writers:
+            writer.finish("subscription_transactions")
+        failed = [writer.name for writer in writers if writer.error is not None]
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(writers)} targets failed: {failed}")
+        return
 
     print(f"Migration complete! Total rows inserted: {rows_inserted}")
+    if rejects.count:
+        print(f"Rejected {rejects.count} rows, see {reject_file}: {rejects.sample}")
 
     # Verify count in Oracle
     oracle_cursor.execute("SELECT COUNT(*) FROM subscription_transactions")
@@ -282,8 +545,19 @@ def get_oracle_connection(user, password, dsn, wallet_location=None, wallet_pass
         # For regular connection or TLS without wallet
         return oracledb.connect(user=user, password=password, dsn=dsn)
 
-def create_oracle_table(user, password, dsn, wallet_location=None, wallet_password=None):
-    """Create the subscription_transactions table in Oracle ATP"""
+def create_oracle_table(user, password, dsn, wallet_location=None, wallet_password=None, compression=None,
+                        partition_interval=None):
+    """
+    Create the subscription_transactions table in Oracle ATP.
+    The table is created without indexes or constraints so they can be added after the load.
+    compression: None, "basic" or "advanced" table compression
+    partition_interval: None, or "day", "month" or "year" to interval-partition by transaction_date
+    """
+    partitioning = ""
+    if partition_interval:
+        partitioning = (f"PARTITION BY RANGE (transaction_date) INTERVAL ({PARTITION_INTERVALS[partition_interval]}) "
+                        "(PARTITION P0 VALUES LESS THAN (TIMESTAMP '1970-01-01 00:00:00'))")
+
     conn = get_oracle_connection(user, password, dsn, wallet_location, wallet_password)
     cursor = conn.cursor()
 
@@ -295,7 +569,7 @@ def create_oracle_table(user, password, dsn, wallet_location=None, wallet_passwo
         pass
 
     # Create table
-    cursor.execute("""
+    cursor.execute(f"""
         CREATE TABLE subscription_transactions (
             transaction_id NUMBER(10),
             user_id VARCHAR2(100),
@@ -313,7 +587,7 @@ def create_oracle_table(user, password, dsn, wallet_location=None, wallet_passwo
             is_renewal NUMBER(1),
             discount_applied NUMBER(5, 2),
             country VARCHAR2(100)
-        )
+        ) {COMPRESSION_CLAUSES[compression] if compression else ""} {partitioning}
     """)
 
     conn.commit()
@@ -321,7 +595,82 @@ def create_oracle_table(user, password, dsn, wallet_location=None, wallet_passwo
     cursor.close()
     conn.close()
 
-def migrate_to_oracle(user, password, dsn, wallet_location=None, wallet_password=None, batch_size=100):
+
+def ensure_watermark_table(cursor, watermark_table=DEFAULT_WATERMARK_TABLE):
+    """
+    Create the high-water mark table unless it exists
+    """
+    try:
+        cursor.execute(f"""
+            CREATE TABLE {watermark_table} (
+                table_name VARCHAR2(128) NOT NULL,
+                watermark_column VARCHAR2(128) NOT NULL,
+                high_water_number NUMBER,
+                high_water_timestamp TIMESTAMP,
+                rows_loaded NUMBER,
+                updated_at TIMESTAMP,
+                CONSTRAINT {watermark_table}_PK PRIMARY KEY (table_name, watermark_column)
+            )
+        """)
+        print(f"Created watermark table {watermark_table}")
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        if error.code != 955:  # ORA-00955: name is already used by an existing object
+            raise
+
+
+def get_watermark(cursor, table_name, column, watermark_table=DEFAULT_WATERMARK_TABLE):
+    """
+    Return the stored high-water mark of table_name's column, or None
+    """
+    cursor.execute(f"""
+        SELECT high_water_number, high_water_timestamp FROM {watermark_table}
+        WHERE table_name = :1 AND watermark_column = :2
+    """, [table_name, column])
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return row[0] if row[0] is not None else row[1]
+
+
+def set_watermark(cursor, table_name, column, value, rows_loaded, watermark_table=DEFAULT_WATERMARK_TABLE):
+    """
+    Store table_name's high-water mark; the caller commits it with the last batch
+    """
+    is_number = isinstance(value, (int, float))
+    cursor.execute(f"""
+        MERGE INTO {watermark_table} w
+        USING (SELECT :1 AS table_name, :2 AS watermark_column FROM dual) s
+        ON (w.table_name = s.table_name AND w.watermark_column = s.watermark_column)
+        WHEN MATCHED THEN UPDATE SET high_water_number = :3, high_water_timestamp = :4,
+                                     rows_loaded = :5, updated_at = SYSTIMESTAMP
+        WHEN NOT MATCHED THEN INSERT (table_name, watermark_column, high_water_number,
+                                      high_water_timestamp, rows_loaded, updated_at)
+            VALUES (s.table_name, s.watermark_column, :3, :4, :5, SYSTIMESTAMP)
+    """, [table_name, column, value if is_number else None, None if is_number else value, rows_loaded])
+
+
+def subscription_merge_sql():
+    """
+    MERGE of one bound row into subscription_transactions on transaction_id
+    """
+    selected = ", ".join(f":{i + 1} AS {column}" for i, column in enumerate(SUBSCRIPTION_COLUMNS))
+    updates = ", ".join(f"t.{column} = s.{column}" for column in SUBSCRIPTION_COLUMNS[1:])
+    return f"""
+        MERGE INTO subscription_transactions t
+        USING (SELECT {selected} FROM dual) s
+        ON (t.transaction_id = s.transaction_id)
+        WHEN MATCHED THEN UPDATE SET {updates}
+        WHEN NOT MATCHED THEN INSERT ({", ".join(SUBSCRIPTION_COLUMNS)})
+            VALUES ({", ".join(f"s.{column}" for column in SUBSCRIPTION_COLUMNS)})
+    """
+
+
+def migrate_to_oracle(user, password, dsn, wallet_location=None, wallet_password=None, batch_size=100,
+                      load_mode="conventional", reject_file=DEFAULT_REJECT_FILE, reject_limit=0,
+                      incremental=False, watermark_column="transaction_date", lookback=None,
+                      incremental_strategy="merge", full_reload=False,
+                      watermark_table=DEFAULT_WATERMARK_TABLE):
     """
     Read data from Databricks and insert into Oracle ATP
     Args:
@@ -331,7 +680,33 @@ def migrate_to_oracle(user, password, dsn, wallet_location=None, wallet_password
         wallet_location: Path to wallet directory (optional)
         wallet_password: Wallet password (optional)
         batch_size: Number of rows to insert per batch
+        load_mode: "conventional" or "direct_path" (APPEND_VALUES, use large batches)
+        reject_file: JSON lines file for rows Oracle rejects
+        reject_limit: Fail once more rows than this are rejected (None for no limit)
+        incremental: Extract only rows beyond the high-water mark of watermark_column
+            stored in watermark_table (on the first run, the table's current maximum in
+            ATP), into the existing table; the mark advances with the last batch's commit
+        watermark_column: "transaction_date" or "transaction_id"
+        lookback: Re-extract rows this far below the mark for late-arriving data
+            (a timedelta for transaction_date, a number of ids for transaction_id)
+        incremental_strategy: "merge" upserts the rows on transaction_id; "append"
+            deletes and commits the rows beyond the lower bound first (left there
+            by a failed run or the lookback window), then inserts
+        full_reload: With incremental (ValueError otherwise), truncate the table,
+            extract everything and reset the mark
     """
+    if watermark_column not in WATERMARK_COLUMNS or incremental_strategy not in INCREMENTAL_STRATEGIES:
+        raise ValueError(f"Invalid watermark_column/incremental_strategy: {watermark_column}/{incremental_strategy}")
+    if full_reload and not incremental:
+        raise ValueError("full_reload applies to incremental runs only")
+    merge = incremental and incremental_strategy == "merge"
+    if merge and load_mode == "direct_path":
+        raise ValueError("load_mode direct_path does not apply to incremental_strategy merge")
+    insert_sql = subscription_merge_sql() if merge else f"""
+        INSERT {insert_hint(load_mode)}INTO subscription_transactions
+        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15, :16)
+    """
+
     # Connect to Databricks
     dbrx_conn = get_connection()
     dbrx_cursor = dbrx_conn.cursor()
@@ -340,18 +715,48 @@ def migrate_to_oracle(user, password, dsn, wallet_location=None, wallet_password
     oracle_conn = get_oracle_connection(user, password, dsn, wallet_location, wallet_password)
     oracle_cursor = oracle_conn.cursor()
 
+    where, parameters = "", []
+    if incremental:
+        ensure_watermark_table(oracle_cursor, watermark_table)
+        if full_reload:
+            oracle_cursor.execute("TRUNCATE TABLE subscription_transactions")
+            print("Full reload: truncated subscription_transactions")
+        else:
+            mark = get_watermark(oracle_cursor, "subscription_transactions", watermark_column, watermark_table)
+            if mark is None:
+                oracle_cursor.execute(f"SELECT MAX({watermark_column}) FROM subscription_transactions")
+                mark = oracle_cursor.fetchone()[0]
+            if mark is not None:
+                low = mark - lookback if lookback else mark
+                where, parameters = f" WHERE {watermark_column} > ?", [low]
+                print(f"High-water mark {watermark_column} = {mark}, extracting rows after {low}")
+                if incremental_strategy == "append":
+                    oracle_cursor.execute(
+                        f"DELETE FROM subscription_transactions WHERE {watermark_column} > :1", [low]
+                    )
+                    print(f"Deleted {oracle_cursor.rowcount} rows after {low} before appending")
+                    # On its own, so the load's batches do not carry the delete's undo
+                    oracle_conn.commit()
+    watermark_index = WATERMARK_COLUMNS[watermark_column]
+    high_water = None
+
     # Get total count
-    dbrx_cursor.execute("SELECT COUNT(*) FROM subscription_transactions")
+    dbrx_cursor.execute(f"SELECT COUNT(*) FROM subscription_transactions{where}", parameters)
     total_rows = dbrx_cursor.fetchone()[0]
     print(f"Total rows to migrate: {total_rows}")
 
     # Fetch and insert in batches
-    dbrx_cursor.execute("SELECT * FROM subscription_transactions")
+    dbrx_cursor.execute(f"SELECT * FROM subscription_transactions{where}", parameters)
 
     rows_inserted = 0
+    batch_offset = 0
+    rejects = RejectWriter(reject_file, reject_limit)
     batch = []
 
     for row in dbrx_cursor:
+        if incremental and row[watermark_index] is not None and (
+                high_water is None or row[watermark_index] > high_water):
+            high_water = row[watermark_index]
         # Convert boolean to number for Oracle
         is_renewal = 1 if row[13] else 0
 
@@ -375,31 +780,28 @@ def migrate_to_oracle(user, password, dsn, wallet_location=None, wallet_password
         ))
 
         if len(batch) >= batch_size:
-            oracle_cursor.executemany(
-                """
-                INSERT INTO subscription_transactions
-                VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15, :16)
-                """,
-                batch
-            )
+            rows_inserted += rejects.insert_batch(oracle_cursor, insert_sql, batch, batch_offset)
             oracle_conn.commit()
-            rows_inserted += len(batch)
+            batch_offset += len(batch)
+            rejects.check_limit()
             print(f"Inserted {rows_inserted} rows...")
             batch = []
 
     # Insert remaining rows
     if batch:
-        oracle_cursor.executemany(
-            """
-            INSERT INTO subscription_transactions
-            VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15, :16)
-            """,
-            batch
-        )
-        oracle_conn.commit()
-        rows_inserted += len(batch)
-
-    print(f"Migration complete! Total rows inserted: {rows_inserted}")
+        rows_inserted += rejects.insert_batch(oracle_cursor, insert_sql, batch, batch_offset)
+        batch_offset += len(batch)
+        rejects.check_limit()
+    if incremental and high_water is not None:
+        # A failed run leaves the mark behind, so the next one extracts its rows again
+        set_watermark(oracle_cursor, "subscription_transactions", watermark_column, high_water,
+                      rows_inserted, watermark_table)
+        print(f"High-water mark {watermark_column} advanced to {high_water}")
+    oracle_conn.commit()
+
+    print(f"Migration complete! Total rows {'merged' if merge else 'inserted'}: {rows_inserted}")
+    if rejects.count:
+        print(f"Rejected {rejects.count} rows, see {reject_file}: {rejects.sample}")
 
     # Verify count in Oracle
     oracle_cursor.execute("SELECT COUNT(*) FROM subscription_transactions")
@@ -411,8 +813,12 @@ def migrate_to_oracle(user, password, dsn, wallet_location=None, wallet_password
     oracle_cursor.close()
     oracle_conn.close()
 
-def create_boston_housing_table(user, password, dsn, wallet_location=None, wallet_password=None):
-    """Create boston_housing table in Oracle ATP"""
+def create_boston_housing_table(user, password, dsn, wallet_location=None, wallet_password=None,
+                                compression=None):
+    """
+    Create boston_housing table in Oracle ATP (no indexes, see create_oracle_table)
+    compression: None, "basic" or "advanced" table compression
+    """
     conn = get_oracle_connection(user, password, dsn, wallet_location, wallet_password)
     cursor = conn.cursor()
 
@@ -424,7 +830,7 @@ def create_boston_housing_table(user, password, dsn, wallet_location=None, walle
         pass
 
     # Create table
-    cursor.execute("""
+    cursor.execute(f"""
         CREATE TABLE boston_housing (
             id NUMBER(10),
             crim NUMBER(10, 5),
@@ -441,7 +847,7 @@ def create_boston_housing_table(user, password, dsn, wallet_location=None, walle
             black_index NUMBER(10, 2),
             lstat NUMBER(10, 2),
             medv NUMBER(10, 1)
-        )
+        ) {COMPRESSION_CLAUSES[compression] if compression else ""}
     """)
 
     conn.commit()
@@ -452,69 +858,75 @@ def create_boston_housing_table(user, password, dsn, wallet_location=None, walle
 def migrate_boston_housing_to_oracle(profile_path, share_name, schema_name, table_name,
                                      oracle_user, oracle_password, oracle_dsn,
                                      wallet_location=None, wallet_password=None,
-                                     limit_rows=200, batch_size=50):
+                                     limit_rows=200, batch_size=50,
+                                     download_threads=DEFAULT_DOWNLOAD_THREADS, load_mode="conventional",
+                                     reject_file=DEFAULT_REJECT_FILE, reject_limit=0,
+                                     sample_fraction=None, sample_rows=None, sample_seed=DEFAULT_SAMPLE_SEED):
     """
     Migrate Boston Housing data from public Delta Share to Oracle ATP
+    Rejected rows go to reject_file, see migrate_to_oracle_delta_share.
+    sample_fraction or sample_rows (with limit_rows=None) load a
+    reproducible sample spread over the table instead of its first rows,
+    downloading only the sampled row groups (see TableSample).
+    """
+    if (sample_fraction is not None or sample_rows is not None) and limit_rows is not None:
+        raise ValueError("sample_fraction/sample_rows replace limit_rows, pass limit_rows=None")
+    insert_sql = f"""
+        INSERT {insert_hint(load_mode)}INTO boston_housing
+        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15)
     """
-    # Load data from Delta Share
-    table_url = f"{profile_path}#{share_name}.{schema_name}.{table_name}"
-    df = delta_sharing.load_as_pandas(table_url, limit=limit_rows)
-
-    total_rows = len(df)
-    print(f"Total rows to migrate from Delta Share (Boston Housing): {total_rows}")
 
     # Connect to Oracle
     oracle_conn = get_oracle_connection(oracle_user, oracle_password, oracle_dsn, wallet_location, wallet_password)
     oracle_cursor = oracle_conn.cursor()
 
     rows_inserted = 0
+    batch_offset = 0
+    rejects = RejectWriter(reject_file, reject_limit)
+    row_offset = 0
     batch = []
 
-    for idx, row in df.iterrows():
-        batch.append((
-            int(row.get('ID', idx)),
-            float(row.get('crim', 0.0)),
-            float(row.get('zn', 0.0)),
-            float(row.get('indus', 0.0)),
-            int(row.get('chas', 0)),
-            float(row.get('nox', 0.0)),
-            float(row.get('rm', 0.0)),
-            float(row.get('age', 0.0)),
-            float(row.get('dis', 0.0)),
-            int(row.get('rad', 0)),
-            int(row.get('tax', 0)),
-            float(row.get('ptratio', 0.0)),
-            float(row.get('black', 0.0)),
-            float(row.get('lstat', 0.0)),
-            float(row.get('medv', 0.0))
-        ))
-
-        if len(batch) >= batch_size:
-            oracle_cursor.executemany(
-                """
-                INSERT INTO boston_housing
-                VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15)
-                """,
-                batch
-            )
-            oracle_conn.commit()
-            rows_inserted += len(batch)
-            print(f"Inserted {rows_inserted} rows...")
-            batch = []
+    for df in iter_delta_share(profile_path, share_name, schema_name, table_name,
+                               limit=limit_rows, download_threads=download_threads,
+                               sample_fraction=sample_fraction, sample_rows=sample_rows, sample_seed=sample_seed):
+        for idx, row in enumerate(df.to_dict("records"), start=row_offset):
+            batch.append((
+                int(row.get('ID', idx)),
+                float(row.get('crim', 0.0)),
+                float(row.get('zn', 0.0)),
+                float(row.get('indus', 0.0)),
+                int(row.get('chas', 0)),
+                float(row.get('nox', 0.0)),
+                float(row.get('rm', 0.0)),
+                float(row.get('age', 0.0)),
+                float(row.get('dis', 0.0)),
+                int(row.get('rad', 0)),
+                int(row.get('tax', 0)),
+                float(row.get('ptratio', 0.0)),
+                float(row.get('black', 0.0)),
+                float(row.get('lstat', 0.0)),
+                float(row.get('medv', 0.0))
+            ))
+
+            if len(batch) >= batch_size:
+                rows_inserted += rejects.insert_batch(oracle_cursor, insert_sql, batch, batch_offset)
+                oracle_conn.commit()
+                batch_offset += len(batch)
+                rejects.check_limit()
+                print(f"Inserted {rows_inserted} rows...")
+                batch = []
+        row_offset += len(df)
 
     # Insert remaining rows
     if batch:
-        oracle_cursor.executemany(
-            """
-            INSERT INTO boston_housing
-            VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14, :15)
-            """,
-            batch
-        )
+        rows_inserted += rejects.insert_batch(oracle_cursor, insert_sql, batch, batch_offset)
         oracle_conn.commit()
-        rows_inserted += len(batch)
+        batch_offset += len(batch)
+        rejects.check_limit()
 
     print(f"Migration complete! Total rows inserted: {rows_inserted}")
+    if rejects.count:
+        print(f"Rejected {rejects.count} rows, see {reject_file}: {rejects.sample}")
 
     # Verify count in Oracle
     oracle_cursor.execute("SELECT COUNT(*) FROM boston_housing")
@@ -539,6 +951,7 @@ if __name__ == "__main__":
     # delta_table_name = os.getenv("DELTA_TABLE_NAME")
     #
     # read_data_delta_share(delta_profile_path, delta_share_name, delta_schema_name, delta_table_name, limit=5)
+    # plan_delta_share_load(delta_profile_path, delta_share_name, delta_schema_name, delta_table_name)  # No download
 
     # ===== Oracle ATP Migration - Direct Connection =====
     # oracle_user = os.getenv("ORACLE_USER")
@@ -549,6 +962,9 @@ if __name__ == "__main__":
     #
     # create_oracle_table(oracle_user, oracle_password, oracle_dsn, oracle_wallet_location, oracle_wallet_password)
     # migrate_to_oracle(oracle_user, oracle_password, oracle_dsn, oracle_wallet_location, oracle_wallet_password, batch_size=100)
+    # Daily runs afterwards: only rows beyond the stored transaction_date mark, re-checking the last two days
+    # migrate_to_oracle(oracle_user, oracle_password, oracle_dsn, oracle_wallet_location, oracle_wallet_password,
+    #                   incremental=True, lookback=timedelta(days=2))
 
     # ===== Oracle ATP Migration - From Delta Share =====
     # migrate_to_oracle_delta_share(
@@ -569,10 +985,10 @@ if __name__ == "__main__":
     # Step 1: Create boston_housing table in Oracle
     create_boston_housing_table(oracle_user, oracle_password, oracle_dsn, oracle_wallet_location, oracle_wallet_password)
 
-    # Step 2: Migrate 200 rows from public Delta Share to Oracle
+    # Step 2: Migrate a reproducible sample of about 200 rows from public Delta Share to Oracle
     migrate_boston_housing_to_oracle(
         public_profile_path, "delta_sharing", "default", "boston-housing",
         oracle_user, oracle_password, oracle_dsn,
         oracle_wallet_location, oracle_wallet_password,
-        limit_rows=200, batch_size=50
+        limit_rows=None, sample_rows=200, sample_seed=42, batch_size=50
     )
\ No newline at end of file
@@ -0,0 +1,73 @@
+import base64
+import io
+import json
+import os
+import sys
+
+import pytest
+
+# The function's modules are loaded from its directory, as fdk does with func.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "function"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_oracle import FakeOracle  # noqa: E402
+from sharing_server import SharingServer  # noqa: E402
+
+
+class Context:
+    def __init__(self):
+        self.headers = None
+        self.status_code = None
+
+    def SetResponseHeaders(self, headers, status_code):
+        self.headers = headers
+        self.status_code = status_code
+
+    def RequestID(self):
+        return "test-request"
+
+    def Config(self):
+        return {}
+
+
+@pytest.fixture
+def sharing_server():
+    server = SharingServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def oracle(monkeypatch):
+    import oracledb
+
+    database = FakeOracle()
+    monkeypatch.setattr(oracledb, "connect", database.connect)
+    monkeypatch.setattr(oracledb, "connect_async", database.connect_async)
+    monkeypatch.setattr(oracledb, "create_pool", database.create_pool)
+    return database
+
+
+@pytest.fixture
+def invoke(sharing_server, oracle):
+    """
+    Call the function handler with a request for share.default.<table_name>
+    against the test sharing server and the fake ATP; returns (status, body)
+    """
+    import func
+
+    def call(table_name, **params):
+        body = {
+            "delta_profile_base64": base64.b64encode(sharing_server.profile().encode()).decode(),
+            "share_name": sharing_server.share,
+            "schema_name": sharing_server.schema,
+            "table_name": table_name,
+            "oracle_user": "ADMIN",
+            "oracle_password": "password",
+            "oracle_dsn": "atp_high",
+        }
+        body.update(params)
+        result = func.handler(Context(), io.BytesIO(json.dumps(body).encode()))
+        return result.status(), json.loads(result.body())
+
+    return call
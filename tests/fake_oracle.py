@@ -0,0 +1,323 @@
+"""
+An in-memory stand-in for an ATP connection: oracledb.connect is patched to
+return connections to one shared sqlite database, with the Oracle SQL the
+function issues translated to sqlite and sqlite errors raised as
+oracledb.DatabaseError carrying the matching ORA- code
+"""
+import datetime
+import decimal
+import re
+import sqlite3
+import threading
+import types
+
+import oracledb
+
+sqlite3.register_adapter(decimal.Decimal, str)
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: datetime.datetime.fromisoformat(value.decode()))
+
+
+class OracleError:
+    def __init__(self, code, message):
+        self.code = code
+        self.full_code = f"ORA-{code:05d}"
+        self.message = f"{self.full_code}: {message}"
+
+    def __str__(self):
+        return self.message
+
+
+def database_error(code, message):
+    return oracledb.DatabaseError(OracleError(code, message))
+
+
+def translate(sql):
+    """
+    Rewrite the Oracle dialect the function uses into sqlite
+    """
+    query = " ".join(sql.split())
+    query = re.sub(r":(\d+)", r"?\1", query)
+    query = re.sub(r"FETCH FIRST (\d+) ROWS ONLY", r"LIMIT \1", query)
+    query = query.replace("WHERE ROWNUM = 1", "LIMIT 1").replace("SYSTIMESTAMP", "CURRENT_TIMESTAMP")
+    query = re.sub(r"^TRUNCATE TABLE", "DELETE FROM", query)
+    query = re.sub(r"VARCHAR2\((\d+)( CHAR)?\)", r"VARCHAR(\1)", query)
+    query = re.sub(r"TIMESTAMP WITH TIME ZONE", "TIMESTAMP", query)
+    query = re.sub(r"LISTAGG\((.*?), ', '\) WITHIN GROUP \(ORDER BY [\w.]+\)", r"GROUP_CONCAT(\1, ', ')", query)
+    query = re.sub(r"^BEGIN DBMS_STATS\..*END;$", "SELECT ?1", query)
+    query = re.sub(r"\bUSER\b", "'ADMIN'", query)
+    query = query.replace(" PURGE", "")
+    # Single-row upserts keyed by a bind
+    query = re.sub(
+        r"^MERGE INTO (\w+) \w+ USING \(SELECT :\w+ AS (\w+) FROM dual\) \w+ ON \(.*?\) "
+        r"WHEN MATCHED THEN UPDATE SET (.*?) WHEN NOT MATCHED THEN INSERT \((.*?)\) VALUES \((.*?)\)$",
+        r"INSERT INTO \1 (\4) VALUES (\5) ON CONFLICT (\2) DO UPDATE SET \3", query)
+    # Upserts of a row of binds keyed by all but its last column
+    query = re.sub(
+        r"^MERGE INTO (\w+) \w+ USING \(SELECT (.*?) FROM dual\) \w+ ON \(.*?\) "
+        r"WHEN MATCHED THEN UPDATE SET \w+\.(\w+) = \w+\.\w+ WHEN NOT MATCHED THEN INSERT \((.*?)\) VALUES \(.*?\)$",
+        lambda m: (f"INSERT INTO {m[1]} ({m[4]}) VALUES ({', '.join(item.split(' AS ')[0] for item in m[2].split(', '))})"
+                   f" ON CONFLICT ({m[4].rsplit(', ', 1)[0]}) DO UPDATE SET {m[3]} = excluded.{m[3]}"),
+        query)
+    query = re.sub(r"^ALTER TABLE (\w+) ADD PRIMARY KEY \((.*?)\)$", r"CREATE UNIQUE INDEX \1_PK ON \1 (\2)", query)
+    # Partitioning and storage options of created tables
+    query = re.sub(r"\) PARTITION BY RANGE .*$", ")", query)
+    query = re.sub(r" PARTITION FOR \([^)]*\)", "", query)
+    query = re.sub(r"\) (ROW STORE COMPRESS ADVANCED|COMPRESS)( NOLOGGING)?$", ")", query)
+    return query
+
+
+# The data dictionary views the loaders read, empty until a test adds rows
+DICTIONARY_VIEWS = [
+    "CREATE TABLE user_constraints (table_name, constraint_name, constraint_type, index_name, generated,"
+    " r_constraint_name, delete_rule, search_condition_vc, status)",
+    "CREATE TABLE user_cons_columns (constraint_name, column_name, position)",
+    "CREATE TABLE user_indexes (table_name, index_name, uniqueness, index_type, status)",
+    "CREATE TABLE user_ind_columns (index_name, column_name, column_position)",
+    "CREATE TABLE user_tab_privs (table_name, grantee, privilege, grantor)",
+    "CREATE TABLE user_triggers (table_name, trigger_name)",
+    "CREATE TABLE user_part_tables (table_name)",
+    "CREATE TABLE user_tab_columns (table_name, column_name, data_type, data_length, char_length, char_used,"
+    " data_precision, data_scale, nullable)",
+]
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.cursor = database.connection.cursor()
+        self.arraysize = 100
+        self.batch_errors = []
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    def _run(self, query, params):
+        try:
+            with self.database.lock:
+                self.cursor.execute(query, params if isinstance(params, dict) else list(params or []))
+        except sqlite3.Error as e:
+            message = str(e)
+            if "already exists" in message:
+                raise database_error(955, "name is already used by an existing object")
+            if "no such table" in message:
+                raise database_error(942, "table or view does not exist")
+            raise database_error(1, message)
+
+    def execute(self, sql, params=None, **kwargs):
+        self.database.statements.append(" ".join(sql.split()))
+        query = translate(sql)
+        self.database.check_connection(query)
+        self._run(query, params)
+
+    def executemany(self, sql, rows, batcherrors=False, **kwargs):
+        query = translate(sql)
+        self.database.statements.append(" ".join(sql.split()))
+        self.database.check_connection(query)
+        self.batch_errors = []
+        for offset, row in enumerate(rows):
+            if batcherrors and self.database.reject and self.database.reject(row):
+                self.batch_errors.append(types.SimpleNamespace(
+                    offset=offset, code=12899, full_code="ORA-12899",
+                    message="ORA-12899: value too large for column"))
+                continue
+            try:
+                self._run(query, row)
+            except oracledb.DatabaseError as e:
+                if not batcherrors:
+                    raise
+                error, = e.args
+                self.batch_errors.append(types.SimpleNamespace(
+                    offset=offset, code=error.code, full_code=error.full_code, message=error.message))
+
+    def getbatcherrors(self):
+        return self.batch_errors
+
+    def setinputsizes(self, *args, **kwargs):
+        pass
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        return self.cursor.fetchmany(size or self.arraysize)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingCursor:
+    """
+    Records statements and answers dictionary queries from `results`, a
+    list of (query fragment, rows); `fail` names a statement to reject and
+    `rowcount` is reported for every statement
+    """
+
+    def __init__(self, results=(), fail=None, rowcount=0):
+        self.results = list(results)
+        self.fail = fail
+        self.rowcount = rowcount
+        self.statements = []
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        statement = " ".join(sql.split())
+        self.statements.append(statement)
+        if self.fail and self.fail in statement:
+            raise database_error(54, "resource busy")
+        self.rows = next((rows for fragment, rows in self.results if fragment in statement), [])
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self.database)
+
+    def fetch_df_batches(self, statement, parameters=None, size=100):
+        """
+        The query's rows as Arrow tables of up to size rows, standing in for
+        python-oracledb's DataFrame fetch
+        """
+        import pyarrow as pa
+
+        cursor = self.cursor()
+        cursor.execute(statement, parameters)
+        names = [column[0].lower() for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield pa.table({name: [row[i] for row in rows] for i, name in enumerate(names)})
+
+    def commit(self):
+        # Statements run in autocommit, so a failing commit has gone through
+        self.database.check_connection("COMMIT")
+        self.commits += 1
+        self.database.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAsyncConnection:
+    """
+    An asyncio connection that runs a pipeline's operations in order,
+    stopping at the first error as python-oracledb does
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.connection = FakeConnection(database)
+        self.pipelines = 0
+
+    async def run_pipeline(self, pipeline):
+        self.pipelines += 1
+        self.database.pipelines += 1
+        cursor = self.connection.cursor()
+        for operation in pipeline.operations:
+            if operation.op_type == oracledb.PipelineOpType.COMMIT:
+                self.connection.commit()
+            elif operation.op_type == oracledb.PipelineOpType.EXECUTE_MANY:
+                if self.database.reject and any(map(self.database.reject, operation.parameters)):
+                    raise database_error(12899, "value too large for column")
+                cursor.executemany(operation.statement, operation.parameters)
+            else:
+                cursor.execute(operation.statement, operation.parameters)
+
+    async def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, database, size):
+        self.database = database
+        self.size = size
+        self.acquired = 0
+        self.closed = False
+
+    def acquire(self):
+        self.acquired += 1
+        return self.database.connect()
+
+    def release(self, connection):
+        pass
+
+    def drop(self, connection):
+        pass
+
+    def close(self, force=False):
+        self.closed = True
+
+
+class FakeOracle:
+    """
+    `fail(query)` and `reject(row)` hooks inject connection failures and
+    per-row batch errors; `fail` is also asked with "COMMIT" on commits.
+    `statements` records every statement as issued.
+    """
+
+    def __init__(self):
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None,
+                                          detect_types=sqlite3.PARSE_DECLTYPES)
+        self.lock = threading.RLock()
+        self.statements = []
+        self.commits = 0
+        self.connects = 0
+        self.pools = []
+        self.pipelines = 0
+        self.fail = None
+        self.reject = None
+        for statement in DICTIONARY_VIEWS:
+            self.connection.execute(statement)
+
+    def connect(self, **kwargs):
+        self.connects += 1
+        return FakeConnection(self)
+
+    async def connect_async(self, **kwargs):
+        self.connects += 1
+        return FakeAsyncConnection(self)
+
+    def create_pool(self, min=1, max=1, **kwargs):
+        self.pools.append(FakePool(self, max))
+        return self.pools[-1]
+
+    def check_connection(self, query):
+        if self.fail and self.fail(query):
+            raise database_error(3113, "end-of-file on communication channel")
+
+    def tables(self):
+        return sorted(row[0].upper() for row in self.rows(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'user_%'"))
+
+    def rows(self, query, params=()):
+        with self.lock:
+            return self.connection.execute(query, params).fetchall()
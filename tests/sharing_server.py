@@ -0,0 +1,180 @@
+"""
+A Delta Sharing server for tests: serves one share's tables from Arrow
+tables held in memory, with the version, metadata and query endpoints and
+presigned-style file URLs that honor Range requests
+"""
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def delta_type(arrow_type):
+    import pyarrow as pa
+
+    if pa.types.is_int64(arrow_type):
+        return "long"
+    if pa.types.is_int32(arrow_type):
+        return "integer"
+    if pa.types.is_floating(arrow_type):
+        return "double"
+    if pa.types.is_boolean(arrow_type):
+        return "boolean"
+    if pa.types.is_date32(arrow_type):
+        return "date"
+    if pa.types.is_timestamp(arrow_type):
+        return "timestamp"
+    if pa.types.is_decimal(arrow_type):
+        return f"decimal({arrow_type.precision},{arrow_type.scale})"
+    return "string"
+
+
+def file_stats(arrow_table):
+    import pyarrow.compute as pc
+
+    stats = {"numRecords": arrow_table.num_rows, "minValues": {}, "maxValues": {}, "nullCount": {}}
+    for name in arrow_table.column_names:
+        column = arrow_table.column(name)
+        stats["nullCount"][name] = column.null_count
+        if delta_type(column.type) in ("long", "integer", "double", "date", "string"):
+            bounds = pc.min_max(column).as_py()
+            if bounds["min"] is not None:
+                stats["minValues"][name] = str(bounds["min"]) if delta_type(column.type) == "date" else bounds["min"]
+                stats["maxValues"][name] = str(bounds["max"]) if delta_type(column.type) == "date" else bounds["max"]
+    return stats
+
+
+class SharingServer:
+    """
+    Tables are added with add_table(name, files, partition_values); each
+    Arrow table in `files` is served as one Parquet file. `version` is the
+    version every table reports; bump it to simulate a new commit.
+    `failures` maps a file id to how many of its downloads answer 503 and
+    `expired` to how many answer 403 as for an expired presigned URL.
+    """
+
+    share = "share"
+    schema = "default"
+
+    def __init__(self):
+        self.version = 1
+        self.tables = {}
+        self.files = {}
+        self.requests = []
+        self.range_requests = []
+        self.failures = {}
+        self.expired = {}
+        self.honor_ranges = True
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.port = self._server.server_address[1]
+        self.endpoint = f"http://127.0.0.1:{self.port}/delta-sharing"
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def profile(self):
+        return json.dumps({"shareCredentialsVersion": 1, "endpoint": self.endpoint, "bearerToken": "token"})
+
+    def add_table(self, name, files, partition_values=None, row_group_size=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        partition_values = partition_values or [{} for _ in files]
+        partition_columns = sorted({column for values in partition_values for column in values})
+        fields = [{"name": field.name, "type": delta_type(field.type), "nullable": True, "metadata": {}}
+                  for field in files[0].schema]
+        fields += [{"name": column, "type": "string", "nullable": True, "metadata": {}}
+                   for column in partition_columns]
+        actions = []
+        for index, (arrow_table, values) in enumerate(zip(files, partition_values)):
+            file_id = f"{name}-{index}"
+            buffer = io.BytesIO()
+            pq.write_table(pa.table(arrow_table), buffer, row_group_size=row_group_size)
+            self.files[file_id] = buffer.getvalue()
+            actions.append({
+                "url": f"http://127.0.0.1:{self.port}/files/{file_id}?sig=1",
+                "id": file_id,
+                "partitionValues": values,
+                "size": len(self.files[file_id]),
+                "stats": json.dumps(file_stats(arrow_table))
+            })
+        self.tables[name] = {
+            "schema": {"type": "struct", "fields": fields},
+            "partition_columns": partition_columns,
+            "files": actions
+        }
+
+    def _metadata_lines(self, table):
+        return [
+            json.dumps({"protocol": {"minReaderVersion": 1}}),
+            json.dumps({"metaData": {
+                "id": "table-id",
+                "format": {"provider": "parquet"},
+                "schemaString": json.dumps(table["schema"]),
+                "partitionColumns": table["partition_columns"]
+            }})
+        ]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body=b"", headers=None):
+                self.send_response(code)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _table(self):
+                parts = self.path.split("?")[0].split("/")
+                return server.tables.get(parts[parts.index("tables") + 1])
+
+            def do_GET(self):
+                server.requests.append(("GET", self.path, None))
+                version = {"delta-table-version": str(server.version)}
+                if self.path.startswith("/files/"):
+                    file_id = self.path[len("/files/"):].split("?")[0]
+                    if server.failures.get(file_id):
+                        server.failures[file_id] -= 1
+                        return self._send(503)
+                    if server.expired.get(file_id):
+                        server.expired[file_id] -= 1
+                        return self._send(403, b"<Error><Message>Request has expired</Message></Error>")
+                    content = server.files[file_id]
+                    requested = self.headers.get("Range")
+                    if requested and server.honor_ranges:
+                        start, end = (int(value) for value in requested.split("=")[1].split("-"))
+                        end = min(end, len(content) - 1)
+                        server.range_requests.append((start, end + 1))
+                        return self._send(206, content[start:end + 1],
+                                          {"Content-Range": f"bytes {start}-{end}/{len(content)}"})
+                    return self._send(200, content)
+                table = self._table()
+                if table is None:
+                    return self._send(404)
+                if self.path.split("?")[0].endswith("/version"):
+                    return self._send(200, b"", version)
+                if self.path.split("?")[0].endswith("/metadata"):
+                    return self._send(200, ("\n".join(server._metadata_lines(table)) + "\n").encode(), version)
+                self._send(404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                server.requests.append(("POST", self.path, request))
+                table = self._table()
+                if table is None or not self.path.endswith("/query"):
+                    return self._send(404)
+                lines = server._metadata_lines(table) + [json.dumps({"file": action}) for action in table["files"]]
+                self._send(200, ("\n".join(lines) + "\n").encode(), {"delta-table-version": str(server.version)})
+
+        return Handler
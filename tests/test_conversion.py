@@ -0,0 +1,122 @@
+import threading
+from datetime import date
+from decimal import Decimal
+
+import pyarrow as pa
+
+from dbrx_migration.conversion import (
+    ConversionPipeline, arrow_to_rows, compact_table, delta_to_arrow_type, get_conversion_pool
+)
+from dbrx_migration.loaders import generate_create_table_sql
+
+from test_handler import make_orders
+
+
+def test_arrow_to_rows_binds_booleans_as_numbers_and_nulls_as_none():
+    table = pa.table({
+        "id": pa.array([1, 2], pa.int64()),
+        "flag": pa.array([True, None], pa.bool_()),
+        "day": pa.array([date(2024, 1, 2), None], pa.date32()),
+        "price": pa.array([Decimal("1.50"), Decimal("2.25")], pa.decimal128(10, 2)),
+    })
+
+    assert arrow_to_rows(table) == [
+        (1, 1, date(2024, 1, 2), Decimal("1.50")),
+        (2, None, None, Decimal("2.25")),
+    ]
+
+
+def test_delta_types_map_to_arrow_and_oracle():
+    assert delta_to_arrow_type("decimal(10,2)") == pa.decimal128(10, 2)
+    assert delta_to_arrow_type("timestamp") == pa.timestamp("us", tz="UTC")
+    assert delta_to_arrow_type({"type": "struct", "fields": []}) is None
+
+    fields = [
+        {"name": "id", "type": "long"},
+        {"name": "price", "type": "decimal(10, 2)"},
+        {"name": "active", "type": "boolean"},
+        {"name": "created", "type": "timestamp"},
+        {"name": "tags", "type": {"type": "array", "elementType": "string"}},
+    ]
+    assert generate_create_table_sql("T", fields) == (
+        "CREATE TABLE T (\n  id NUMBER,\n  price NUMBER(10,2),\n  active NUMBER(1),\n"
+        "  created DATE,\n  tags VARCHAR2(4000)\n)"
+    )
+
+
+def test_compact_table_keeps_low_cardinality_strings_encoded_and_downcasts_integers():
+    table = pa.table({
+        "region": pa.array(["EU", "US"] * 50).dictionary_encode(),
+        "name": pa.array([f"user-{i}" for i in range(100)]).dictionary_encode(),
+        "small": pa.array(range(100), pa.int64()),
+        "large": pa.array([0, 2 ** 40] * 50, pa.int64()),
+        "empty": pa.array([None] * 100, pa.int64()),
+    })
+
+    compacted, saved = compact_table(table)
+
+    assert compacted.schema.field("region").type == pa.dictionary(pa.int8(), pa.string())
+    assert compacted.schema.field("name").type == pa.string()
+    assert compacted.schema.field("small").type == pa.int8()
+    assert compacted.schema.field("large").type == pa.int64()
+    assert compacted.schema.field("empty").type == pa.int64()
+    assert saved > 0
+    assert arrow_to_rows(compacted) == arrow_to_rows(table)
+
+
+def make_tables():
+    regions = pa.array(["EU", "US", "EU"] * 2 + ["US"]).dictionary_encode()
+    first = pa.table({"id": list(range(7)), "region": regions})
+    second = pa.table({"id": list(range(7, 12)), "region": regions.slice(0, 5)})
+    return [(first, list(range(7))), (second, None)]
+
+
+def test_pipeline_yields_chunks_in_order_with_their_offsets():
+    inline = list(ConversionPipeline(3).iter(make_tables()))
+    pooled = ConversionPipeline(3, get_conversion_pool(2))
+
+    assert list(pooled.iter(make_tables())) == inline
+    assert [offsets for _, offsets in inline] == [[0, 1, 2], [3, 4, 5], [6], None, None]
+    assert [row for rows, _ in inline for row in rows] == (
+        arrow_to_rows(make_tables()[0][0]) + arrow_to_rows(make_tables()[1][0]))
+    assert pooled.summary()["chunks"] == 5
+
+
+def test_conversion_pool_is_shared_and_never_replaced():
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(get_conversion_pool(2))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(pool) for pool in pools}) == 1
+    other = get_conversion_pool(3)
+    assert other is not pools[0]
+    # The first pool keeps serving loads that hold it
+    assert list(ConversionPipeline(3, pools[0]).iter(make_tables()))[0][0] == [(0, "EU"), (1, "US"), (2, "EU")]
+
+
+def test_conversion_pool_does_not_fork_a_threaded_process():
+    done = threading.Event()
+    thread = threading.Thread(target=done.wait)
+    thread.start()
+    try:
+        pool = get_conversion_pool(4)
+    finally:
+        done.set()
+        thread.join()
+
+    assert pool._mp_context.get_start_method() != "fork"
+
+
+def test_pooled_load_commits_the_same_batches(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+
+    status, body = invoke("orders", convert_workers=2, batch_size=7)
+
+    assert status == 200
+    assert body["rows_migrated"] == 40
+    assert body["conversion"]["workers"] == 2
+    assert oracle.rows("SELECT COUNT(DISTINCT id), SUM(amount) FROM orders") == [(40, 1170.0)]
+    assert oracle.rows("SELECT rows_loaded FROM DBRX_MIGRATION_CONTROL") == [(40,)]
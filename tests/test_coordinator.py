@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from dbrx_migration.sharing import shard_files
+
+from test_handler import make_orders
+from test_retry import fail_once
+
+
+def test_shard_files_balances_by_size_and_keeps_listing_order():
+    files = [SimpleNamespace(id=f"f{i}", size=size) for i, size in enumerate([50, 10, 40, 30, 20])]
+
+    shards = shard_files(files, 2)
+
+    assert [[f.id for f in shard] for shard in shards] == [["f0", "f1", "f4"], ["f2", "f3"]]
+    assert shard_files(list(files), 2) == shards
+
+
+def test_coordinator_loads_through_local_workers(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(i * 20) for i in range(4)])
+
+    status, body = invoke("orders", mode="coordinator", invoker="local", shard_count=2)
+
+    assert status == 200
+    assert body["rows_migrated"] == 80
+    assert body["verified"] is True
+    assert [(shard["shard_index"], shard["status"], shard["rows_migrated"]) for shard in body["shards"]] == [
+        (0, "success", 40), (1, "success", 40)]
+    assert body["scan"]["files_scanned"] == 4
+    assert oracle.rows("SELECT COUNT(DISTINCT id) FROM orders") == [(80,)]
+    assert sorted(oracle.rows("SELECT status FROM DBRX_MIGRATION_CONTROL")) == [
+        ("SHARD",), ("SHARD",), ("SUCCESS",)]
+
+    status, body = invoke("orders", mode="coordinator", invoker="local", shard_count=2)
+    assert body["status"] == "unchanged"
+
+
+def test_coordinator_swaps_the_staging_table_the_workers_loaded(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(i * 20) for i in range(3)])
+    invoke("orders")
+
+    status, body = invoke("orders", mode="coordinator", invoker="local", shard_count=3,
+                          load_strategy="swap", force_reload=True)
+
+    assert body["verified"] is True
+    assert oracle.rows("SELECT COUNT(*) FROM orders") == [(60,)]
+    assert oracle.tables() == ["DBRX_MIGRATION_CONTROL", "DBRX_MIGRATION_PROGRESS", "DBRX_MIGRATION_REJECTS", "ORDERS"]
+
+
+def test_a_failed_shard_fails_the_run(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(i * 20) for i in range(2)])
+    oracle.fail = fail_once("INSERT INTO ORDERS_STG_")
+
+    status, body = invoke("orders", mode="coordinator", invoker="local", shard_count=2,
+                          load_strategy="swap", max_retries=0)
+
+    assert status == 500
+    assert "1 of 2 shards failed" in body["error"]
+    assert oracle.tables() == ["DBRX_MIGRATION_CONTROL", "DBRX_MIGRATION_PROGRESS", "DBRX_MIGRATION_REJECTS"]
+
+
+def test_invalid_coordinator_requests_are_rejected(invoke):
+    assert invoke("orders", mode="coordinator", load_mode="direct_path")[0] == 400
+    assert invoke("orders", shard_index=2, shard_count=2)[0] == 400
+    assert invoke("orders", mode="shard")[0] == 400
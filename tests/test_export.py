@@ -0,0 +1,87 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dbrx_migration.export import ParquetFileSink, export_to_parquet
+
+from fake_oracle import RecordingCursor
+from test_handler import make_orders
+
+
+class SplitConnection:
+    """
+    Answers the SCN and key range queries and records each split's fetch
+    """
+
+    def __init__(self, fetches):
+        self.fetches = fetches
+        self.cursors = []
+
+    def cursor(self):
+        self.cursors.append(RecordingCursor(results=[("CURRENT_SCN", [(4242,)]), ("NTILE", [(1,), (50,)])]))
+        return self.cursors[-1]
+
+    def fetch_df_batches(self, statement, parameters=None, size=100):
+        self.fetches.append((" ".join(statement.split()), parameters))
+        yield make_orders(rows=3)
+
+    def close(self):
+        pass
+
+
+def test_sink_rolls_over_to_a_new_file_at_the_file_size(tmp_path):
+    sink = ParquetFileSink(str(tmp_path), "part-000", file_bytes=1)
+    for start in (0, 10, 20):
+        sink.write(make_orders(start, 10))
+    sink.close()
+
+    assert [f["name"] for f in sink.files] == [f"part-000-{i:05d}.parquet" for i in range(3)]
+    assert pq.read_table(tmp_path / "part-000-00002.parquet").column("id").to_pylist()[0] == 20
+
+
+def test_key_splits_are_computed_and_read_as_of_one_scn(tmp_path):
+    fetches = []
+    connections = []
+
+    def connect():
+        connections.append(SplitConnection(fetches))
+        return connections[-1]
+
+    result = export_to_parquet(connect, str(tmp_path), table_name="ORDERS", where="region = 'EU'",
+                               parallel=2, split="key", split_column="id")
+
+    assert result["scn"] == 4242
+    assert result["splits"] == 2
+    assert result["rows_exported"] == 6
+    planning = connections[0].cursors[0].statements
+    assert planning[0] == "SELECT CURRENT_SCN FROM V$DATABASE"
+    assert "FROM ORDERS AS OF SCN :scn WHERE region = 'EU'" in planning[1]
+    assert sorted(fetches, key=lambda fetch: fetch[1]["lo"]) == [
+        ("SELECT * FROM ORDERS AS OF SCN :scn WHERE (region = 'EU') AND (id >= :lo AND id < :hi OR id IS NULL)",
+         {"lo": 1, "hi": 50, "scn": 4242}),
+        ("SELECT * FROM ORDERS AS OF SCN :scn WHERE (region = 'EU') AND id >= :lo", {"lo": 50, "scn": 4242}),
+    ]
+
+
+def test_export_mode_writes_the_table_to_parquet(sharing_server, oracle, invoke, tmp_path):
+    sharing_server.add_table("orders", [make_orders(rows=25)])
+    invoke("orders")
+
+    status, body = invoke("orders", mode="export", export_table="orders", columns=["id", "region"],
+                          export_where="id < 20", output_uri=str(tmp_path), fetch_rows=8)
+
+    assert status == 200
+    assert body["rows_exported"] == 20
+    assert body["scn"] is None
+    exported = pa.concat_tables(pq.read_table(tmp_path / f["name"]) for f in body["files"])
+    assert exported.column_names == ["id", "region"]
+    assert sorted(exported.column("id").to_pylist()) == list(range(20))
+
+
+def test_invalid_export_requests_are_rejected(invoke, tmp_path):
+    status, body = invoke("orders", mode="export", output_uri=str(tmp_path))
+    assert status == 400
+    assert "export_table or export_query" in body["error"]
+    assert invoke("orders", mode="export", output_uri=str(tmp_path), export_query="SELECT 1 FROM dual",
+                  export_split="rowid")[0] == 400
+    assert invoke("orders", mode="export", output_uri=str(tmp_path), export_table="orders",
+                  export_split="key")[0] == 400
@@ -0,0 +1,96 @@
+import json
+
+import pyarrow as pa
+
+
+def make_orders(start=0, rows=20):
+    return pa.table({
+        "id": list(range(start, start + rows)),
+        "amount": [float(i) * 1.5 for i in range(start, start + rows)],
+        "region": ["EU" if i % 2 else "US" for i in range(start, start + rows)],
+    })
+
+
+def test_missing_parameters_are_rejected(invoke):
+    status, body = invoke("orders", oracle_dsn=None)
+
+    assert status == 400
+    assert "oracle_dsn" in body["error"]
+
+
+def test_unchanged_source_is_skipped_until_version_changes(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+
+    status, body = invoke("orders")
+    assert status == 200
+    assert body["status"] == "success"
+    assert body["rows_migrated"] == 20
+    assert body["table_version"] == 1
+
+    status, body = invoke("orders")
+    assert body["status"] == "unchanged"
+    assert body["rows_in_last_load"] == 20
+
+    sharing_server.version = 2
+    status, body = invoke("orders")
+    assert body["status"] == "success"
+    assert body["table_version"] == 2
+
+    status, body = invoke("orders", force_reload=True)
+    assert body["status"] == "success"
+    assert oracle.rows("SELECT COUNT(*) FROM orders") == [(20,)]
+    assert oracle.rows(
+        "SELECT source_version, status FROM DBRX_MIGRATION_CONTROL ORDER BY load_completed"
+    ) == [(1, "SUCCESS"), (2, "SUCCESS"), (2, "SUCCESS")]
+
+
+def test_limited_load_is_partial_and_not_a_watermark(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+
+    status, body = invoke("orders", limit_rows=5)
+    assert body["status"] == "success"
+    assert oracle.rows("SELECT status FROM DBRX_MIGRATION_CONTROL") == [("PARTIAL",)]
+
+    status, body = invoke("orders")
+    assert body["status"] == "success"
+
+
+def test_projected_load_is_partial_and_not_a_watermark(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+
+    status, body = invoke("orders", columns=["id", "amount", "region"])
+    assert body["status"] == "success"
+    assert oracle.rows("SELECT status FROM DBRX_MIGRATION_CONTROL") == [("PARTIAL",)]
+
+    status, body = invoke("orders")
+    assert body["status"] == "success"
+    assert oracle.rows("SELECT status FROM DBRX_MIGRATION_CONTROL ORDER BY load_completed") == [
+        ("PARTIAL",), ("SUCCESS",)]
+
+
+def test_predicate_prunes_files_and_filters_rows(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20), make_orders(40)])
+    predicate = {"op": "lessThan", "children": [
+        {"op": "column", "name": "id", "valueType": "long"},
+        {"op": "literal", "value": "25", "valueType": "long"}]}
+
+    status, body = invoke("orders", predicate=predicate, columns=["id", "region"])
+
+    assert body["rows_migrated"] == 25
+    assert body["scan"]["files_scanned"] == 2
+    assert body["scan"]["files_skipped"] == 1
+    assert body["scan"]["column_bytes_skipped"] > 0
+    assert oracle.rows("SELECT MAX(id), COUNT(region) FROM orders") == [(24, 25)]
+    query = [request for method, path, request in sharing_server.requests if method == "POST"][-1]
+    assert json.loads(query["jsonPredicateHints"]) == predicate
+
+
+def test_limited_load_stops_downloading_at_the_limit(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(i * 20) for i in range(8)])
+
+    status, body = invoke("orders", limit_rows=30, download_threads=1, prefetch_files=1)
+
+    assert body["rows_migrated"] == 30
+    assert body["scan"]["files_scanned"] == 2
+    downloads = [path for method, path, _ in sharing_server.requests if path.startswith("/files/")]
+    assert len(downloads) <= 3
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+FUNCTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "function")
+DEFERRED_MODULES = ["pandas", "numpy", "pyarrow", "delta_sharing", "fsspec", "oracledb", "requests"]
+
+
+def test_func_import_defers_heavy_modules():
+    result = subprocess.run(
+        [sys.executable, "-c",
+         f"import sys, func; print([m for m in {DEFERRED_MODULES!r} if m in sys.modules])"],
+        cwd=FUNCTION_DIR, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_bearer_token_load_does_not_import_delta_sharing_or_pandas(sharing_server):
+    import base64
+    import json
+
+    import pyarrow as pa
+
+    sharing_server.add_table("t", [pa.table({"id": [1, 2, 3]})])
+    body = {
+        "delta_profile_base64": base64.b64encode(sharing_server.profile().encode()).decode(),
+        "share_name": sharing_server.share, "schema_name": sharing_server.schema, "table_name": "t",
+        "oracle_user": "ADMIN", "oracle_password": "password", "oracle_dsn": "atp_high",
+    }
+    code = "\n".join([
+        "import io, sys",
+        "import oracledb",
+        "from fake_oracle import FakeOracle",
+        "oracledb.connect = FakeOracle().connect",
+        "import func",
+        "class Context:",
+        "    def SetResponseHeaders(self, headers, status_code): pass",
+        "result = func.handler(Context(), io.BytesIO(sys.argv[1].encode()))",
+        "print(result.body())",
+        "print([m for m in ('delta_sharing', 'pandas', 'fsspec') if m in sys.modules])",
+    ])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([FUNCTION_DIR, os.path.dirname(os.path.abspath(__file__))]))
+    result = subprocess.run([sys.executable, "-c", code, json.dumps(body)],
+                            capture_output=True, text=True, env=env)
+
+    response, loaded = result.stdout.splitlines()[-2:]
+    assert json.loads(response)["status"] == "success", result.stderr
+    assert loaded == "[]"
@@ -0,0 +1,67 @@
+import time
+
+from test_handler import make_orders
+from test_retry import fail_once
+
+
+def wait_for_job(invoke, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        status, job = invoke("orders", action="status", job_id=job_id)
+        if job["status"] not in ("QUEUED", "RUNNING") or time.monotonic() > deadline:
+            return status, job
+        time.sleep(0.05)
+
+
+def test_submitted_job_runs_detached_and_reports_its_outcome(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+
+    status, body = invoke("orders", action="submit", invoker="local")
+
+    assert status == 202
+    assert body["status"] == "submitted"
+    assert body["run_id"] == body["job_id"]
+    status, job = wait_for_job(invoke, body["job_id"])
+    assert status == 200
+    assert job["status"] == "SUCCESS"
+    assert job["source"] == "share.default.orders"
+    assert job["result"]["rows_migrated"] == 40
+    assert [(row["run_id"], row["status"]) for row in job["progress"]] == [(body["job_id"], "SUCCESS")]
+    assert oracle.rows("SELECT COUNT(*) FROM orders") == [(40,)]
+
+
+def test_failed_job_run_is_recorded(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+    oracle.fail = fail_once("INSERT INTO orders")
+
+    status, body = invoke("orders", action="submit", invoker="local", max_retries=0)
+    status, job = wait_for_job(invoke, body["job_id"])
+
+    assert job["status"] == "FAILED"
+    assert job["result"]["status"] == "error"
+
+
+def test_job_that_cannot_start_is_recorded_failed(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+    oracle.fail = fail_once("SET status = 'RUNNING'")
+
+    status, body = invoke("orders", action="submit", invoker="local", max_retries=0)
+    status, job = wait_for_job(invoke, body["job_id"])
+
+    assert job["status"] == "FAILED"
+    assert "end-of-file on communication channel" in job["result"]["error"]
+    assert "ORDERS" not in oracle.tables()
+
+
+def test_status_of_an_unknown_job_is_not_found(oracle, invoke):
+    status, body = invoke("orders", action="status", job_id="missing")
+
+    assert status == 404
+    assert "missing" in body["error"]
+
+
+def test_status_requires_a_job_id(invoke):
+    status, body = invoke("orders", action="status")
+
+    assert status == 400
+    assert "job_id" in body["error"]
@@ -0,0 +1,96 @@
+import pyarrow as pa
+import pytest
+
+from dbrx_migration.loaders import (
+    defer_table_indexes, generate_create_table_sql, insert_hint, merge_staging_table, restore_table_indexes
+)
+from fake_oracle import RecordingCursor
+
+
+def make_orders(rows=20):
+    return pa.table({"id": list(range(rows)), "region": ["EU"] * rows})
+
+
+def test_insert_hint():
+    assert insert_hint("conventional") == ""
+    assert insert_hint("direct_path") == "/*+ APPEND_VALUES */ "
+    with pytest.raises(ValueError):
+        insert_hint("parallel")
+
+
+def test_created_tables_get_compression():
+    fields = [{"name": "id", "type": "long"}]
+
+    assert generate_create_table_sql("T", fields, "advanced") == (
+        "CREATE TABLE T (\n  id NUMBER\n) ROW STORE COMPRESS ADVANCED"
+    )
+
+
+def test_deferred_indexes_are_rebuilt_and_constraints_reenabled():
+    cursor = RecordingCursor(
+        results=[("user_constraints", [("ORDERS_PK",), ("ORDERS_FK_TARGET",)]),
+                 ("user_indexes", [("ORDERS_REGION_IX",)])],
+        fail="DISABLE CONSTRAINT ORDERS_FK_TARGET"
+    )
+
+    deferred = defer_table_indexes(cursor, "orders")
+    assert deferred == {"constraints": ["ORDERS_PK"], "indexes": ["ORDERS_REGION_IX"]}
+
+    cursor.statements = []
+    restore_table_indexes(cursor, "orders", deferred)
+    assert cursor.statements == [
+        "ALTER INDEX ORDERS_REGION_IX REBUILD",
+        "ALTER TABLE ORDERS ENABLE CONSTRAINT ORDERS_PK",
+    ]
+
+
+def test_direct_path_load_commits_each_append_batch(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(25)])
+
+    status, body = invoke("orders", load_mode="direct_path", compression="basic", batch_size=10)
+
+    assert body["status"] == "success"
+    assert body["rows_migrated"] == 25
+    inserts = [query for query in oracle.statements if query.startswith("INSERT /*+ APPEND_VALUES */ INTO orders")]
+    assert len(inserts) == 3
+    assert any(query.endswith(") COMPRESS") for query in oracle.statements if query.startswith("CREATE TABLE orders"))
+
+
+def test_invalid_load_mode_and_compression_are_rejected(invoke):
+    assert invoke("orders", load_mode="bulk")[0] == 400
+    status, body = invoke("orders", compression="high")
+    assert status == 400
+    assert "compression" in body["error"]
+
+
+def test_merge_counts_updates_from_the_matched_rows():
+    cursor = RecordingCursor(results=[("SELECT COUNT(*)", [(3,)])], rowcount=10)
+
+    counts = merge_staging_table(cursor, "ORDERS", "ORDERS_STG_1", ["id", "region", "amount"], ["id"], parallel=4)
+
+    assert counts == {"rows_inserted": 7, "rows_updated": 3}
+    assert cursor.statements[1] == "ALTER SESSION ENABLE PARALLEL DML"
+    assert cursor.statements[2] == (
+        "MERGE /*+ PARALLEL(t, 4) */ INTO ORDERS t USING ORDERS_STG_1 s ON (t.id = s.id)"
+        " WHEN MATCHED THEN UPDATE SET t.region = s.region, t.amount = s.amount"
+        " WHEN NOT MATCHED THEN INSERT (id, region, amount) VALUES (s.id, s.region, s.amount)"
+    )
+
+
+def test_merge_on_key_only_columns_only_inserts():
+    cursor = RecordingCursor(results=[("SELECT COUNT(*)", [(3,)])], rowcount=4)
+
+    counts = merge_staging_table(cursor, "ORDERS", "ORDERS_STG_1", ["id", "day"], ["id", "day"])
+
+    assert counts == {"rows_inserted": 4, "rows_updated": 0}
+    assert "WHEN MATCHED" not in cursor.statements[-1]
+    assert "ON (t.id = s.id AND t.day = s.day)" in cursor.statements[-1]
+
+
+def test_merge_requires_keys_among_the_loaded_columns(sharing_server, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+
+    assert invoke("orders", load_strategy="merge")[0] == 400
+    status, body = invoke("orders", load_strategy="merge", merge_keys=["order_id"])
+    assert status == 400
+    assert "order_id" in body["error"]
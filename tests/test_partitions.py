@@ -0,0 +1,111 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+
+from dbrx_migration.loaders import PartitionSpec
+
+DATE_FIELDS = [{"name": "id", "type": "long"}, {"name": "day", "type": "date"}]
+NUMBER_FIELDS = [{"name": "id", "type": "long"}]
+
+
+def make_events(rows=30):
+    start = datetime.date(2024, 1, 30)
+    return pa.table({
+        "id": list(range(rows)),
+        "day": [start + datetime.timedelta(days=i) for i in range(rows)],
+    })
+
+
+@pytest.mark.parametrize("interval, expected", [
+    ("day", "PARTITION FOR (DATE '2024-01-30')"),
+    ("month", "PARTITION FOR (DATE '2024-01-01')"),
+    ("year", "PARTITION FOR (DATE '2024-01-01')"),
+])
+def test_interval_keys_name_the_partition_of_the_row(interval, expected):
+    spec = PartitionSpec("day", DATE_FIELDS, interval=interval)
+
+    keys = spec.keys(make_events(3)).to_pylist()
+
+    assert spec.partition_for(keys[0]) == expected
+    assert "INTERVAL" in spec.ddl() and "DATE '1970-01-01'" in spec.ddl()
+
+
+def test_month_keys_change_at_month_boundaries():
+    spec = PartitionSpec("day", DATE_FIELDS, interval="month")
+
+    keys = spec.keys(make_events(3)).to_pylist()
+
+    assert keys[0] == keys[1] != keys[2]
+    assert spec.partition_for(keys[2]) == "PARTITION FOR (DATE '2024-02-01')"
+
+
+def test_numeric_interval_keys_are_multiples_of_the_width():
+    spec = PartitionSpec("id", NUMBER_FIELDS, interval=10)
+
+    keys = spec.keys(make_events(25)).to_pylist()
+
+    assert sorted(set(keys)) == [0, 1, 2]
+    assert spec.partition_for(2) == "PARTITION FOR (20)"
+
+
+def test_bounds_keys_and_nulls_fall_into_range_partitions():
+    spec = PartitionSpec("id", NUMBER_FIELDS, bounds=[10, 20])
+    table = pa.table({"id": [5, 15, 25, None]})
+
+    assert spec.keys(table).to_pylist() == [0, 1, 2, 2]
+    assert spec.partition_for(0) == "PARTITION FOR (9)"
+    assert spec.partition_for(2) == "PARTITION FOR (20)"
+    assert spec.ddl().endswith("PARTITION PMAX VALUES LESS THAN (MAXVALUE))")
+
+
+def test_null_interval_keys_have_no_partition():
+    spec = PartitionSpec("day", DATE_FIELDS, interval="day")
+
+    keys = spec.keys(pa.table({"day": pa.array([None], pa.date32())})).to_pylist()
+
+    assert keys == [None]
+    assert spec.partition_for(None) is None
+
+
+@pytest.mark.parametrize("params", [
+    {"partition_column": "day"},
+    {"partition_column": "day", "partition_interval": "day", "partition_bounds": ["2024-01-01"]},
+    {"partition_column": "day", "partition_interval": "week"},
+    {"partition_column": "missing", "partition_interval": "day"},
+    {"partition_column": "id", "partition_bounds": [20, 10]},
+    {"partition_column": "day", "partition_interval": "day", "partition_parallel": 0},
+    {"partition_column": "day", "partition_interval": "day", "partition_sort": "missing"},
+    {"partition_reload": "truncate"},
+    {"partition_column": "day", "partition_interval": "day", "partition_reload": "exchange",
+     "load_strategy": "swap"},
+])
+def test_invalid_partitioning_is_rejected(sharing_server, oracle, invoke, params):
+    sharing_server.add_table("events", [make_events()])
+
+    status, body = invoke("events", **params)
+
+    assert status == 400
+    assert "partition" in body["error"]
+    assert "EVENTS" not in oracle.tables()
+
+
+def test_partitioned_load_inserts_through_pooled_connections(sharing_server, oracle, invoke):
+    sharing_server.add_table("events", [make_events(), make_events()])
+
+    status, body = invoke("events", partition_column="day", partition_interval="month",
+                          partition_parallel=2, partition_sort="id", batch_size=7)
+
+    assert status == 200
+    assert body["rows_migrated"] == 60
+    assert body["partitions"]["partitions_loaded"] == 2
+    assert oracle.rows("SELECT COUNT(*), COUNT(DISTINCT id) FROM events") == [(60, 30)]
+    create = next(s for s in oracle.statements if s.startswith("CREATE TABLE events"))
+    assert "PARTITION BY RANGE (day) INTERVAL (NUMTOYMINTERVAL(1, 'MONTH'))" in create
+    inserts = {s.split(" (id", 1)[0] for s in oracle.statements if s.startswith("INSERT INTO events")}
+    assert inserts == {
+        "INSERT INTO events PARTITION FOR (DATE '2024-01-01')",
+        "INSERT INTO events PARTITION FOR (DATE '2024-02-01')",
+    }
+    pool, = oracle.pools
+    assert pool.size == 2 and pool.closed
@@ -0,0 +1,103 @@
+import pytest
+
+from dbrx_migration import retry as retry_module
+from dbrx_migration.loaders import PipelinedInserter
+
+from test_handler import make_orders
+from test_retry import fail_once
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry_module.time, "sleep", lambda seconds: None)
+
+
+def test_batches_are_sent_depth_at_a_time(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+
+    status, body = invoke("orders", load_mode="pipelined", pipeline_depth=2, batch_size=7)
+
+    assert status == 200
+    assert body["rows_migrated"] == 40
+    # Batches of 7 from each file of 20 rows: 7, 7, 6 twice
+    assert body["pipeline"] == {"pipelines": 3, "batches": 6, "fallbacks": 0, "depth": 2}
+    assert oracle.pipelines == 3
+    assert oracle.rows("SELECT COUNT(*), COUNT(DISTINCT id) FROM orders") == [(40, 40)]
+    assert oracle.rows("SELECT rows_loaded, status FROM DBRX_MIGRATION_CONTROL") == [(40, "SUCCESS")]
+
+
+def test_rejected_batch_is_inserted_again_with_batch_errors(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0, rows=10)])
+    oracle.reject = lambda row: row[0] == 5
+
+    status, body = invoke("orders", load_mode="pipelined", pipeline_depth=4, batch_size=2, reject_limit=None)
+
+    assert status == 200
+    assert body["rows_migrated"] == 9
+    assert body["rejects"]["count"] == 1
+    assert body["pipeline"]["fallbacks"] == 1
+    assert oracle.rows("SELECT id FROM orders ORDER BY id") == [(i,) for i in range(10) if i != 5]
+    assert oracle.rows("SELECT source_offset FROM DBRX_MIGRATION_REJECTS") == [(5,)]
+
+
+def test_lost_pipeline_is_sent_again_after_reconnecting(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0, rows=10)])
+    oracle.fail = fail_once("INSERT INTO orders")
+
+    status, body = invoke("orders", load_mode="pipelined", pipeline_depth=2, batch_size=3)
+
+    assert status == 200
+    assert body["rows_migrated"] == 10
+    assert body["retries"]["reconnects"] >= 1
+    assert oracle.rows("SELECT COUNT(*), COUNT(DISTINCT id) FROM orders") == [(10, 10)]
+
+
+def test_committed_batches_are_not_sent_twice(oracle):
+    oracle.rows("CREATE TABLE t (id INTEGER)")
+    oracle.rows("CREATE TABLE checkpoint (rows_loaded INTEGER)")
+    oracle.rows("INSERT INTO checkpoint VALUES (0)")
+    inserts = []
+
+    def fail_second_insert(query):
+        if query.startswith("INSERT INTO t"):
+            inserts.append(query)
+            return len(inserts) == 2
+        return False
+
+    oracle.fail = fail_second_insert
+    inserter = PipelinedInserter(
+        oracle.connect_async, "INSERT INTO t (id) VALUES (:1)", depth=2,
+        checkpoint=lambda batch_end: ("UPDATE checkpoint SET rows_loaded = :1", [batch_end]),
+        committed=lambda: oracle.rows("SELECT rows_loaded FROM checkpoint")[0][0],
+        retry=retry_module.RetryPolicy(retries=1)
+    )
+
+    done = inserter.run([([(1,), (2,)], 0), ([(3,), (4,)], 2)])
+    inserter.close()
+
+    assert done == 2
+    assert inserter.stats == {"pipelines": 1, "batches": 2, "fallbacks": 0}
+    assert oracle.pipelines == 2
+    assert oracle.rows("SELECT id FROM t ORDER BY id") == [(1,), (2,), (3,), (4,)]
+
+
+def test_errors_are_raised_without_a_committed_reader(oracle):
+    oracle.rows("CREATE TABLE t (id INTEGER)")
+    oracle.fail = fail_once("INSERT INTO t")
+    inserter = PipelinedInserter(oracle.connect_async, "INSERT INTO t (id) VALUES (:1)")
+
+    with pytest.raises(Exception, match="end-of-file"):
+        inserter.run([([(1,)], 0)])
+    inserter.close()
+
+
+@pytest.mark.parametrize("params", [
+    {"load_mode": "pipelined", "partition_column": "id", "partition_interval": 10},
+    {"load_mode": "pipelined", "targets": [{"name": "a"}]},
+    {"load_mode": "pipelined", "pipeline_depth": 0},
+])
+def test_invalid_pipelining_is_rejected(invoke, params):
+    status, body = invoke("orders", **params)
+
+    assert status == 400
+    assert "pipeline" in body["error"]
@@ -0,0 +1,88 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from dbrx_migration.control import ensure_control_table, get_load_history
+from dbrx_migration.planning import DEFAULT_PLAN_ROWS_PER_SECOND, plan_load
+from dbrx_migration.sharing import SharedFile
+
+from test_handler import make_orders
+
+FIELDS = [{"name": "id", "type": "long"}, {"name": "region", "type": "string"}]
+
+
+def make_scan(rows_per_file, size=1000, limit=None):
+    files = [SharedFile(f"url{i}", f"f{i}", {}, size, json.dumps({"numRecords": rows}) if rows is not None else None)
+             for i, rows in enumerate(rows_per_file)]
+    return SimpleNamespace(files=files, limit=limit, sample=None, stats={"files_skipped": 0},
+                           output_fields=lambda: FIELDS)
+
+
+def test_rows_come_from_statistics_and_runtime_from_history():
+    plan = plan_load(make_scan([1000, 3000]), {"rows_per_second": 100.0, "runs": 3, "scope": "source"})
+
+    assert plan["estimated_rows"] == 4000
+    assert plan["projected_seconds"] == 40.0
+    assert plan["recommended"] == {"mode": "load", "shard_count": 1, "batch_size": 4000,
+                                   "download_threads": 2, "prefetch_files": 2, "convert_workers": 1}
+    assert plan["warnings"] == []
+
+
+def test_files_without_statistics_are_estimated_by_size():
+    plan = plan_load(make_scan([1000, None, None]), {"rows_per_second": 100.0, "runs": 1, "scope": "source"})
+
+    assert plan["estimated_rows"] == 3000
+    assert "2 files have no numRecords statistics" in plan["warnings"][0]
+
+
+def test_long_loads_are_sharded_to_fit_the_timeout():
+    plan = plan_load(make_scan([100000] * 8), {"rows_per_second": 1000.0, "runs": 1, "scope": "source"},
+                     timeout_seconds=300)
+
+    # 800s of loading in 240s per invocation
+    assert plan["recommended"]["mode"] == "coordinator"
+    assert plan["recommended"]["shard_count"] == 4
+    assert plan["projected_seconds_per_shard"] == 200.0
+
+
+def test_limit_caps_the_rows_and_a_default_rate_is_assumed():
+    plan = plan_load(make_scan([1000, 1000], limit=500))
+
+    assert plan["estimated_rows"] == 500
+    assert plan["throughput"]["rows_per_second"] == DEFAULT_PLAN_ROWS_PER_SECOND
+    assert any("No recorded runs" in warning for warning in plan["warnings"])
+
+
+def test_history_leaves_out_coordinator_runs(oracle):
+    cursor = oracle.connect().cursor()
+    ensure_control_table(cursor, "CONTROL")
+    start = datetime(2024, 1, 1)
+
+    def run(source, status, rows, started, seconds):
+        oracle.rows("INSERT INTO CONTROL VALUES (?, 'T', 1, ?, ?, ?, ?)",
+                    (source, rows, start + timedelta(seconds=started),
+                     start + timedelta(seconds=started + seconds), status))
+
+    # A coordinator run of two shards; its rate would count them twice
+    run("s.d.orders", "SUCCESS", 2000, 0, 10)
+    run("s.d.orders", "SHARD", 1000, 1, 8)
+    run("s.d.orders", "SHARD", 1000, 1, 8)
+    run("s.d.other", "SUCCESS", 500, 100, 50)
+
+    assert get_load_history(cursor, "CONTROL", "s.d.orders") == {
+        "rows_per_second": 125.0, "runs": 2, "scope": "source"}
+    assert get_load_history(cursor, "CONTROL", "s.d.new")["scope"] == "all"
+    assert get_load_history(cursor, "MISSING", "s.d.orders") is None
+
+
+def test_dry_run_plans_without_downloading_or_writing(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+
+    status, body = invoke("orders", mode="dry_run", oracle_user=None, oracle_password=None, oracle_dsn=None)
+
+    assert status == 200
+    assert body["status"] == "planned"
+    assert body["estimated_rows"] == 40
+    assert [field["name"] for field in body["schema"]] == ["id", "amount", "region"]
+    assert not [path for method, path, _ in sharing_server.requests if path.startswith("/files/")]
+    assert oracle.tables() == []
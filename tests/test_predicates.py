@@ -0,0 +1,84 @@
+import json
+from types import SimpleNamespace
+
+import pyarrow as pa
+
+from dbrx_migration.predicates import file_may_match, predicate_mask
+
+
+def column(name, value_type="long"):
+    return {"op": "column", "name": name, "valueType": value_type}
+
+
+def literal(value, value_type="long"):
+    return {"op": "literal", "value": str(value), "valueType": value_type}
+
+
+def compare(op, name, value, value_type="long"):
+    return {"op": op, "children": [column(name, value_type), literal(value, value_type)]}
+
+
+def add_file(partition_values=None, min_values=None, max_values=None, null_count=None):
+    stats = {"minValues": min_values or {}, "maxValues": max_values or {}, "nullCount": null_count or {}}
+    return SimpleNamespace(partition_values=partition_values or {}, stats=json.dumps(stats), size=100)
+
+
+TABLE = pa.table({"id": [1, 2, 3, 4, 5], "name": ["a", None, "c", "d", "e"]})
+# "region" is a partition column, absent from the file, so it cannot be evaluated
+UNEVALUABLE = compare("equal", "region", "EU", "string")
+
+
+def selected(predicate):
+    mask = predicate_mask(TABLE, predicate)
+    return None if mask is None else TABLE.filter(mask).column("id").to_pylist()
+
+
+def test_comparisons_and_reversed_operands():
+    assert selected(compare("lessThan", "id", 3)) == [1, 2]
+    assert selected(compare("greaterThanOrEqual", "id", 4)) == [4, 5]
+    reversed_literal = {"op": "lessThan", "children": [literal(3), column("id")]}
+    assert selected(reversed_literal) == [4, 5]
+    assert selected({"op": "isNull", "children": [column("name", "string")]}) == [2]
+
+
+def test_and_keeps_a_superset_when_a_child_cannot_be_evaluated():
+    predicate = {"op": "and", "children": [compare("lessThan", "id", 3), UNEVALUABLE]}
+
+    assert selected(predicate) == [1, 2]
+
+
+def test_or_with_an_unevaluable_child_is_not_evaluated():
+    predicate = {"op": "or", "children": [compare("lessThan", "id", 3), UNEVALUABLE]}
+
+    assert selected(predicate) is None
+
+
+def test_not_only_inverts_exact_masks():
+    exact = {"op": "not", "children": [{"op": "and", "children": [
+        compare("greaterThan", "id", 1), compare("lessThan", "id", 4)]}]}
+    assert selected(exact) == [1, 4, 5]
+
+    # Inverting the superset [1, 2] would wrongly drop rows 1 and 2
+    partial = {"op": "not", "children": [{"op": "and", "children": [
+        compare("lessThan", "id", 3), UNEVALUABLE]}]}
+    assert selected(partial) is None
+
+    nested = {"op": "and", "children": [compare("greaterThan", "id", 1), partial]}
+    assert selected(nested) == [2, 3, 4, 5]
+
+    double = {"op": "not", "children": [{"op": "not", "children": [compare("lessThan", "id", 3)]}]}
+    assert selected(double) == [1, 2]
+
+
+def test_file_pruning_on_statistics_and_partition_values():
+    stats_file = add_file(min_values={"id": 10}, max_values={"id": 20})
+    assert not file_may_match(stats_file, compare("lessThan", "id", 10))
+    assert file_may_match(stats_file, compare("lessThanOrEqual", "id", 10))
+    assert not file_may_match(stats_file, compare("equal", "id", 25))
+    assert file_may_match(add_file(), compare("equal", "id", 25))
+
+    eu_file = add_file(partition_values={"region": "EU"})
+    assert file_may_match(eu_file, UNEVALUABLE)
+    assert not file_may_match(add_file(partition_values={"region": "US"}), UNEVALUABLE)
+    assert not file_may_match(eu_file, {"op": "and", "children": [
+        UNEVALUABLE, compare("equal", "region", "US", "string")]})
@@ -0,0 +1,120 @@
+import datetime
+import decimal
+
+import pyarrow as pa
+
+from dbrx_migration.preflight import PreflightValidator, column_defs_from_fields, preflight_check
+
+from test_handler import make_orders
+
+
+def column_def(data_type, byte_length=None, char_length=None, precision=None, scale=0, nullable=True):
+    return {"data_type": data_type, "byte_length": byte_length, "char_length": char_length,
+            "precision": precision, "scale": scale, "nullable": nullable}
+
+
+def codes(validator, arrow_table):
+    return {(column, code): mask.to_pylist() for column, code, _, mask in validator.violations(arrow_table)}
+
+
+def test_violations_carry_the_ora_code_of_the_rejected_rows():
+    validator = PreflightValidator({
+        "NAME": column_def("VARCHAR2", byte_length=3, nullable=False),
+        "LABEL": column_def("VARCHAR2", char_length=2),
+        "AMOUNT": column_def("NUMBER", precision=4, scale=2),
+        "DAY": column_def("DATE"),
+    })
+    arrow_table = pa.table({
+        "name": ["abc", "abcd", None],
+        "label": ["éé", "ééé", "x"],
+        "amount": [decimal.Decimal("99.999"), decimal.Decimal("100.00"), None],
+        "day": ["2024-01-31", "31/01/2024", None],
+    })
+
+    assert codes(validator, arrow_table) == {
+        ("name", 1400): [False, False, True],
+        ("name", 12899): [False, True, False],
+        ("label", 12899): [False, True, False],
+        ("amount", 1438): [False, True, False],
+        ("day", 1861): [False, True, False],
+    }
+
+
+def test_split_keeps_source_offsets_of_valid_rows():
+    validator = PreflightValidator({"REGION": column_def("VARCHAR2", byte_length=2)})
+    arrow_table = pa.table({"id": [1, 2, 3], "region": ["EU", "EUROPE", "US"]})
+
+    valid, offsets, invalid = validator.split(arrow_table, 10)
+
+    assert valid.column("id").to_pylist() == [1, 3]
+    assert list(offsets) == [10, 12]
+    assert [(offset, code, row) for offset, code, _, row in invalid] == [(11, 12899, (2, "EUROPE"))]
+
+
+def test_dates_outside_the_oracle_year_range():
+    validator = PreflightValidator({"DAY": column_def("DATE")})
+    arrow_table = pa.table({"day": [datetime.date(2024, 1, 1), datetime.date(1, 1, 1)]})
+
+    assert codes(validator, arrow_table) == {}
+    assert codes(validator, pa.table({"day": pa.array([0, -62200000000], pa.timestamp("s"))})) == {
+        ("day", 1841): [False, True]}
+
+
+def test_check_of_a_new_table_uses_the_ddl_the_load_would_create():
+    fields = [{"name": "id", "type": "long"}, {"name": "amount", "type": "decimal(3,1)"},
+              {"name": "region", "type": "string"}]
+    validator = PreflightValidator(column_defs_from_fields(fields))
+    arrow_table = pa.table({
+        "id": [1, 2],
+        "amount": pa.array([decimal.Decimal("12.5"), decimal.Decimal("123.4")], pa.decimal128(4, 1)),
+        "region": ["EU", "x" * 4001],
+    })
+
+    report = preflight_check([arrow_table], validator)
+
+    assert report["rows_checked"] == 2
+    assert report["rows_invalid"] == 1
+    assert report["violations"] == {"amount": {"ORA-01438": 1}, "region": {"ORA-12899": 1}}
+    assert report["sample"][0]["offset"] == 1
+
+
+def define_orders(oracle, region_bytes):
+    oracle.rows("CREATE TABLE orders (id NUMBER, amount NUMBER, region VARCHAR(4000))")
+    for name, data_type, length in [("ID", "NUMBER", 22), ("AMOUNT", "NUMBER", 22),
+                                    ("REGION", "VARCHAR2", region_bytes)]:
+        oracle.rows("INSERT INTO user_tab_columns VALUES ('ORDERS', ?, ?, ?, ?, 'B', NULL, NULL, 'Y')",
+                    (name, data_type, length, length))
+
+
+def long_regions(rows=10):
+    return make_orders(rows=rows).set_column(
+        2, "region", pa.array(["EUROPE" if i % 3 == 0 else "US" for i in range(rows)]))
+
+
+def test_preflight_check_writes_nothing(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [long_regions()])
+    define_orders(oracle, 2)
+
+    status, body = invoke("orders", preflight="check")
+
+    assert body["status"] == "invalid"
+    assert body["rows_invalid"] == 4
+    assert body["violations"] == {"region": {"ORA-12899": 4}}
+    assert oracle.rows("SELECT COUNT(*) FROM orders") == [(0,)]
+
+
+def test_preflight_reject_quarantines_rows_before_insert(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [long_regions()])
+    define_orders(oracle, 2)
+
+    status, body = invoke("orders", preflight="reject", reject_limit=None, batch_size=3)
+
+    assert body["rows_migrated"] == 6
+    assert body["rejects"]["count"] == 4
+    assert oracle.rows("SELECT source_offset, error_message FROM DBRX_MIGRATION_REJECTS ORDER BY 1")[0] == (
+        0, "Pre-flight: ORA-12899: value too large for column REGION VARCHAR2(2 BYTE)")
+    assert sorted(row[0] for row in oracle.rows("SELECT id FROM orders")) == [1, 2, 4, 5, 7, 8]
+
+
+def test_invalid_preflight_is_rejected(invoke):
+    assert invoke("orders", preflight="strict")[0] == 400
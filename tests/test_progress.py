@@ -0,0 +1,83 @@
+import pytest
+
+from dbrx_migration.control import ProgressReporter
+
+from test_handler import make_orders
+from test_retry import fail_once
+
+PROGRESS_COLUMNS = "run_id, status, rows_committed, rows_total, files_done, files_total, eta_seconds"
+
+
+def counters(rows=0, files=0, bytes_done=0):
+    return lambda: {"rows_committed": rows, "files_done": files, "bytes_done": bytes_done,
+                    "current_file": None}
+
+
+def test_load_publishes_its_final_progress(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+
+    status, body = invoke("orders", run_id="nightly")
+
+    assert status == 200
+    assert body["run_id"] == "nightly"
+    assert oracle.rows(f"SELECT {PROGRESS_COLUMNS} FROM DBRX_MIGRATION_PROGRESS") == [
+        ("nightly", "SUCCESS", 40, 40, 2, 2, 0)]
+
+
+def test_failed_load_publishes_failed_and_returns_the_run_id(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+    oracle.fail = fail_once("INSERT INTO orders")
+
+    status, body = invoke("orders", max_retries=0)
+
+    assert status == 500
+    assert oracle.rows("SELECT run_id, status FROM DBRX_MIGRATION_PROGRESS") == [(body["run_id"], "FAILED")]
+
+
+def test_workers_report_under_the_coordinators_run_id(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(i * 20) for i in range(2)])
+
+    status, body = invoke("orders", mode="coordinator", invoker="local", shard_count=2, run_id="r1")
+
+    assert status == 200
+    assert oracle.rows("SELECT run_id, status FROM DBRX_MIGRATION_PROGRESS ORDER BY run_id") == [
+        ("r1", "SUCCESS"), ("r1:0", "SHARD"), ("r1:1", "SHARD")]
+
+
+def test_zero_interval_disables_progress(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+
+    status, body = invoke("orders", progress_interval=0)
+
+    assert status == 200
+    assert "DBRX_MIGRATION_PROGRESS" not in oracle.tables()
+
+
+def test_invalid_interval_is_rejected(invoke):
+    status, body = invoke("orders", progress_interval=-1)
+
+    assert status == 400
+    assert "progress_interval" in body["error"]
+
+
+def test_eta_uses_row_statistics_then_bytes():
+    by_rows = ProgressReporter(None, "P", "r", "s", "t", counters(rows=50), rows_total=100)
+    by_bytes = ProgressReporter(None, "P", "r", "s", "t", counters(bytes_done=25), bytes_total=100)
+    # Both have been running for 10 seconds
+    by_rows._started -= 10
+    by_bytes._started -= 10
+
+    assert by_rows.snapshot("RUNNING")["eta_seconds"] == pytest.approx(10, abs=0.5)
+    assert by_bytes.snapshot("RUNNING")["eta_seconds"] == pytest.approx(30, abs=0.5)
+    assert by_rows.snapshot("SUCCESS")["eta_seconds"] == 0
+    assert by_rows.snapshot("FAILED")["eta_seconds"] is None
+
+
+def test_failed_progress_writes_do_not_fail_the_load():
+    def connect():
+        raise ConnectionError("listener down")
+
+    reporter = ProgressReporter(connect, "P", "r", "s", "t", counters(), interval=60).start()
+    reporter.finish("SUCCESS")
+
+    assert reporter.writes == 0
@@ -0,0 +1,47 @@
+import json
+
+from dbrx_migration.control import DEFAULT_REJECT_TABLE
+
+from test_handler import make_orders
+
+
+def long_region(row):
+    return row[2] == "EU"
+
+
+def test_rejected_rows_are_quarantined(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(rows=10)])
+    oracle.reject = long_region
+
+    status, body = invoke("orders", reject_limit=None)
+
+    assert status == 200
+    assert body["rows_migrated"] == 5
+    assert body["rejects"]["count"] == 5
+    assert body["rejects"]["sample"][0] == {
+        "offset": 1, "code": 12899, "message": "ORA-12899: value too large for column"}
+    quarantined = oracle.rows(
+        f"SELECT source_name, target_table, source_offset, error_code, row_data FROM {DEFAULT_REJECT_TABLE}"
+        " ORDER BY source_offset")
+    assert [row[2] for row in quarantined] == [1, 3, 5, 7, 9]
+    assert quarantined[0][:2] == ("share.default.orders", "orders")
+    assert json.loads(quarantined[0][4]) == [1, 1.5, "EU"]
+    assert oracle.rows("SELECT COUNT(*) FROM orders WHERE region = 'EU'") == [(0,)]
+
+
+def test_reject_limit_fails_the_load(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(rows=10)])
+    oracle.reject = long_region
+
+    status, body = invoke("orders", reject_limit=2)
+
+    assert status == 500
+    assert body["rejects"]["count"] > 2
+    assert oracle.rows("SELECT status FROM DBRX_MIGRATION_CONTROL") == [("FAILED",)]
+
+
+def test_invalid_reject_limit_is_rejected(invoke):
+    status, body = invoke("orders", reject_limit=-1)
+
+    assert status == 400
+    assert "reject_limit" in body["error"]
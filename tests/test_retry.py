@@ -0,0 +1,107 @@
+import pytest
+import requests
+
+from dbrx_migration import retry as retry_module
+from dbrx_migration.retry import RetryPolicy, is_transient_error
+
+from fake_oracle import database_error
+from test_handler import make_orders
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry_module.time, "sleep", lambda seconds: None)
+
+
+def http_error(status_code, text=""):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = text.encode()
+    return requests.HTTPError(response=resp)
+
+
+def test_transient_errors():
+    assert is_transient_error(http_error(503))
+    assert is_transient_error(http_error(403, "Request has expired"))
+    assert not is_transient_error(http_error(403, "Access denied"))
+    assert is_transient_error(requests.ConnectionError())
+    assert is_transient_error(database_error(3113, "end-of-file on communication channel"))
+    assert not is_transient_error(database_error(942, "table or view does not exist"))
+    assert not is_transient_error(ValueError("bad value"))
+
+
+def test_retry_policy_backs_off_until_the_call_succeeds():
+    policy = RetryPolicy(retries=3, backoff_factor=1.0, max_backoff=3)
+    outcomes = [ConnectionError(), ConnectionError(), "done"]
+
+    def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert policy.call(call) == "done"
+    assert policy.summary() == {"retries": 2, "backoff_seconds": 3.0, "reconnects": 0, "url_refreshes": 0}
+
+    with pytest.raises(ConnectionError):
+        RetryPolicy(retries=1).call(lambda: (_ for _ in ()).throw(ConnectionError()))
+
+
+def test_expired_url_is_refreshed_and_the_scan_resumes(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+    sharing_server.expired["orders-1"] = 1
+
+    status, body = invoke("orders")
+
+    assert body["status"] == "success"
+    assert body["rows_migrated"] == 40
+    assert body["retries"]["url_refreshes"] == 1
+    assert len([request for method, path, request in sharing_server.requests if method == "POST"]) == 2
+
+
+def fail_once(fragment):
+    calls = []
+
+    def fail(query):
+        if fragment in query and not calls:
+            calls.append(query)
+            return True
+        return False
+
+    return fail
+
+
+def test_lost_batch_is_written_again_after_reconnecting(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(rows=10)])
+    oracle.fail = fail_once("INSERT INTO orders")
+
+    status, body = invoke("orders", batch_size=4)
+
+    assert body["rows_migrated"] == 10
+    assert body["retries"]["reconnects"] == 1
+    assert oracle.rows("SELECT COUNT(*), COUNT(DISTINCT id) FROM orders") == [(10, 10)]
+
+
+def test_batch_committed_before_the_connection_dropped_is_not_written_twice(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(rows=10)])
+    failed = []
+
+    def fail(query):
+        # The commit of the first batch, which has gone through
+        if query == "COMMIT" and not failed and oracle.statements[-1].startswith("UPDATE DBRX_MIGRATION_CONTROL"):
+            failed.append(query)
+            return True
+        return False
+
+    oracle.fail = fail
+
+    status, body = invoke("orders", batch_size=4)
+
+    assert body["rows_migrated"] == 10
+    assert body["retries"]["reconnects"] == 1
+    assert oracle.rows("SELECT COUNT(*), COUNT(DISTINCT id) FROM orders") == [(10, 10)]
+    assert oracle.rows("SELECT status, rows_loaded FROM DBRX_MIGRATION_CONTROL") == [("SUCCESS", 10)]
+
+
+def test_invalid_max_retries_is_rejected(invoke):
+    assert invoke("orders", max_retries="many")[0] == 400
@@ -0,0 +1,92 @@
+import pytest
+
+from test_handler import make_orders
+
+
+def loaded_ids(oracle):
+    return [row[0] for row in oracle.rows("SELECT id FROM orders ORDER BY id")]
+
+
+def test_same_seed_loads_the_same_rows(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(i * 20) for i in range(16)], row_group_size=5)
+
+    status, body = invoke("orders", sample_fraction=0.25, sample_seed=7)
+    first = loaded_ids(oracle)
+
+    assert status == 200
+    # 8 of 16 files (the minimum), all 4 row groups of each, half of their rows
+    assert {key: body["sample"][key] for key in ("files_total", "files_sampled", "row_groups_sampled")} == {
+        "files_total": 16, "files_sampled": 8, "row_groups_sampled": 32}
+    assert 0 < len(first) < 160
+    assert body["rows_migrated"] == len(first)
+
+    invoke("orders", sample_fraction=0.25, sample_seed=7, force_reload=True)
+    assert loaded_ids(oracle) == first
+
+    invoke("orders", sample_fraction=0.25, sample_seed=8, force_reload=True)
+    assert loaded_ids(oracle) != first
+
+
+def test_sample_rows_is_converted_to_a_fraction(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(i * 20) for i in range(16)])
+
+    status, body = invoke("orders", sample_rows=40)
+
+    assert status == 200
+    assert body["sample"]["fraction"] == 0.125
+
+
+def test_only_sampled_row_groups_are_downloaded(sharing_server, oracle, invoke):
+    # Larger than the footer read, so the ranges leave most of it out
+    sharing_server.add_table("orders", [make_orders(0, rows=80000)], row_group_size=10000)
+    size = len(sharing_server.files["orders-0"])
+
+    status, body = invoke("orders", sample_fraction=0.25, columns=["id"])
+
+    assert status == 200
+    assert (body["sample"]["row_groups_total"], body["sample"]["row_groups_sampled"]) == (8, 4)
+    assert sharing_server.range_requests
+    assert body["scan"]["bytes_scanned"] == sum(end - start for start, end in sharing_server.range_requests) < size
+
+
+def test_server_ignoring_ranges_sends_the_whole_file(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0, rows=400)], row_group_size=50)
+
+    invoke("orders", sample_fraction=0.25)
+    sampled = loaded_ids(oracle)
+    sharing_server.honor_ranges = False
+    sharing_server.range_requests.clear()
+
+    status, body = invoke("orders", sample_fraction=0.25, force_reload=True)
+
+    assert status == 200
+    assert not sharing_server.range_requests
+    assert body["scan"]["bytes_scanned"] == len(sharing_server.files["orders-0"])
+    assert loaded_ids(oracle) == sampled
+
+
+def test_dry_run_scales_the_estimated_rows(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(i * 20) for i in range(16)])
+
+    status, body = invoke("orders", mode="dry_run", sample_fraction=0.25)
+
+    assert status == 200
+    # 8 files of 20 rows, half of each
+    assert body["estimated_rows"] == 80
+    assert body["sample"]["files_sampled"] == 8
+
+
+@pytest.mark.parametrize("params", [
+    {"sample_fraction": 0},
+    {"sample_fraction": 1.5},
+    {"sample_rows": 0},
+    {"sample_fraction": 0.5, "sample_rows": 10},
+    {"sample_fraction": 0.5, "limit_rows": 10},
+    {"sample_fraction": 0.5, "sample_seed": "seven"},
+    {"sample_fraction": 0.5, "load_strategy": "sync", "merge_keys": "id"},
+])
+def test_invalid_sampling_is_rejected(invoke, params):
+    status, body = invoke("orders", **params)
+
+    assert status == 400
+    assert "sampl" in body["error"]
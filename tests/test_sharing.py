@@ -0,0 +1,160 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pyarrow as pa
+
+from dbrx_migration.sharing import BatchSpool, ParquetDownloader, SharedTableScan, files_for_limit
+
+from test_handler import make_orders
+from test_retry import fail_once
+
+
+def make_table(start, rows=10):
+    return pa.table({"id": list(range(start, start + rows))})
+
+
+def file_actions(sharing_server, name):
+    return [SimpleNamespace(**action) for action in sharing_server.tables[name]["files"]]
+
+
+def test_downloader_yields_files_in_order(sharing_server):
+    sharing_server.add_table("t", [make_table(i * 10) for i in range(6)])
+    files = file_actions(sharing_server, "t")
+    downloader = ParquetDownloader(max_workers=3, prefetch=2)
+
+    fetched = list(downloader.iter_fetch(files))
+    downloader.close()
+
+    assert [add_file.id for add_file, _ in fetched] == [add_file.id for add_file in files]
+    assert [content for _, content in fetched] == [sharing_server.files[add_file.id] for add_file in files]
+
+
+def test_downloader_retries_transient_errors(sharing_server):
+    sharing_server.add_table("t", [make_table(0)])
+    sharing_server.failures["t-0"] = 2
+    downloader = ParquetDownloader(max_workers=1, backoff_factor=0)
+
+    assert downloader.fetch(file_actions(sharing_server, "t")[0].url) == sharing_server.files["t-0"]
+    assert sharing_server.failures["t-0"] == 0
+
+
+def test_downloader_keeps_one_session_per_thread(sharing_server):
+    sharing_server.add_table("t", [make_table(i * 10) for i in range(8)])
+    downloader = ParquetDownloader(max_workers=2)
+    threads = set()
+    fetch = downloader.fetch
+
+    def recording_fetch(url):
+        threads.add(threading.get_ident())
+        return fetch(url)
+
+    downloader.fetch = recording_fetch
+    list(downloader.iter_fetch(file_actions(sharing_server, "t")))
+
+    assert len(downloader._sessions) == len(threads) <= 2
+    downloader.close()
+    assert downloader._sessions == []
+
+
+def test_downloader_stops_early_without_fetching_the_rest(sharing_server):
+    sharing_server.add_table("t", [make_table(i * 10) for i in range(10)])
+    downloader = ParquetDownloader(max_workers=1, prefetch=1)
+
+    for add_file, content in downloader.iter_fetch(file_actions(sharing_server, "t")):
+        break
+    downloader.close()
+
+    assert len([path for method, path, _ in sharing_server.requests if path.startswith("/files/")]) <= 2
+
+
+def test_files_for_limit_keeps_the_files_holding_the_first_rows():
+    files = [SimpleNamespace(id=f"f{i}", stats=stats) for i, stats in enumerate(
+        ['{"numRecords": 10}', None, '{"numRecords": 10}', '{"numRecords": 10}'])]
+
+    assert [f.id for f in files_for_limit(files, 10)] == ["f0"]
+    # A file without statistics may hold no rows, so it is kept and not counted
+    assert [f.id for f in files_for_limit(files, 15)] == ["f0", "f1", "f2"]
+    assert files_for_limit(files, 100) == files
+
+
+def test_limited_scan_never_prefetches_past_the_limit(sharing_server, tmp_path):
+    sharing_server.add_table("t", [make_table(i * 10) for i in range(8)])
+    profile = tmp_path / "profile.share"
+    profile.write_text(sharing_server.profile())
+    downloader = ParquetDownloader(max_workers=4, prefetch=4)
+
+    scan = SharedTableScan(str(profile), sharing_server.share, sharing_server.schema, "t", downloader, limit=15)
+    rows = sum(arrow_table.num_rows for arrow_table in scan)
+    downloader.close()
+
+    assert rows == 15
+    assert len(scan.files) == 2
+    assert len([path for method, path, _ in sharing_server.requests if path.startswith("/files/")]) == 2
+
+
+def test_spool_replays_written_tables(tmp_path):
+    spool = BatchSpool(str(tmp_path), "s.sc.t", {"version": 3})
+    spool.write("a", make_table(0))
+    spool.write("b", make_table(10))
+
+    reopened = BatchSpool(str(tmp_path), "s.sc.t", {"version": 3})
+    assert reopened.replay("a").column("id").to_pylist() == list(range(10))
+    assert reopened.replay("b").column("id").to_pylist() == list(range(10, 20))
+    assert reopened.replay("c") is None
+
+
+def test_spool_rewrite_after_checksum_failure_keeps_other_entries(tmp_path):
+    spool = BatchSpool(str(tmp_path), "s.sc.t", {"version": 3})
+    spool.write("a", make_table(0))
+    spool.write("b", make_table(10))
+    with open(os.path.join(spool.path, spool.entries["a"]["name"]), "r+b") as f:
+        f.write(b"corrupt")
+
+    assert spool.replay("a") is None
+    assert spool.stats["checksum_failures"] == 1
+    spool.write("a", make_table(100))
+    spool.write("c", make_table(200))
+
+    assert len({entry["name"] for entry in spool.entries.values()}) == 3
+    assert spool.replay("a").column("id").to_pylist() == list(range(100, 110))
+    assert spool.replay("b").column("id").to_pylist() == list(range(10, 20))
+    assert spool.replay("c").column("id").to_pylist() == list(range(200, 210))
+
+
+def test_spool_of_another_key_is_removed(tmp_path):
+    old = BatchSpool(str(tmp_path), "s.sc.t", {"version": 3})
+    old.write("a", make_table(0))
+
+    new = BatchSpool(str(tmp_path), "s.sc.t", {"version": 4})
+    assert new.replay("a") is None
+    assert os.listdir(tmp_path) == [os.path.basename(new.path)]
+
+
+def test_spool_stops_at_cap(tmp_path):
+    table = make_table(0)
+    spool = BatchSpool(str(tmp_path), "s.sc.t", {"version": 3}, max_bytes=table.nbytes * 3)
+    for file_id in "abcdef":
+        spool.write(file_id, table)
+
+    assert spool.stats["capped"]
+    assert spool.stats["files_written"] < 6
+    assert spool.replay("f") is None
+
+
+def test_failed_load_is_retried_from_the_spool(sharing_server, oracle, invoke, tmp_path):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+    oracle.fail = fail_once("INSERT INTO orders")
+
+    status, body = invoke("orders", spool=True, spool_dir=str(tmp_path), max_retries=0)
+
+    assert status == 500
+    downloads = len(sharing_server.requests)
+    status, body = invoke("orders", spool=True, spool_dir=str(tmp_path))
+
+    assert status == 200
+    assert body["rows_migrated"] == 40
+    assert body["spool"]["files_replayed"] == 2
+    assert body["spool"]["cleared"]
+    assert not [path for method, path, _ in sharing_server.requests[downloads:] if path.startswith("/files/")]
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,128 @@
+import oracledb
+import pyarrow as pa
+import pytest
+
+from dbrx_migration.loaders import copy_table_indexes, swap_tables
+from fake_oracle import RecordingCursor
+
+
+def make_orders(start=0, rows=20):
+    return pa.table({"id": list(range(start, start + rows)), "region": ["EU"] * rows})
+
+
+def test_swap_renames_the_target_back_when_the_staging_rename_fails():
+    cursor = RecordingCursor(fail="ORDERS_STG_1 RENAME")
+
+    with pytest.raises(oracledb.DatabaseError):
+        swap_tables(cursor, "orders", "ORDERS_STG_1", "ORDERS_OLD_1", True, [])
+
+    assert cursor.statements == [
+        "ALTER TABLE ORDERS RENAME TO ORDERS_OLD_1",
+        "ALTER TABLE ORDERS_STG_1 RENAME TO ORDERS",
+        "ALTER TABLE ORDERS_OLD_1 RENAME TO ORDERS",
+    ]
+
+
+def test_swap_carries_grants_and_restores_names():
+    cursor = RecordingCursor(results=[("user_tab_privs", [("REPORTING", "SELECT")])])
+
+    swap_tables(cursor, "orders", "ORDERS_STG_1", "ORDERS_OLD_1", True,
+                [("CONSTRAINT", "ORDERS_PK_S", "ORDERS_PK"), ("INDEX", "ORDERS_PK_S", "ORDERS_PK")])
+
+    assert cursor.statements[3:] == [
+        "GRANT SELECT ON ORDERS TO REPORTING",
+        "DROP TABLE ORDERS_OLD_1 PURGE",
+        "ALTER TABLE ORDERS RENAME CONSTRAINT ORDERS_PK_S TO ORDERS_PK",
+        "ALTER INDEX ORDERS_PK_S RENAME TO ORDERS_PK",
+    ]
+
+
+def test_copy_table_indexes_copies_checks_and_foreign_keys():
+    cursor = RecordingCursor(results=[
+        ("constraint_type IN ('P', 'U')", [("ORDERS_PK", "P", "ORDERS_PK", "USER NAME", "ID")]),
+        ("constraint_type = 'C'", [
+            ("SYS_C001", "GENERATED NAME", '"ID" IS NOT NULL'),
+            ("AMOUNT_POSITIVE", "USER NAME", "amount > 0"),
+            ("SYS_C002", "GENERATED NAME", "region IN ('EU', 'US')"),
+        ]),
+        ("constraint_type = 'R'", [("ORDERS_CUSTOMER_FK", "USER NAME", "CASCADE", "CUSTOMERS", "CUSTOMER_ID", "ID")]),
+        ("user_indexes", [("ORDERS_PK", "UNIQUE", "ID"), ("ORDERS_REGION_IX", "NONUNIQUE", "REGION")]),
+    ])
+
+    renames = copy_table_indexes(cursor, "orders", "ORDERS_STG_1")
+
+    ddl = [statement for statement in cursor.statements if not statement.startswith("SELECT")]
+    assert ddl == [
+        "ALTER TABLE ORDERS_STG_1 ADD CONSTRAINT ORDERS_PK_S PRIMARY KEY (ID)",
+        "ALTER TABLE ORDERS_STG_1 ADD CONSTRAINT AMOUNT_POSITIVE_S CHECK (amount > 0)",
+        "ALTER TABLE ORDERS_STG_1 ADD CHECK (region IN ('EU', 'US'))",
+        "ALTER TABLE ORDERS_STG_1 ADD CONSTRAINT ORDERS_CUSTOMER_FK_S "
+        "FOREIGN KEY (CUSTOMER_ID) REFERENCES CUSTOMERS (ID) ON DELETE CASCADE",
+        "CREATE INDEX ORDERS_REGION_IX_S ON ORDERS_STG_1 (REGION)",
+    ]
+    assert renames == [
+        ("CONSTRAINT", "ORDERS_PK_S", "ORDERS_PK"),
+        ("INDEX", "ORDERS_PK_S", "ORDERS_PK"),
+        ("CONSTRAINT", "AMOUNT_POSITIVE_S", "AMOUNT_POSITIVE"),
+        ("CONSTRAINT", "ORDERS_CUSTOMER_FK_S", "ORDERS_CUSTOMER_FK"),
+        ("INDEX", "ORDERS_REGION_IX_S", "ORDERS_REGION_IX"),
+    ]
+
+
+def test_swap_load_replaces_the_table_and_leaves_no_work_tables(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+
+    status, body = invoke("orders", load_strategy="swap")
+    assert body["status"] == "success"
+
+    sharing_server.add_table("orders", [make_orders(100, 5)])
+    status, body = invoke("orders", load_strategy="swap", force_reload=True)
+
+    assert body["status"] == "success"
+    assert body["warnings"] == []
+    assert oracle.rows("SELECT MIN(id), COUNT(*) FROM orders") == [(100, 5)]
+    assert oracle.tables() == ["DBRX_MIGRATION_CONTROL", "DBRX_MIGRATION_PROGRESS", "DBRX_MIGRATION_REJECTS", "ORDERS"]
+
+
+def test_failed_swap_load_keeps_the_live_table(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+    invoke("orders")
+    oracle.fail = lambda query: query.startswith("INSERT INTO ORDERS_STG_")
+
+    status, body = invoke("orders", load_strategy="swap", force_reload=True, max_retries=0)
+
+    assert status == 500
+    assert oracle.rows("SELECT COUNT(*) FROM orders") == [(20,)]
+    assert oracle.tables() == ["DBRX_MIGRATION_CONTROL", "DBRX_MIGRATION_PROGRESS", "DBRX_MIGRATION_REJECTS", "ORDERS"]
+
+
+def test_swap_refuses_a_table_referenced_by_foreign_keys(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+    invoke("orders")
+    oracle.rows("INSERT INTO user_constraints (table_name, constraint_name, constraint_type) "
+                "VALUES ('ORDERS', 'ORDERS_PK', 'P')")
+    oracle.rows("INSERT INTO user_constraints (table_name, constraint_name, constraint_type, r_constraint_name) "
+                "VALUES ('SHIPMENTS', 'SHIPMENTS_ORDER_FK', 'R', 'ORDERS_PK')")
+
+    status, body = invoke("orders", load_strategy="swap", force_reload=True)
+
+    assert status == 400
+    assert "SHIPMENTS_ORDER_FK" in body["error"]
+
+
+def test_swap_warns_about_triggers_it_drops(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+    invoke("orders")
+    oracle.rows("INSERT INTO user_triggers VALUES ('ORDERS', 'ORDERS_AUDIT')")
+
+    status, body = invoke("orders", load_strategy="swap", force_reload=True)
+
+    assert body["status"] == "success"
+    assert "ORDERS_AUDIT" in body["warnings"][0]
+
+
+def test_invalid_load_strategy_is_rejected(invoke):
+    status, body = invoke("orders", load_strategy="replace")
+
+    assert status == 400
+    assert "load_strategy" in body["error"]
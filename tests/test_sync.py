@@ -0,0 +1,108 @@
+import tracemalloc
+
+import pyarrow as pa
+import pytest
+
+from dbrx_migration.hash_sync import HashDiffSync, _string_hashes, row_hashes
+
+from test_handler import make_orders
+
+FIELDS = [{"name": "id", "type": "long"}, {"name": "amount", "type": "double"}, {"name": "region", "type": "string"}]
+
+
+def test_sync_applies_only_the_differences(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+
+    status, body = invoke("orders", load_strategy="sync", merge_keys="id")
+
+    assert status == 200
+    assert body["sync"]["rows_inserted"] == 40
+    assert oracle.rows("SELECT COUNT(*) FROM orders_HASH") == [(40,)]
+
+    changed = make_orders(20).to_pydict()
+    changed["amount"][0] = -1.0
+    # Row 39 is gone and row 40 new
+    changed = {name: values[:-1] for name, values in changed.items()}
+    sharing_server.add_table("orders", [make_orders(0), pa.table(changed), make_orders(40, rows=1)])
+    sharing_server.version += 1
+
+    status, body = invoke("orders", load_strategy="sync", merge_keys="id")
+
+    assert status == 200
+    assert {key: body["sync"][key] for key in ("rows_inserted", "rows_updated", "rows_deleted", "rows_unchanged")} == {
+        "rows_inserted": 1, "rows_updated": 1, "rows_deleted": 1, "rows_unchanged": 38}
+    assert body["total_rows_in_oracle"] == 40
+    assert oracle.rows("SELECT amount FROM orders WHERE id = 20") == [(-1.0,)]
+    assert oracle.rows("SELECT COUNT(*) FROM orders WHERE id = 39") == [(0,)]
+
+
+def test_ranges_only_diff_their_own_keys(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+    invoke("orders", load_strategy="sync", merge_keys="id")
+    sharing_server.version += 1
+
+    # Ranges of 10 keys read files of 20: the rows of other ranges are left out
+    status, body = invoke("orders", load_strategy="sync", merge_keys="id", sync_range_rows=10)
+
+    assert status == 200
+    assert body["sync"]["ranges"] == 4
+    assert body["sync"]["rows_unchanged"] == 40
+    assert body["rows_migrated"] == 0
+    assert oracle.rows("SELECT COUNT(*), COUNT(DISTINCT id) FROM orders") == [(40, 40)]
+
+
+def test_source_rows_are_limited_to_the_range(oracle):
+    sync = HashDiffSync(oracle.connect(), "orders", FIELDS, ["id"], 100, None)
+
+    table = sync.source_table([make_orders(0, rows=10)], 3, 7)
+
+    assert table.column("id").to_pylist() == [3, 4, 5, 6]
+    assert sync.source_table([make_orders(0, rows=10)]).num_rows == 10
+    with pytest.raises(ValueError, match="merge_keys column id"):
+        sync.source_table([make_orders().drop(["id"])], 3, 7)
+
+
+def test_chunked_string_hashes_match_unchunked():
+    values = pa.array(["abc", "", None, "long value " * 40, "x"] * 200, pa.large_string()).slice(3)
+
+    expected = _string_hashes(values, chunk_bytes=1 << 30)
+
+    for chunk_bytes in (1, 7, 64, 1000):
+        assert (_string_hashes(values, chunk_bytes=chunk_bytes) == expected).all()
+
+
+def test_string_hash_memory_is_bounded_by_the_chunk():
+    values = pa.array(["v" * 100 + str(i) for i in range(20000)], pa.large_string())
+
+    def peak(chunk_bytes):
+        tracemalloc.start()
+        try:
+            _string_hashes(values, chunk_bytes=chunk_bytes)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # About 2 MB of strings: 40 bytes of temporaries per byte unchunked
+    assert peak(1 << 16) < 4 * values.nbytes < peak(1 << 30)
+
+
+def test_row_hashes_depend_on_values_only():
+    table = make_orders(0, rows=4)
+
+    hashes = row_hashes(table, ["amount", "region"])
+
+    assert list(hashes) == list(row_hashes(pa.concat_tables([table.slice(0, 2), table.slice(2)]), ["amount", "region"]))
+    assert len(set(hashes)) == 4
+
+
+@pytest.mark.parametrize("params", [
+    {"load_strategy": "sync"},
+    {"load_strategy": "sync", "merge_keys": "id", "predicate": {"op": "isNull", "children": [
+        {"op": "column", "name": "id", "valueType": "long"}]}},
+    {"load_strategy": "sync", "merge_keys": "id", "sync_range_rows": 0},
+])
+def test_invalid_sync_is_rejected(invoke, params):
+    status, body = invoke("orders", **params)
+
+    assert status == 400
+    assert "sync" in body["error"]
@@ -0,0 +1,66 @@
+from test_handler import make_orders
+from test_retry import fail_once
+
+TARGETS = [{"name": "a", "oracle_table_name": "orders_a"}, {"name": "b", "oracle_table_name": "orders_b"}]
+
+
+def test_one_read_loads_every_target(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+
+    status, body = invoke("orders", targets=TARGETS, batch_size=7)
+
+    assert status == 200
+    assert body["status"] == "success"
+    assert body["rows_read"] == 40
+    assert [(t["name"], t["status"], t["rows_migrated"], t["total_rows_in_oracle"]) for t in body["targets"]] == [
+        ("a", "success", 40, 40), ("b", "success", 40, 40)]
+    assert oracle.rows("SELECT COUNT(*) FROM orders_a") == oracle.rows("SELECT COUNT(*) FROM orders_b") == [(40,)]
+    downloads = [path for method, path, _ in sharing_server.requests if path.startswith("/files/")]
+    assert len(downloads) == 2
+    assert sorted(oracle.rows("SELECT run_id, status FROM DBRX_MIGRATION_PROGRESS")) == [
+        (f"{body['run_id']}:a", "SUCCESS"), (f"{body['run_id']}:b", "SUCCESS")]
+
+    status, body = invoke("orders", targets=TARGETS)
+    assert body["status"] == "unchanged"
+    assert [t["status"] for t in body["targets"]] == ["unchanged", "unchanged"]
+
+
+def test_a_failed_target_does_not_stop_the_others(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders(0), make_orders(20)])
+    oracle.fail = fail_once("INSERT INTO orders_b")
+
+    status, body = invoke("orders", targets=TARGETS, batch_size=7, max_retries=0)
+
+    assert status == 500
+    assert body["error"] == "1 of 2 targets failed: ['b']"
+    assert [(t["name"], t["status"]) for t in body["targets"]] == [("a", "success"), ("b", "error")]
+    assert oracle.rows("SELECT COUNT(*) FROM orders_a") == [(40,)]
+    assert sorted(oracle.rows("SELECT target_table, status FROM DBRX_MIGRATION_CONTROL")) == [
+        ("orders_a", "SUCCESS"), ("orders_b", "FAILED")]
+
+
+def test_targets_take_their_connection_settings_from_the_request(sharing_server, oracle, invoke):
+    sharing_server.add_table("orders", [make_orders()])
+
+    status, body = invoke("orders", targets=[{"name": "a", "oracle_dsn": "other"}], oracle_dsn=None)
+
+    assert status == 200
+    assert body["targets"][0]["rows_migrated"] == 20
+
+    status, body = invoke("orders", targets=[{"name": "a"}], oracle_dsn=None)
+
+    assert status == 400
+    assert "targets[0].oracle_dsn" in body["error"]
+
+
+def test_invalid_targets_are_rejected(invoke):
+    status, body = invoke("orders", targets=[{"name": "a"}, {"name": "a"}])
+    assert status == 400
+    assert "unique target names" in body["error"]
+
+    status, body = invoke("orders", targets=TARGETS, preflight="check")
+    assert status == 400
+
+    status, body = invoke("orders", targets="[not json")
+    assert status == 400
+    assert "targets must be a JSON list" in body["error"]